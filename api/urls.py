@@ -22,6 +22,7 @@ from .views import (
     CertificateDetailView,
     UserCertificatesView,
     BusinessInsightsKPIView,
+    StaffUtilizationView,
     AdminDashboardView,
     ClientDashboardView
 )
@@ -52,6 +53,7 @@ urlpatterns = [
     
     # Business Insights KPIs
     path('business-insights/kpis/', BusinessInsightsKPIView.as_view(), name='business-insights-kpis'),
+    path('business-insights/utilization/', StaffUtilizationView.as_view(), name='business-insights-utilization'),
     
     # Admin Dashboard
     path('admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
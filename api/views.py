@@ -643,6 +643,72 @@ class BusinessInsightsKPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class StaffUtilizationView(APIView):
+    """
+    API endpoint for staff utilization and capacity planning (Admin/Superadmin).
+    Booked vs delivered hours per staff member and week, gap to the weekly target,
+    and over/under-utilization flags.
+    
+    Query Parameters:
+    - start_date: First day (YYYY-MM-DD, default start of the week 11 weeks ago)
+    - end_date: Last day (YYYY-MM-DD, default today)
+    - role: RBT or BCBA (default both)
+    - staff_id: Limit to one staff member
+    - target_hours: Weekly target hours (default UTILIZATION_TARGET_HOURS)
+    - flag: Only return staff flagged 'over' or 'under'
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from session.utilization import MAX_WEEKS, STAFF_ROLES, get_thresholds, staff_utilization, weeks_between
+
+        user = request.user
+        role_name = None
+        if hasattr(user, 'role') and user.role:
+            role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+        if role_name not in ['Admin', 'Superadmin']:
+            return Response({
+                'error': 'Only Admin and Superadmin users can access staff utilization'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        today = timezone.now().date()
+        try:
+            end_date = datetime.strptime(request.query_params['end_date'], '%Y-%m-%d').date() if request.query_params.get('end_date') else today
+            start_date = (
+                datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
+                if request.query_params.get('start_date')
+                else end_date - timedelta(weeks=11, days=end_date.weekday())
+            )
+        except ValueError:
+            return Response({'error': 'start_date and end_date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date:
+            return Response({'error': 'end_date must be on or after start_date'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(weeks_between(start_date, end_date)) > MAX_WEEKS:
+            return Response({'error': f'The range can span at most {MAX_WEEKS} weeks'}, status=status.HTTP_400_BAD_REQUEST)
+
+        thresholds = get_thresholds()
+        if request.query_params.get('target_hours'):
+            try:
+                thresholds['target_hours'] = float(request.query_params['target_hours'])
+            except ValueError:
+                return Response({'error': 'target_hours must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        staff = CustomUser.objects.filter(role__name__in=STAFF_ROLES)
+        if request.query_params.get('role') in STAFF_ROLES:
+            staff = staff.filter(role__name=request.query_params['role'])
+        if request.query_params.get('staff_id'):
+            staff = staff.filter(id=request.query_params['staff_id'])
+
+        data = staff_utilization(start_date, end_date, staff=staff, thresholds=thresholds)
+        flag = request.query_params.get('flag')
+        if flag in ['over', 'under']:
+            data['staff'] = [row for row in data['staff'] if row['flag'] == flag]
+
+        data['date_range'] = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+        data['calculated_at'] = timezone.now().isoformat()
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class AdminDashboardView(APIView):
     """
     Comprehensive Admin Dashboard API endpoint
@@ -740,33 +806,26 @@ class AdminDashboardView(APIView):
                 })
             
             # 3. STAFF PRODUCTIVITY & CASELOAD (Weekly data)
-            staff_members = CustomUser.objects.filter(role__name__in=['RBT', 'BCBA'])
-            weekly_data = []
+            from session.statistics import cached, conditional_counts, daily_histogram
+            staff_count = CustomUser.objects.filter(role__name__in=['RBT', 'BCBA']).count()
+            week_start = end_date - timedelta(days=6)
+            staff_sessions = Session.objects.filter(staff__role__name__in=['RBT', 'BCBA'])
             
-            for day_offset in range(7):
-                day_date = end_date - timedelta(days=6-day_offset)
-                day_name = day_date.strftime('%A')
-                
-                total_caseload = 0
-                for staff in staff_members:
-                    caseload_count = Session.objects.filter(
-                        staff=staff,
-                        session_date=day_date
-                    ).values('client').distinct().count()
-                    total_caseload += caseload_count
-                
-                total_productivity = Session.objects.filter(
-                    staff__role__name__in=['RBT', 'BCBA'],
-                    session_date=day_date,
-                    status='completed'
-                ).count()
-                
-                avg_productivity = (total_productivity / staff_members.count()) if staff_members.count() > 0 else 0
-                
+            # Caseload = distinct (staff, client) pairs per day; one query for the whole week
+            caseload_by_day = {}
+            for day_date, _staff_id, _client_id in (
+                staff_sessions.filter(session_date__gte=week_start, session_date__lte=end_date)
+                .values_list('session_date', 'staff_id', 'client_id').distinct()
+            ):
+                caseload_by_day[day_date] = caseload_by_day.get(day_date, 0) + 1
+            
+            weekly_data = []
+            for day in daily_histogram(staff_sessions, week_start, end_date):
+                avg_productivity = (day['completed'] / staff_count) if staff_count > 0 else 0
                 weekly_data.append({
-                    'day': day_name,
-                    'date': day_date.isoformat(),
-                    'caseload': total_caseload,
+                    'day': day['date'].strftime('%A'),
+                    'date': day['date'].isoformat(),
+                    'caseload': caseload_by_day.get(day['date'], 0),
                     'productivity': round(avg_productivity, 2)
                 })
             
@@ -871,12 +930,13 @@ class AdminDashboardView(APIView):
             ]
             
             # 6. APPOINTMENT STATISTICS
-            all_sessions = Session.objects.filter(
-                session_date__gte=start_date,
-                session_date__lte=end_date
-            )
-            completed_sessions = all_sessions.filter(status='completed').count()
-            cancelled_sessions = all_sessions.filter(status='cancelled').count()
+            appointment_counts = cached('admin_appointments', 'all', {'start': start_date, 'end': end_date}, lambda: conditional_counts(
+                Session.objects.filter(session_date__gte=start_date, session_date__lte=end_date),
+                completed=Q(status='completed'),
+                cancelled=Q(status='cancelled'),
+            ))
+            completed_sessions = appointment_counts['completed']
+            cancelled_sessions = appointment_counts['cancelled']
             total_appointments = completed_sessions + cancelled_sessions
             attendance_rate = (completed_sessions / total_appointments * 100) if total_appointments > 0 else 0
             cancellation_rate = (cancelled_sessions / total_appointments * 100) if total_appointments > 0 else 0
@@ -1138,26 +1198,19 @@ class ClientDashboardView(APIView):
             # 5. SESSION ATTENDANCE OVERVIEW
             attendance_overview = None
             try:
-                # Get all sessions for this client
-                all_sessions = TherapySession.objects.filter(client=client)
-                total_sessions = all_sessions.count()
-                completed_sessions = all_sessions.filter(status='completed').count()
-                cancelled_sessions = all_sessions.filter(status='cancelled').count()
+                # All attendance counts come from one conditional aggregate
+                from session.caseload import client_statistics
+                stats = client_statistics(client)
+                total_sessions = stats['total_sessions']
+                completed_sessions = stats['completed_sessions']
+                cancelled_sessions = stats['cancelled_sessions']
                 
                 # Calculate attended rate
                 attended_rate = (completed_sessions / total_sessions * 100) if total_sessions > 0 else 0
                 
-                # Get missed sessions (scheduled but not completed, excluding recent future ones)
-                missed_sessions = all_sessions.filter(
-                    status='cancelled',
-                    session_date__lt=today  # Only count past cancelled sessions as missed
-                ).count()
-                
-                # Cancellations with late notice (cancelled on the same day or after start time)
-                late_cancellations = all_sessions.filter(
-                    status='cancelled',
-                    session_date=today
-                ).count()
+                # Missed: past cancelled sessions; late notice: cancelled on the session day
+                missed_sessions = stats['missed_sessions']
+                late_cancellations = stats['late_cancellations']
                 
                 attendance_overview = {
                     'attended_rate': round(attended_rate, 0),
@@ -3,6 +3,7 @@ from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 import messaging.routing  # your websocket routing
+import session.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sapphire.settings')
 
@@ -11,6 +12,7 @@ application = ProtocolTypeRouter({
     "websocket": AuthMiddlewareStack(
         URLRouter(
             messaging.routing.websocket_urlpatterns
+            + session.routing.websocket_urlpatterns
         )
     ),
 })
@@ -0,0 +1,23 @@
+"""
+System checks for messaging deployment settings.
+"""
+from django.core.checks import Warning, register
+
+from session.shared_cache import shared_cache_enabled
+
+
+@register()
+def presence_cache_check(app_configs, **kwargs):
+    """Presence (messaging/presence.py) needs a cache shared by every worker"""
+    if shared_cache_enabled():
+        return []
+    return [
+        Warning(
+            'Presence and typing state are kept in a process-local cache.',
+            hint=(
+                'Users connected to other workers will look offline. Point CACHE_BACKEND at Redis or '
+                'Memcached, or set CACHE_SINGLE_PROCESS=True if only one worker serves websockets.'
+            ),
+            id='messaging.W001',
+        )
+    ]
@@ -1,10 +1,12 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
+from . import presence
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f"chat_{self.room_name}"
+        self.user = self.scope.get('user')
 
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -13,7 +15,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        if self._is_authenticated():
+            await presence.connect(self.user.id)
+            await self._broadcast_presence(online=True)
+
     async def disconnect(self, close_code):
+        if self._is_authenticated():
+            # Other tabs/rooms may still be open; only the user's last socket announces offline
+            if await presence.disconnect(self.user.id):
+                await self._broadcast_presence(online=False)
+
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
@@ -21,6 +32,36 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         data = json.loads(text_data)
+        event_type = data.get('type')
+
+        # Heartbeats keep the presence key alive; nothing is fanned out
+        if event_type == 'heartbeat':
+            if self._is_authenticated():
+                last_seen = await presence.touch(self.user.id)
+                await self.send(text_data=json.dumps({
+                    'type': 'heartbeat_ack',
+                    'last_seen': last_seen
+                }))
+            return
+
+        if event_type == 'typing':
+            if not self._is_authenticated():
+                return
+            # Drop bursts of keystrokes; only one event per window reaches the room
+            if not await presence.allow_typing_event(self.room_name, self.user.id):
+                return
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'typing_indicator',
+                    'user_id': self.user.id,
+                    'username': self.user.username,
+                    'is_typing': bool(data.get('is_typing', True)),
+                    'sender_channel': self.channel_name
+                }
+            )
+            return
+
         message = data['message']
 
         await self.channel_layer.group_send(
@@ -36,3 +77,34 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'message': message
         }))
+
+    async def typing_indicator(self, event):
+        # Don't echo typing events back to the sender
+        if event.get('sender_channel') == self.channel_name:
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'typing',
+            'user_id': event['user_id'],
+            'username': event['username'],
+            'is_typing': event['is_typing']
+        }))
+
+    async def presence_update(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'presence',
+            'user_id': event['user_id'],
+            'online': event['online']
+        }))
+
+    async def _broadcast_presence(self, online):
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'presence_update',
+                'user_id': self.user.id,
+                'online': online
+            }
+        )
+
+    def _is_authenticated(self):
+        return self.user is not None and self.user.is_authenticated
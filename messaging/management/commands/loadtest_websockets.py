@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import json
+import resource
+import statistics
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+import messaging.routing
+import ocean.routing
+
+User = get_user_model()
+
+# Synthetic users get ids far above real ones so presence keys and dashboard groups don't collide
+LOADTEST_USER_ID_OFFSET = 10_000_000
+LOADTEST_MARKER = 'loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        'Open N in-process websocket connections to ChatConsumer or DashboardConsumer, '
+        'send messages at a target rate and report delivery latency percentiles and memory per connection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['chat', 'dashboard'], default='chat', help='Consumer to load')
+        parser.add_argument('--connections', type=int, default=100, help='Number of websocket connections')
+        parser.add_argument('--rooms', type=int, default=10, help='Chat rooms to spread connections over (chat only)')
+        parser.add_argument('--rate', type=float, default=50.0, help='Messages sent per second (across all senders)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to keep sending')
+        parser.add_argument('--drain', type=float, default=2.0, help='Seconds to wait for in-flight deliveries after sending stops')
+        parser.add_argument('--connect-concurrency', type=int, default=100, help='Connections opened in parallel')
+
+    def handle(self, *args, **options):
+        try:
+            from channels.testing import WebsocketCommunicator  # noqa: F401 (needs daphne)
+        except ImportError as e:
+            raise CommandError(f"channels.testing is unavailable ({e}); install daphne to run the load test")
+
+        if options['connections'] < 1 or options['rate'] <= 0 or options['duration'] <= 0:
+            raise CommandError('--connections, --rate and --duration must be positive')
+        if options['target'] == 'chat' and options['rooms'] < 1:
+            raise CommandError('--rooms must be at least 1')
+
+        layer = get_channel_layer()
+        self.stdout.write(
+            f"Target: {options['target']} | connections: {options['connections']} | "
+            f"rate: {options['rate']}/s for {options['duration']}s | channel layer: {type(layer).__name__}"
+        )
+
+        report = async_to_sync(self._run)(options)
+        self._print_report(report)
+
+    async def _run(self, options):
+        from channels.testing import WebsocketCommunicator
+
+        application = URLRouter(messaging.routing.websocket_urlpatterns + ocean.routing.websocket_urlpatterns)
+        target = options['target']
+        count = options['connections']
+
+        # Memory baseline before any socket is opened
+        tracemalloc.start()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        connections = []
+        for index in range(count):
+            # Unsaved users: consumers only read id/username/auth flags, so nothing hits the DB
+            user = User(id=LOADTEST_USER_ID_OFFSET + index, username=f'{LOADTEST_MARKER}_{index}')
+            room = f"{LOADTEST_MARKER}{index % options['rooms']}" if target == 'chat' else None
+            path = f"/ws/chat/{room}/" if target == 'chat' else '/ws/dashboard/'
+            communicator = WebsocketCommunicator(application, path)
+            communicator.scope['user'] = user
+            connections.append({'communicator': communicator, 'user': user, 'room': room})
+
+        connect_started = time.perf_counter()
+        failed = 0
+        concurrency = max(1, options['connect_concurrency'])
+        for start in range(0, count, concurrency):
+            chunk = connections[start:start + concurrency]
+            results = await asyncio.gather(*(conn['communicator'].connect() for conn in chunk))
+            failed += sum(1 for connected, _ in results if not connected)
+        connect_seconds = time.perf_counter() - connect_started
+
+        connected_bytes = tracemalloc.get_traced_memory()[0]
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.stop()
+
+        latencies = []
+        receivers = [asyncio.create_task(self._receive(conn['communicator'], latencies)) for conn in connections]
+
+        sent, expected = await self._send(target, connections, options)
+        await asyncio.sleep(options['drain'])
+        for receiver in receivers:
+            receiver.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+
+        await asyncio.gather(*(conn['communicator'].disconnect() for conn in connections), return_exceptions=True)
+
+        return {
+            'connections': count,
+            'failed_connections': failed,
+            'connect_seconds': connect_seconds,
+            'sent': sent,
+            'expected': expected,
+            'latencies': latencies,
+            'bytes_per_connection': (connected_bytes - baseline_bytes) / count,
+            'rss_growth_kb': rss_kb - baseline_rss_kb,
+        }
+
+    async def _send(self, target, connections, options):
+        """Send at a fixed rate on an absolute schedule; returns (messages sent, deliveries expected)"""
+        layer = get_channel_layer()
+        interval = 1.0 / options['rate']
+        total = int(options['rate'] * options['duration'])
+
+        room_sizes = {}
+        for conn in connections:
+            room_sizes[conn['room']] = room_sizes.get(conn['room'], 0) + 1
+
+        senders = itertools.cycle(connections)
+        started = time.perf_counter()
+        expected = 0
+        for sequence in range(total):
+            delay = started + sequence * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            conn = next(senders)
+            payload = {LOADTEST_MARKER: sequence, 'sent_at': time.perf_counter()}
+            if target == 'chat':
+                # ChatConsumer fans the message out to everyone in the room, sender included
+                await conn['communicator'].send_to(text_data=json.dumps({'message': payload}))
+                expected += room_sizes[conn['room']]
+            else:
+                # Dashboard pushes come from the server side, as broadcast_alert does
+                await layer.group_send(f"user_{conn['user'].id}", {'type': 'alert_message', 'message': payload})
+                expected += 1
+        return total, expected
+
+    async def _receive(self, communicator, latencies):
+        """Collect delivery latency for load-test messages; presence and other events are ignored"""
+        while True:
+            # No timeout: on timeout the test communicator cancels the consumer itself.
+            # The task is cancelled instead once the drain period is over.
+            text = await communicator.receive_from(timeout=None)
+            received_at = time.perf_counter()
+            data = json.loads(text)
+            payload = data.get('message', data) if isinstance(data, dict) else None
+            if isinstance(payload, dict) and LOADTEST_MARKER in payload:
+                latencies.append((received_at - payload['sent_at']) * 1000)
+
+    def _print_report(self, report):
+        latencies = report['latencies']
+        delivered = len(latencies)
+        self.stdout.write(
+            f"Connected {report['connections'] - report['failed_connections']}/{report['connections']} "
+            f"in {report['connect_seconds']:.2f}s"
+        )
+        self.stdout.write(f"Messages sent: {report['sent']} | deliveries: {delivered}/{report['expected']}")
+
+        if delivered >= 2:
+            # Inclusive: percentiles stay within the observed range (the default extrapolates past max)
+            cut_points = statistics.quantiles(latencies, n=100, method='inclusive')
+            self.stdout.write(
+                f"Delivery latency (ms): p50={cut_points[49]:.2f} p95={cut_points[94]:.2f} "
+                f"p99={cut_points[98]:.2f} max={max(latencies):.2f}"
+            )
+        else:
+            self.stdout.write(self.style.WARNING('Not enough deliveries to compute latency percentiles'))
+
+        self.stdout.write(
+            f"Memory per connection: {report['bytes_per_connection'] / 1024:.1f} KiB (Python heap) | "
+            f"process RSS growth: {report['rss_growth_kb'] / 1024:.1f} MiB"
+        )
+
+        lost = report['expected'] - delivered
+        if lost > 0 or report['failed_connections']:
+            self.stdout.write(self.style.WARNING(f"{lost} deliveries missing, {report['failed_connections']} failed connections"))
+        else:
+            self.stdout.write(self.style.SUCCESS('All deliveries received'))
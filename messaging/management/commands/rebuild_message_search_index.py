@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from messaging.search import rebuild_search_index, create_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the chat message full-text search index (SQLite FTS5 table / PostgreSQL GIN index)'
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            indexed = rebuild_search_index()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} messages into the FTS5 table'))
+        else:
+            create_search_index()
+            self.stdout.write(self.style.SUCCESS(f'GIN search index ensured on {connection.vendor}'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:30
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from messaging.search import create_search_index, rebuild_search_index
+    if create_search_index(schema_editor.connection):
+        # SQLite: backfill the FTS5 shadow table with existing messages
+        rebuild_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from messaging.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
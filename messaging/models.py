@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
 
 class ChatRoom(models.Model):
     """
@@ -27,3 +29,16 @@ class Message(models.Model):
 
     def __str__(self):
         return f"{self.sender} -> {self.room.name}: {self.content[:20]}"
+
+
+# Keep the full-text search shadow table in sync (no-ops on PostgreSQL, see messaging/search.py)
+@receiver(post_save, sender=Message)
+def index_message_for_search(sender, instance, **kwargs):
+    from .search import index_message
+    index_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def unindex_message_for_search(sender, instance, **kwargs):
+    from .search import unindex_message
+    unindex_message(instance.id)
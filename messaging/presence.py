@@ -0,0 +1,107 @@
+"""
+Presence and typing-indicator state for messaging.
+
+Presence is kept in the Django cache with a TTL so it never touches the
+database: websocket consumers refresh a user's key on connect and on every
+heartbeat, and the key simply expires if the client goes away without a clean
+disconnect. A user can have several sockets open (tabs, rooms), so a
+per-user connection count decides when a disconnect really means offline.
+Typing events are rate limited per user/room with ``cache.add``, which only
+succeeds once per window.
+
+The counts and keys must live in a cache every worker shares: with a
+process-local backend each worker sees only its own sockets, so a user looks
+offline to the others. ``messaging.W001`` (messaging/checks.py) warns about
+that at startup.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+PRESENCE_KEY = 'presence:user:{user_id}'
+TYPING_KEY = 'presence:typing:{room}:{user_id}'
+CONNECTIONS_KEY = 'presence:connections:{user_id}'
+
+# Upper bound for bulk lookups so a single request can't ask for the whole user table
+MAX_BULK_USER_IDS = 500
+
+
+def get_presence_ttl():
+    """Seconds a heartbeat keeps a user online"""
+    return int(getattr(settings, 'PRESENCE_TTL_SECONDS', 60))
+
+
+def get_typing_rate_limit():
+    """Minimum seconds between forwarded typing events per user and room"""
+    return float(getattr(settings, 'TYPING_RATE_LIMIT_SECONDS', 2))
+
+
+def _presence_key(user_id):
+    return PRESENCE_KEY.format(user_id=user_id)
+
+
+def _connections_key(user_id):
+    return CONNECTIONS_KEY.format(user_id=user_id)
+
+
+def _typing_key(room, user_id):
+    return TYPING_KEY.format(room=room, user_id=user_id)
+
+
+async def touch(user_id):
+    """Mark a user as online (connect / heartbeat) and return the last-seen timestamp"""
+    last_seen = timezone.now().isoformat()
+    ttl = get_presence_ttl()
+    await cache.aset(_presence_key(user_id), last_seen, timeout=ttl)
+    # The count outlives presence a little so heartbeats keep it; a crashed worker's sockets expire with it
+    await cache.atouch(_connections_key(user_id), timeout=ttl * 2)
+    return last_seen
+
+
+async def connect(user_id):
+    """Count a new socket for the user and mark them online"""
+    key = _connections_key(user_id)
+    await cache.aadd(key, 0, timeout=get_presence_ttl() * 2)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        # Expired between add and incr
+        await cache.aset(key, 1, timeout=get_presence_ttl() * 2)
+    await touch(user_id)
+
+
+async def disconnect(user_id):
+    """Uncount a closed socket; clears presence and returns True only when it was the user's last one"""
+    key = _connections_key(user_id)
+    try:
+        count = await cache.adecr(key)
+    except ValueError:
+        count = 0
+    if count > 0:
+        return False
+    await cache.adelete_many([key, _presence_key(user_id)])
+    return True
+
+
+async def allow_typing_event(room, user_id):
+    """Return True if a typing event for this user/room may be forwarded now"""
+    return await cache.aadd(_typing_key(room, user_id), True, timeout=get_typing_rate_limit())
+
+
+def get_presence(user_ids):
+    """
+    Look up presence for many users with a single cache round trip.
+
+    Returns a dict keyed by user id: {'online': bool, 'last_seen': iso string or None}
+    """
+    keys = {_presence_key(user_id): user_id for user_id in user_ids}
+    found = cache.get_many(list(keys.keys()))
+
+    presence = {}
+    for key, user_id in keys.items():
+        last_seen = found.get(key)
+        presence[user_id] = {
+            'online': last_seen is not None,
+            'last_seen': last_seen,
+        }
+    return presence
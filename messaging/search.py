@@ -0,0 +1,144 @@
+"""
+Full-text search over chat messages.
+
+PostgreSQL uses a GIN expression index on to_tsvector(content), which the
+database keeps current by itself. SQLite has no such index, so messages are
+mirrored into an FTS5 shadow table (rowid = message id) that the post_save /
+post_delete receivers in messaging.models keep in sync.
+"""
+import logging
+
+from django.db import connection, OperationalError
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'messaging_message_fts'
+PG_INDEX = 'messaging_message_content_fts'
+PG_CONFIG = 'english'
+
+MAX_RESULTS = 100
+
+
+def is_postgresql(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+def create_search_index(conn=None):
+    """Create the backend-specific index (idempotent); returns True when an SQLite shadow table is in use"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if is_postgresql(conn):
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON messaging_message "
+                f"USING GIN (to_tsvector('{PG_CONFIG}', content))"
+            )
+            return False
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(content, room_id UNINDEXED, tokenize='porter unicode61')"
+            )
+            return True
+    return False
+
+
+def drop_search_index(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if is_postgresql(conn):
+            cursor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+        elif conn.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild_search_index(conn=None):
+    """Recreate the SQLite shadow table from messaging_message; returns the number of rows indexed"""
+    conn = conn or connection
+    if not create_search_index(conn):
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, content, room_id) "
+            f"SELECT id, content, room_id FROM messaging_message"
+        )
+        return cursor.rowcount
+
+
+def index_message(message):
+    """Mirror a saved message into the SQLite shadow table (no-op on PostgreSQL)"""
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, content, room_id) VALUES (%s, %s, %s)",
+                [message.id, message.content, message.room_id]
+            )
+    except OperationalError as e:
+        # Shadow table missing (migration not applied yet); search falls back to LIKE
+        logger.warning(f"Message search index not updated for message {message.id}: {e}")
+
+
+def unindex_message(message_id):
+    """Remove a deleted message from the SQLite shadow table (no-op on PostgreSQL)"""
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [message_id])
+    except OperationalError as e:
+        logger.warning(f"Message search index not updated for message {message_id}: {e}")
+
+
+def _fts5_query(text):
+    """Quote every term so user input can't inject FTS5 operators; terms are ANDed"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+def search_messages(room_ids, text, limit=50):
+    """
+    Return up to ``limit`` messages in ``room_ids`` matching ``text``, best match first.
+
+    Callers are responsible for passing only rooms the user participates in.
+    """
+    from .models import Message
+
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    text = (text or '').strip()
+    room_ids = [int(room_id) for room_id in room_ids]
+    if not text or not room_ids:
+        return []
+
+    queryset = Message.objects.select_related('sender', 'room').filter(room_id__in=room_ids)
+
+    if is_postgresql():
+        tsquery = f"plainto_tsquery('{PG_CONFIG}', %s)"
+        document = f"to_tsvector('{PG_CONFIG}', messaging_message.content)"
+        return list(
+            queryset.filter(RawSQL(f"{document} @@ {tsquery}", [text], output_field=BooleanField()))
+            .annotate(rank=RawSQL(f"ts_rank({document}, {tsquery})", [text], output_field=FloatField()))
+            .order_by('-rank', '-timestamp')[:limit]
+        )
+
+    if connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(room_ids))
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND room_id IN ({placeholders}) "
+                    f"ORDER BY rank LIMIT %s",
+                    [_fts5_query(text), *room_ids, limit]
+                )
+                ranked_ids = [row[0] for row in cursor.fetchall()]
+        except OperationalError as e:
+            logger.warning(f"FTS5 search unavailable, falling back to LIKE: {e}")
+        else:
+            matches = queryset.in_bulk(ranked_ids)
+            return [matches[message_id] for message_id in ranked_ids if message_id in matches]
+
+    return list(queryset.filter(content__icontains=text).order_by('-timestamp')[:limit])
@@ -4,13 +4,17 @@ from .views import (
     MessageListCreateView, 
     send_message,
     list_chat_rooms,
-    get_chat_room
+    get_chat_room,
+    presence_status,
+    search_chat_messages
 )
 
 urlpatterns = [
     path('chat/start/', start_private_chat, name='start-private-chat'),
     path('chat/rooms/', list_chat_rooms, name='list-chat-rooms'),
+    path('chat/search/', search_chat_messages, name='search-chat-messages'),
     path('chat/<int:room_id>/', get_chat_room, name='get-chat-room'),
     path('chat/<int:room_id>/messages/', MessageListCreateView.as_view(), name='chat-messages'),
     path('chat/<int:room_id>/send/', send_message, name='send-message'),
+    path('presence/', presence_status, name='presence-status'),
 ]
@@ -5,6 +5,9 @@ from django.contrib.auth import get_user_model
 from .models import ChatRoom, Message
 from .serializers import ChatRoomSerializer, MessageSerializer
 from django.shortcuts import get_object_or_404
+from .presence import get_presence, MAX_BULK_USER_IDS
+from .search import search_messages
+from retention.archive import ArchivedRows, MergedHistory
 
 User = get_user_model()
 
@@ -91,6 +94,41 @@ def get_chat_room(request, room_id):
         return Response({"error": f"Chat room with ID {room_id} not found or you are not a participant"}, status=404)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search_chat_messages(request):
+    """
+    Full-text search over messages in rooms the current user participates in
+
+    Query Parameters:
+    - q: search text (required)
+    - room_id (optional): restrict the search to one room
+    - limit (optional): max results, default 50, max 100
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "q is required"}, status=400)
+
+    try:
+        limit = int(request.query_params.get('limit', 50))
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+
+    room_ids = ChatRoom.objects.filter(participants=request.user).values_list('id', flat=True)
+    room_id = request.query_params.get('room_id')
+    if room_id:
+        if not room_id.isdigit():
+            return Response({"error": "room_id must be an integer"}, status=400)
+        room_ids = room_ids.filter(id=int(room_id))
+
+    results = search_messages(list(room_ids), query, limit=limit)
+    return Response({
+        "query": query,
+        "results": MessageSerializer(results, many=True).data,
+        "count": len(results)
+    })
+
+
 class MessageListCreateView(generics.ListCreateAPIView):
     """
     List all messages in a chat room and create new messages
@@ -104,7 +142,54 @@ class MessageListCreateView(generics.ListCreateAPIView):
         room = get_object_or_404(ChatRoom, id=room_id, participants=self.request.user)
         return Message.objects.filter(room=room).order_by('timestamp')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Query Parameters:
+        - include_archived: 'true' to prepend messages moved out by the retention job
+        """
+        if request.query_params.get('include_archived', '').lower() != 'true':
+            return super().list(request, *args, **kwargs)
+
+        # Archived rows are older, so they come first; only the requested page is read from the archive
+        messages = MergedHistory(
+            ArchivedRows(Message, select_related=('sender', 'room'), scope_id=self.kwargs['room_id']),
+            self.get_queryset().select_related('sender', 'room'),
+        )
+
+        page = self.paginate_queryset(messages)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(list(messages), many=True).data)
+
     def perform_create(self, serializer):
         room_id = self.kwargs['room_id']
         room = get_object_or_404(ChatRoom, id=room_id, participants=self.request.user)
         serializer.save(sender=self.request.user, room=room)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def presence_status(request):
+    """
+    Bulk "who's online" lookup answered from the presence cache (no DB queries)
+
+    Query Parameters:
+    - user_ids: comma-separated list of user ids, e.g. ?user_ids=3,7,12
+    """
+    raw_ids = request.query_params.get('user_ids', '')
+    try:
+        user_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+    except ValueError:
+        return Response({"error": "user_ids must be a comma-separated list of integers"}, status=400)
+
+    if not user_ids:
+        return Response({"error": "user_ids is required"}, status=400)
+
+    if len(user_ids) > MAX_BULK_USER_IDS:
+        return Response({"error": f"At most {MAX_BULK_USER_IDS} user_ids can be requested at once"}, status=400)
+
+    statuses = get_presence(user_ids)
+    return Response({
+        "online": [user_id for user_id, state in statuses.items() if state['online']],
+        "presence": statuses
+    })
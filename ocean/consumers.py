@@ -25,3 +25,6 @@ class DashboardConsumer(AsyncWebsocketConsumer):
 
     async def alert_message(self, event):
         await self.send(text_data=json.dumps(event["message"]))
+
+    async def alert_batch(self, event):
+        await self.send(text_data=json.dumps({"type": "alert_batch", "alerts": event["message"]}))
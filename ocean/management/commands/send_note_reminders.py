@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ocean.utils import create_alerts
+from session.models import Session
+
+
+class Command(BaseCommand):
+    help = 'Create NOTE reminder alerts for staff with completed sessions whose notes are not finalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14, help='Look back this many days for completed sessions')
+        parser.add_argument('--dry-run', action='store_true', help='Report who would be reminded without creating alerts')
+
+    def handle(self, *args, **options):
+        since = timezone.now().date() - timedelta(days=options['days'])
+
+        # One grouped query: pending note count per staff member
+        pending = (
+            Session.objects.filter(status='completed', session_date__gte=since, staff__isnull=False)
+            .filter(Q(note_flow__isnull=True) | Q(note_flow__final_note_submitted=False))
+            .values('staff_id')
+            .annotate(pending_notes=Count('id'))
+        )
+        messages = {
+            row['staff_id']: f"You have {row['pending_notes']} session note(s) waiting to be finalized"
+            for row in pending
+        }
+
+        if not messages:
+            self.stdout.write('No pending session notes found.')
+            return
+
+        if options['dry_run']:
+            self.stdout.write(f'[DRY RUN] Would remind {len(messages)} staff member(s)')
+            return
+
+        result = create_alerts(messages.keys(), 'NOTE', messages)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reminders sent to {len(messages)} staff member(s): "
+                f"{len(result['created'])} created, {len(result['coalesced'])} coalesced"
+            )
+        )
@@ -32,6 +32,12 @@ class Alert(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves my_alerts (unread, newest first) and alert coalescing lookups
+            models.Index(fields=['user', 'is_read', '-created_at'], name='ocean_alert_user_unread_idx'),
+        ]
+
     def __str__(self):
         return f"{self.type} - {self.message[:30]}"
 
@@ -4,6 +4,10 @@ from .serializers import ChatMessageSerializer, AlertSerializer
 import openai
 from django.conf import settings
 from django.utils import timezone
+from django.db import transaction
+from collections import defaultdict
+from datetime import timedelta
+import asyncio
 import time
 import json
 
@@ -17,11 +21,101 @@ def broadcast_chat(chat):
 def broadcast_alert(alert):
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
-        f"user_{alert.user.id}",
+        f"user_{alert.user_id}",
         {"type": "alert_message", "message": AlertSerializer(alert).data}
     )
 
 
+def broadcast_alerts(alerts):
+    """
+    Push many alerts to their owners' dashboards.
+
+    Alerts are grouped per user so each user receives a single "alert_batch"
+    event, and every group_send runs inside one event-loop hop instead of one
+    async_to_sync round trip per alert.
+    """
+    alerts_by_user = defaultdict(list)
+    for alert in alerts:
+        alerts_by_user[alert.user_id].append(alert)
+
+    if not alerts_by_user:
+        return 0
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return 0
+
+    async def _send_batches():
+        await asyncio.gather(*[
+            channel_layer.group_send(
+                f"user_{user_id}",
+                {"type": "alert_batch", "message": AlertSerializer(user_alerts, many=True).data}
+            )
+            for user_id, user_alerts in alerts_by_user.items()
+        ])
+
+    async_to_sync(_send_batches)()
+    return len(alerts_by_user)
+
+
+def create_alerts(user_ids, alert_type, message, due_date=None, coalesce_window=None, broadcast=True):
+    """
+    Create alerts for many users in a fixed number of queries.
+
+    ``message`` is either one string for every user or a dict of user_id -> message.
+    An unread alert of the same type created for a user within
+    ``coalesce_window`` (a timedelta, defaults to settings.ALERT_COALESCE_WINDOW_MINUTES)
+    is refreshed with the new message/due date instead of adding a duplicate row.
+
+    Returns a dict with the created and coalesced Alert instances.
+    """
+    from .models import Alert
+
+    user_ids = list(dict.fromkeys(user_ids))
+    if isinstance(message, dict):
+        messages = message
+    else:
+        messages = dict.fromkeys(user_ids, message)
+    if not user_ids:
+        return {"created": [], "coalesced": []}
+
+    if coalesce_window is None:
+        coalesce_window = timedelta(minutes=getattr(settings, 'ALERT_COALESCE_WINDOW_MINUTES', 60))
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Latest unread alert of this type per user inside the window
+        existing = {}
+        recent = Alert.objects.filter(
+            user_id__in=user_ids,
+            type=alert_type,
+            is_read=False,
+            created_at__gte=now - coalesce_window
+        ).order_by('user_id', '-created_at')
+        for alert in recent:
+            existing.setdefault(alert.user_id, alert)
+
+        coalesced = []
+        for alert in existing.values():
+            alert.message = messages[alert.user_id]
+            alert.due_date = due_date
+            coalesced.append(alert)
+        if coalesced:
+            Alert.objects.bulk_update(coalesced, ['message', 'due_date'])
+
+        created = Alert.objects.bulk_create([
+            Alert(user_id=user_id, type=alert_type, message=messages[user_id], due_date=due_date)
+            for user_id in user_ids
+            if user_id not in existing
+        ])
+
+    if broadcast:
+        # Push only after the rows are committed so clients can fetch them by id
+        transaction.on_commit(lambda: broadcast_alerts(created + coalesced))
+
+    return {"created": created, "coalesced": coalesced}
+
+
 def save_ai_response(response_type, prompt, response, user=None, session=None, 
                      model_used=None, tokens_used=None, processing_time=None, 
                      context_data=None, is_successful=True, error_message=None):
@@ -13,6 +13,9 @@ from django.db.models import Q, Count, Avg, Sum, Case, When, IntegerField
 from django.db.models.functions import TruncWeek, TruncMonth
 from session.models import Session, GoalProgress, Incident
 from django.contrib.auth import get_user_model
+from django.http import Http404
+from retention.archive import ArchivedRows, MergedHistory, archived_instance, restore
+from session.access import bcba_client_ids
 
 CustomUser = get_user_model()
 
@@ -26,6 +29,33 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             return ChatMessage.objects.all().order_by('-created_at')
         return ChatMessage.objects.filter(user=user).order_by('-created_at')
 
+    def get_object(self):
+        """Rehydrate archived messages on a detail miss"""
+        try:
+            return super().get_object()
+        except Http404:
+            owner_id = None if self.request.user.is_superuser else self.request.user.id
+            if restore(ChatMessage, self.kwargs.get('pk'), owner_id=owner_id) is None:
+                raise
+            return super().get_object()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Query Parameters:
+        - include_archived: 'true' to append messages moved out by the retention job
+        """
+        if request.query_params.get('include_archived', '').lower() != 'true':
+            return super().list(request, *args, **kwargs)
+
+        owner_id = None if request.user.is_superuser else request.user.id
+        # Newest first, matching get_queryset; only the requested page is read from the archive
+        messages = MergedHistory(self.get_queryset(), ArchivedRows(ChatMessage, newest_first=True, owner_id=owner_id))
+
+        page = self.paginate_queryset(messages)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(list(messages), many=True).data)
+
     @action(detail=False, methods=['post'])
     def send(self, request):
         message_text = request.data.get('message', '').strip()
@@ -81,7 +111,19 @@ class AlertViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def my_alerts(self, request):
-        alerts = Alert.objects.filter(user=request.user, is_read=False)
+        """
+        Unread alerts for the current user, newest first.
+        Query Parameters:
+        - limit (optional): max alerts to return (max 200); all unread alerts when omitted
+        """
+        # Matches the (user, is_read, -created_at) index, so this is a single index range scan
+        alerts = Alert.objects.filter(user=request.user, is_read=False).order_by('-created_at')
+        if 'limit' in request.query_params:
+            try:
+                limit = min(max(int(request.query_params['limit']), 1), 200)
+            except ValueError:
+                return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            alerts = alerts[:limit]
         return Response(AlertSerializer(alerts, many=True).data)
 
     @action(detail=True, methods=['post'])
@@ -332,24 +374,7 @@ def get_client_progress_monitoring(request, client_id):
                 has_permission = True
             # BCBA can access if client is assigned or has treatment plans
             elif role_name == 'BCBA':
-                has_permission = (
-                    hasattr(client, 'assigned_bcba') and client.assigned_bcba == user
-                )
-                if not has_permission:
-                    try:
-                        from treatment_plan.models import TreatmentPlan
-                        has_treatment_plan = TreatmentPlan.objects.filter(
-                            bcba=user
-                        ).filter(
-                            Q(client_id=str(client.id)) |
-                            Q(client_id=client.username) |
-                            Q(client_id=getattr(client, 'staff_id', '')) |
-                            Q(client_name__icontains=client.name if hasattr(client, 'name') and client.name else '')
-                        ).exists()
-                        if has_treatment_plan:
-                            has_permission = True
-                    except Exception:
-                        pass
+                has_permission = client.id in bcba_client_ids(user)
             # RBT can access if they have sessions with this client
             elif role_name in ['RBT', 'BCBA']:
                 has_permission = Session.objects.filter(client=client, staff=user).exists()
@@ -900,9 +925,27 @@ class AIResponseViewSet(viewsets.ModelViewSet):
         Override to check permissions after getting the object
         This allows us to return a proper 403 instead of 404 when object exists but user lacks permission
         """
-        obj = get_object_or_404(AIResponse, pk=self.kwargs.get('pk'))
+        pk = self.kwargs.get('pk')
+        obj = AIResponse.objects.filter(pk=pk).first()
+        archived = obj is None
+        if archived:
+            # Responses moved out by the retention job are checked before being rehydrated
+            obj = archived_instance(AIResponse, pk)
+        if obj is None:
+            raise Http404("No AIResponse matches the given query.")
+        
+        if not self._has_access(obj):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You don't have permission to access this AI response.")
         
-        # Check permissions
+        if archived:
+            obj = restore(AIResponse, pk)
+            if obj is None:
+                raise Http404("No AIResponse matches the given query.")
+        return obj
+    
+    def _has_access(self, obj):
+        """Role-based access to one AI response"""
         user = self.request.user
         has_permission = False
         
@@ -942,11 +985,7 @@ class AIResponseViewSet(viewsets.ModelViewSet):
         else:
             has_permission = (obj.user == user)
         
-        if not has_permission:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("You don't have permission to access this AI response.")
-        
-        return obj
+        return bool(has_permission)
     
     def perform_create(self, serializer):
         """
@@ -962,6 +1001,7 @@ class AIResponseViewSet(viewsets.ModelViewSet):
         """
         Get all AI responses for a specific session
         Query param: session_id
+        Query param: include_archived ('true' to include responses moved out by the retention job)
         """
         session_id = request.query_params.get('session_id')
         if not session_id:
@@ -1001,7 +1041,9 @@ class AIResponseViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            responses = AIResponse.objects.filter(session_id=session_id).order_by('-created_at')
+            responses = list(AIResponse.objects.filter(session_id=session_id).order_by('-created_at'))
+            if request.query_params.get('include_archived', '').lower() == 'true':
+                responses += list(ArchivedRows(AIResponse, select_related=('user', 'session'), newest_first=True, scope_id=session.id))
             serializer = self.get_serializer(responses, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
             
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import ArchivedRecord
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model_label', 'original_id', 'owner_id', 'scope_id', 'storage', 'original_created_at', 'archived_at')
+    list_filter = ('model_label', 'storage', 'archived_at')
+    search_fields = ('model_label', 'original_id')
+    readonly_fields = [f.name for f in ArchivedRecord._meta.fields]
+    exclude = ('payload',)
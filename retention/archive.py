@@ -0,0 +1,363 @@
+"""
+Retention / archival for high-volume history tables.
+
+Rows older than a model's retention window are moved out of the hot table in
+keyset-ordered batches. Each batch is serialized with Django's "python"
+serializer and stored either
+
+- ``table``: one zlib-compressed JSON blob per row in ArchivedRecord, or
+- ``file``:  one JSONL.gz file per batch under RETENTION_ARCHIVE_DIR, with an
+  ArchivedRecord index row (no payload) per archived row.
+
+The source rows are deleted in the same transaction that writes the archive
+rows, so a failed batch leaves the hot table untouched.
+
+Reads stay on the existing endpoints: list views page through live and
+archived rows together with ``MergedHistory``/``ArchivedRows`` (only the
+requested page is decompressed) when asked for history, and detail views call
+``restore()`` on a miss, which puts the row back in its original table with
+its original id and timestamps.
+"""
+import gzip
+import json
+import logging
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ArchiveSpec:
+    """How a model is archived: its age column and the columns endpoints filter on"""
+    date_field: str
+    owner_field: str = None
+    scope_field: str = None
+
+
+ARCHIVABLE_MODELS = {
+    'messaging.Message': ArchiveSpec(date_field='timestamp', owner_field='sender_id', scope_field='room_id'),
+    'ocean.ChatMessage': ArchiveSpec(date_field='created_at', owner_field='user_id'),
+    'ocean.AIResponse': ArchiveSpec(date_field='created_at', owner_field='user_id', scope_field='session_id'),
+}
+
+
+def get_policy(model_label):
+    """Return {'days': int or None, 'storage': 'table'|'file'} for a model"""
+    policies = getattr(settings, 'RETENTION_POLICIES', {})
+    policy = dict(policies.get(model_label) or {})
+    policy.setdefault('days', None)
+    policy.setdefault('storage', 'table')
+    return policy
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'RETENTION_ARCHIVE_DIR', os.path.join(settings.PRIVATE_MEDIA_ROOT, 'archive')))
+
+
+def _label(model):
+    return model._meta.label
+
+
+def _spec(model):
+    try:
+        return ARCHIVABLE_MODELS[_label(model)]
+    except KeyError:
+        raise ValueError(f"{_label(model)} is not archivable")
+
+
+def _serialize(instances):
+    return serializers.serialize('python', instances)
+
+
+def _deserialize(data):
+    return next(serializers.deserialize('python', [data]))
+
+
+def _compress(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8'))
+
+
+def _decompress(payload):
+    return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+
+def _write_batch_file(model, rows):
+    """Write one batch as JSONL.gz and return its path relative to the archive dir"""
+    label = _label(model).lower().replace('.', '_')
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    relative_path = os.path.join(label, f"{stamp}-{rows[0]['pk']}-{rows[-1]['pk']}.jsonl.gz")
+    full_path = os.path.join(get_archive_dir(), relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with gzip.open(full_path, 'wt', encoding='utf-8') as handle:
+        for row in rows:
+            handle.write(json.dumps(row, cls=DjangoJSONEncoder))
+            handle.write('\n')
+    return relative_path
+
+
+def _read_batch_file(relative_path):
+    """Return {pk: serialized row} for one archive file"""
+    rows = {}
+    with gzip.open(os.path.join(get_archive_dir(), relative_path), 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                row = json.loads(line)
+                rows[row['pk']] = row
+    return rows
+
+
+def _archived_rows(records):
+    """Decode ArchivedRecords into serialized rows, opening each archive file once"""
+    file_cache = {}
+    rows = []
+    for record in records:
+        if record.payload is not None:
+            rows.append(_decompress(record.payload))
+            continue
+        if record.archive_file not in file_cache:
+            try:
+                file_cache[record.archive_file] = _read_batch_file(record.archive_file)
+            except OSError as e:
+                logger.error(f"Archive file {record.archive_file} unreadable: {e}")
+                file_cache[record.archive_file] = {}
+        row = file_cache[record.archive_file].get(record.original_id)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def archive_model(model, days=None, storage=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Archive rows of ``model`` older than ``days`` (defaults to the configured policy).
+
+    Returns the number of rows archived (or that would be, with dry_run).
+    """
+    spec = _spec(model)
+    policy = get_policy(_label(model))
+    days = policy['days'] if days is None else days
+    storage = storage or policy['storage']
+    if not days:
+        return 0
+    if storage not in dict(ArchivedRecord.STORAGE_CHOICES):
+        raise ValueError(f"Unknown storage '{storage}'")
+
+    cutoff = timezone.now() - timedelta(days=int(days))
+    queryset = model._default_manager.filter(**{f'{spec.date_field}__lt': cutoff}).order_by('pk')
+    if dry_run:
+        return queryset.count()
+
+    archived = 0
+    last_pk = 0
+    while True:
+        # Keyset pagination: archived rows are deleted, so pk__gt never skips or repeats
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        archived += _archive_batch(model, spec, storage, batch)
+    return archived
+
+
+def _archive_batch(model, spec, storage, batch):
+    label = _label(model)
+    rows = _serialize(batch)
+    archive_file = _write_batch_file(model, rows) if storage == 'file' else None
+
+    records = [
+        ArchivedRecord(
+            model_label=label,
+            original_id=instance.pk,
+            owner_id=getattr(instance, spec.owner_field) if spec.owner_field else None,
+            scope_id=getattr(instance, spec.scope_field) if spec.scope_field else None,
+            original_created_at=getattr(instance, spec.date_field),
+            storage=storage,
+            payload=_compress(row) if storage == 'table' else None,
+            archive_file=archive_file,
+        )
+        for instance, row in zip(batch, rows)
+    ]
+
+    try:
+        with transaction.atomic():
+            ArchivedRecord.objects.bulk_create(records)
+            model._default_manager.filter(pk__in=[instance.pk for instance in batch]).delete()
+    except Exception:
+        if archive_file:
+            os.remove(os.path.join(get_archive_dir(), archive_file))
+        raise
+    return len(batch)
+
+
+def _archived_records(model, owner_id=None, scope_id=None, since=None, until=None):
+    records = ArchivedRecord.objects.filter(model_label=_label(model))
+    if owner_id is not None:
+        records = records.filter(owner_id=owner_id)
+    if scope_id is not None:
+        records = records.filter(scope_id=scope_id)
+    if since is not None:
+        records = records.filter(original_created_at__gte=since)
+    if until is not None:
+        records = records.filter(original_created_at__lt=until)
+    return records
+
+
+def archived_instances(model, owner_id=None, scope_id=None, since=None, until=None, select_related=(),
+                       offset=0, limit=None, newest_first=False):
+    """
+    Return unsaved instances of archived ``model`` rows, oldest first (or newest first).
+
+    Filters, ordering and ``offset``/``limit`` are applied to the ArchivedRecord
+    query, so only the requested rows are decompressed. ``select_related`` names
+    FK fields to attach with one in_bulk query each, so serializers don't issue a
+    query per archived row.
+    """
+    records = _archived_records(model, owner_id, scope_id, since, until)
+    ordering = ('-original_created_at', '-original_id') if newest_first else ('original_created_at', 'original_id')
+    records = records.order_by(*ordering)[offset:offset + limit if limit is not None else None]
+
+    instances = [_deserialize(row).object for row in _archived_rows(records)]
+
+    for field_name in select_related:
+        field = model._meta.get_field(field_name)
+        related = field.related_model._default_manager.in_bulk(
+            {getattr(instance, field.attname) for instance in instances if getattr(instance, field.attname)}
+        )
+        for instance in instances:
+            setattr(instance, field_name, related.get(getattr(instance, field.attname)))
+
+    return instances
+
+
+class ArchivedRows:
+    """
+    Lazy, sliceable archived rows for paginators: ``count()`` is one COUNT on
+    ArchivedRecord and a slice decompresses only that slice.
+    """
+
+    def __init__(self, model, select_related=(), newest_first=False, **filters):
+        self.model = model
+        self.select_related = select_related
+        self.newest_first = newest_first
+        self.filters = filters
+
+    def count(self):
+        return _archived_records(self.model, **self.filters).count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('ArchivedRows only supports [start:stop] slices')
+        start = index.start or 0
+        limit = None if index.stop is None else max(index.stop - start, 0)
+        return archived_instances(
+            self.model, select_related=self.select_related, offset=start, limit=limit,
+            newest_first=self.newest_first, **self.filters,
+        )
+
+    def __iter__(self):
+        return iter(self[0:None])
+
+
+class MergedHistory:
+    """
+    ``parts`` (querysets / ArchivedRows) read as one list, in order, for
+    list views that page through live and archived rows together. Slicing
+    only fetches the part(s) the slice touches.
+    """
+
+    def __init__(self, *parts):
+        self.parts = parts
+        self._counts = None
+
+    def _part_counts(self):
+        if self._counts is None:
+            self._counts = [part.count() for part in self.parts]
+        return self._counts
+
+    def count(self):
+        return sum(self._part_counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('MergedHistory only supports [start:stop] slices')
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        rows = []
+        offset = 0
+        for part, size in zip(self.parts, self._part_counts()):
+            lo, hi = max(start - offset, 0), min(stop - offset, size)
+            if lo < hi:
+                rows.extend(part[lo:hi])
+            offset += size
+        return rows
+
+    def __iter__(self):
+        return iter(self[0:None])
+
+
+def _archived_record(model, pk, owner_id=None):
+    records = ArchivedRecord.objects.filter(model_label=_label(model), original_id=pk)
+    if owner_id is not None:
+        records = records.filter(owner_id=owner_id)
+    return records.first()
+
+
+def archived_instance(model, pk, owner_id=None):
+    """
+    Unsaved instance of one archived row, without restoring it; None if not archived.
+
+    Lets views run their permission checks before ``restore()`` changes anything.
+    """
+    record = _archived_record(model, pk, owner_id)
+    rows = _archived_rows([record]) if record is not None else []
+    return _deserialize(rows[0]).object if rows else None
+
+
+def restore(model, pk, owner_id=None):
+    """
+    Move one archived row back into its table (lazy rehydration).
+
+    Returns the restored instance, or None if nothing matching is archived.
+    The row keeps its original id and timestamps; it becomes eligible for
+    archiving again on the next retention run. Callers must have checked
+    access first (``owner_id`` or ``archived_instance()``).
+    """
+    record = _archived_record(model, pk, owner_id)
+    if record is None:
+        return None
+
+    rows = _archived_rows([record])
+    if not rows:
+        return None
+
+    with transaction.atomic():
+        restored = _deserialize(rows[0])
+        # Raw save: the original auto_now / auto_now_add values are kept
+        restored.save()
+        record.delete()
+    return model._default_manager.get(pk=pk)
+
+
+def apply_retention(model_labels=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Run every configured policy (or just ``model_labels``); returns {label: rows archived}"""
+    results = {}
+    for label in model_labels or ARCHIVABLE_MODELS:
+        model = apps.get_model(label)
+        results[label] = archive_model(model, batch_size=batch_size, dry_run=dry_run)
+    return results
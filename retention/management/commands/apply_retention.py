@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from retention.archive import ARCHIVABLE_MODELS, DEFAULT_BATCH_SIZE, apply_retention, get_policy
+
+
+class Command(BaseCommand):
+    help = 'Move rows older than their retention policy into the archive (see RETENTION_POLICIES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models', choices=list(ARCHIVABLE_MODELS),
+            help='Only archive this model (repeatable); defaults to every configured model'
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows archived per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        results = apply_retention(options['models'], batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        prefix = '[DRY RUN] Would archive' if options['dry_run'] else 'Archived'
+        for label, count in results.items():
+            policy = get_policy(label)
+            if not policy['days']:
+                self.stdout.write(f'{label}: retention disabled')
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(f"{label}: {prefix} {count} row(s) older than {policy['days']} day(s) ({policy['storage']})")
+            )
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(help_text='Source model, e.g. messaging.Message', max_length=100)),
+                ('original_id', models.BigIntegerField()),
+                ('owner_id', models.BigIntegerField(blank=True, help_text='User the row belonged to', null=True)),
+                ('scope_id', models.BigIntegerField(blank=True, help_text='Room/session the row belonged to', null=True)),
+                ('original_created_at', models.DateTimeField()),
+                ('storage', models.CharField(choices=[('table', 'Compressed table'), ('file', 'JSONL.gz file')], default='table', max_length=10)),
+                ('payload', models.BinaryField(blank=True, null=True)),
+                ('archive_file', models.CharField(blank=True, max_length=255, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Record',
+                'verbose_name_plural': 'Archived Records',
+                'ordering': ['original_created_at'],
+                'indexes': [models.Index(fields=['model_label', 'scope_id', 'original_created_at'], name='retention_scope_idx'), models.Index(fields=['model_label', 'owner_id', 'original_created_at'], name='retention_owner_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model_label', 'original_id'), name='retention_unique_archived_row')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class ArchivedRecord(models.Model):
+    """
+    A row moved out of a hot table by the retention job.
+
+    The original row is stored either zlib-compressed in ``payload`` or as one
+    line of a JSONL.gz file under RETENTION_ARCHIVE_DIR (``archive_file``).
+    ``owner_id`` and ``scope_id`` copy the columns the existing endpoints filter
+    on (user, room, session) so archived rows can be found without
+    decompressing anything.
+    """
+    STORAGE_CHOICES = [
+        ('table', 'Compressed table'),
+        ('file', 'JSONL.gz file'),
+    ]
+
+    model_label = models.CharField(max_length=100, help_text="Source model, e.g. messaging.Message")
+    original_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True, blank=True, help_text="User the row belonged to")
+    scope_id = models.BigIntegerField(null=True, blank=True, help_text="Room/session the row belonged to")
+    original_created_at = models.DateTimeField()
+    storage = models.CharField(max_length=10, choices=STORAGE_CHOICES, default='table')
+    payload = models.BinaryField(null=True, blank=True)
+    archive_file = models.CharField(max_length=255, blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['original_created_at']
+        verbose_name = "Archived Record"
+        verbose_name_plural = "Archived Records"
+        constraints = [
+            models.UniqueConstraint(fields=['model_label', 'original_id'], name='retention_unique_archived_row'),
+        ]
+        indexes = [
+            models.Index(fields=['model_label', 'scope_id', 'original_created_at'], name='retention_scope_idx'),
+            models.Index(fields=['model_label', 'owner_id', 'original_created_at'], name='retention_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label} #{self.original_id} ({self.get_storage_display()})"
@@ -19,6 +19,9 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/sapphire/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Private files (payroll exports, retention archives): never under MEDIA_ROOT, only served through authenticated views
+PRIVATE_MEDIA_ROOT = os.getenv('PRIVATE_MEDIA_ROOT', str(BASE_DIR / 'private_media'))
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-change-this-in-production')
 
@@ -54,6 +57,7 @@ LOCAL_APPS = [
     'messaging',
     'ocean',
     'treatment_plan',
+    'retention',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS + ['django_crontab']
@@ -178,13 +182,90 @@ CORS_ALLOW_CREDENTIALS = True
 # Role Permissions
 ROLEPERMISSIONS_MODULE = 'api.roles'
 
-# Channels configuration
+# Channels configuration.
+# InMemoryChannelLayer only reaches sockets on the same process: session timer updates
+# (session/timer.py) and messaging broadcasts sent from another worker are lost. Multi-worker
+# deployments need a shared layer such as channels_redis (system check session.W001).
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     },
 }
 
+# Cache configuration (presence state and short-lived API caches).
+# LocMemCache is per-process; point CACHE_BACKEND at Redis/Memcached when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'sapphire-default'),
+    },
+}
+# Caches invalidated on write (BCBA access scopes, time tracker summaries) are skipped on a
+# process-local backend unless this deployment runs a single worker (session/shared_cache.py)
+CACHE_SINGLE_PROCESS = os.getenv('CACHE_SINGLE_PROCESS', 'False') == 'True'
+
+# Messaging presence / typing indicators
+PRESENCE_TTL_SECONDS = int(os.getenv('PRESENCE_TTL_SECONDS', '60'))
+TYPING_RATE_LIMIT_SECONDS = float(os.getenv('TYPING_RATE_LIMIT_SECONDS', '2'))
+
+# Ocean alerts: unread alerts of the same type for a user inside this window are coalesced
+ALERT_COALESCE_WINDOW_MINUTES = int(os.getenv('ALERT_COALESCE_WINDOW_MINUTES', '60'))
+
+# Seconds a BCBA's resolved client scope (session/access.py) stays cached
+BCBA_ACCESS_SCOPE_TTL_SECONDS = int(os.getenv('BCBA_ACCESS_SCOPE_TTL_SECONDS', '300'))
+
+# Default working hours for scheduler free-slot searches (HH:MM)
+SCHEDULING_DAY_START = os.getenv('SCHEDULING_DAY_START', '08:00')
+SCHEDULING_DAY_END = os.getenv('SCHEDULING_DAY_END', '18:00')
+
+# Staff utilization planner (session/utilization.py): weekly target hours and flag thresholds
+# (ratio of booked hours to target), plus how long a closed week's aggregates stay cached
+UTILIZATION_TARGET_HOURS = float(os.getenv('UTILIZATION_TARGET_HOURS', '30'))
+UTILIZATION_OVER_RATIO = float(os.getenv('UTILIZATION_OVER_RATIO', '1.1'))
+UTILIZATION_UNDER_RATIO = float(os.getenv('UTILIZATION_UNDER_RATIO', '0.8'))
+UTILIZATION_CACHE_TTL_SECONDS = int(os.getenv('UTILIZATION_CACHE_TTL_SECONDS', '86400'))
+
+# Maximum number of clients proposed per RBT by scheduler/assignment.py
+RBT_MAX_CASELOAD = int(os.getenv('RBT_MAX_CASELOAD', '10'))
+
+# Seconds a time tracker summary (session/time_tracking.py) stays cached; writes invalidate it sooner
+TIME_TRACKER_SUMMARY_TTL_SECONDS = int(os.getenv('TIME_TRACKER_SUMMARY_TTL_SECONDS', '300'))
+
+# Payroll/billing export (session/billing.py): minutes per billing unit and default rounding
+# rule (cms_8_minute, up, down or nearest)
+BILLING_UNIT_MINUTES = int(os.getenv('BILLING_UNIT_MINUTES', '15'))
+BILLING_ROUNDING = os.getenv('BILLING_ROUNDING', 'cms_8_minute')
+
+# Seconds dashboard statistics (session/statistics.py) are cached per role scope
+STATISTICS_CACHE_TTL_SECONDS = int(os.getenv('STATISTICS_CACHE_TTL_SECONDS', '60'))
+
+# Largest page_size any session list endpoint will return (session/pagination.py)
+SESSION_MAX_PAGE_SIZE = int(os.getenv('SESSION_MAX_PAGE_SIZE', '100'))
+
+# Generate an AI summary note in the background when a session is finalized (session/finalize.py)
+FINALIZE_AI_NOTES = os.getenv('FINALIZE_AI_NOTES', 'False').lower() == 'true'
+
+# Maximum operations accepted in one offline batch sync request (session/sync.py)
+SYNC_MAX_OPERATIONS = int(os.getenv('SYNC_MAX_OPERATIONS', '500'))
+
+# Retention: rows older than `days` are moved to the archive by `manage.py apply_retention`
+# (days=0 disables a policy). storage is 'table' (compressed rows) or 'file' (JSONL.gz under PRIVATE_MEDIA_ROOT)
+RETENTION_POLICIES = {
+    'messaging.Message': {
+        'days': int(os.getenv('RETENTION_MESSAGE_DAYS', '365')),
+        'storage': os.getenv('RETENTION_MESSAGE_STORAGE', 'table'),
+    },
+    'ocean.ChatMessage': {
+        'days': int(os.getenv('RETENTION_CHAT_MESSAGE_DAYS', '180')),
+        'storage': os.getenv('RETENTION_CHAT_MESSAGE_STORAGE', 'table'),
+    },
+    'ocean.AIResponse': {
+        'days': int(os.getenv('RETENTION_AI_RESPONSE_DAYS', '90')),
+        'storage': os.getenv('RETENTION_AI_RESPONSE_STORAGE', 'file'),
+    },
+}
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', os.path.join(PRIVATE_MEDIA_ROOT, 'archive'))
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
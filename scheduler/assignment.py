@@ -0,0 +1,261 @@
+"""
+RBT auto-assignment proposals.
+
+Unassigned clients are matched to RBTs on four scores in [0, 1]:
+
+- caseload: room left under the RBT's maximum caseload (updated as proposals are made)
+- location: same ZIP / ZIP area / city / state, or telehealth on both sides
+- preference: overlap of the client's and RBT's preferred time of day
+- availability: share of the client's preferred window the RBT has free on
+  their scheduler calendar over the look-ahead horizon
+
+Everything that doesn't depend on the pair (caseloads, per-RBT free minutes
+per window, location keys) is computed up front with a handful of queries,
+so scoring a pair is a few arithmetic operations. Clients are placed
+most-constrained first, each taking the best RBT that still has room.
+"""
+from datetime import time, timedelta
+import heapq
+import re
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .availability import load_intervals, time_length
+
+DEFAULT_WEIGHTS = {'caseload': 0.3, 'location': 0.3, 'preference': 0.1, 'availability': 0.3}
+DEFAULT_HORIZON_DAYS = 14
+
+TIME_WINDOWS = {
+    'morning': (time(8), time(12)),
+    'afternoon': (time(12), time(17)),
+    'evening': (time(17), time(20)),
+}
+_RANGE = re.compile(r'(\d{1,2}):?(\d{2})?\s*-\s*(\d{1,2}):?(\d{2})?')
+
+
+def get_max_caseload():
+    return int(getattr(settings, 'RBT_MAX_CASELOAD', 10))
+
+
+def parse_windows(preference):
+    """'Morning', 'morning/afternoon' or '09:00-12:00' -> list of (start, end); [] if unknown"""
+    if not preference:
+        return []
+    text = preference.lower()
+    windows = [window for name, window in TIME_WINDOWS.items() if name in text]
+    if not windows:
+        match = _RANGE.search(text)
+        if match:
+            start = time(min(int(match.group(1)), 23), int(match.group(2) or 0))
+            end = time(min(int(match.group(3)), 23), int(match.group(4) or 0))
+            if end > start:
+                windows.append((start, end))
+    return windows
+
+
+def _window_minutes(windows):
+    return sum(time_length(start, end).total_seconds() / 60 for start, end in windows)
+
+
+def _overlap_minutes(first, second):
+    total = 0
+    for start_a, end_a in first:
+        for start_b, end_b in second:
+            start, end = max(start_a, start_b), min(end_a, end_b)
+            if end > start:
+                total += time_length(start, end).total_seconds() / 60
+    return total
+
+
+def _is_remote(user):
+    return bool(user.preferred_session_telehealth) or 'tele' in (user.service_location or '').lower()
+
+
+def _location_key(user):
+    zip_code = (user.zip_code or '').strip()
+    return (
+        zip_code,
+        zip_code[:3],
+        (user.city or '').strip().lower(),
+        (user.state or '').strip().lower(),
+    )
+
+
+def location_score(client, client_key, rbt, rbt_key):
+    """(score, reason) for travelling between client and RBT"""
+    if _is_remote(client):
+        if rbt.telehealth:
+            return 1.0, 'Telehealth client and telehealth-enabled RBT'
+        return 0.3, 'Client prefers telehealth; RBT is not telehealth-enabled'
+    zip_code, zip_area, city, state = client_key
+    if zip_code and zip_code == rbt_key[0]:
+        return 1.0, f'Same ZIP code ({zip_code})'
+    if len(zip_area) == 3 and zip_area == rbt_key[1]:
+        return 0.7, f'Same ZIP area ({zip_area}xx)'
+    if city and city == rbt_key[2] and state == rbt_key[3]:
+        return 0.6, f'Same city ({client.city})'
+    if state and state == rbt_key[3]:
+        return 0.3, f'Same state ({client.state})'
+    if not (zip_code or city or state) or not any(rbt_key):
+        return 0.5, 'Location unknown for client or RBT'
+    return 0.0, 'Different area'
+
+
+class RBTProfile:
+    """Pair-independent facts about one RBT"""
+
+    def __init__(self, rbt, caseload, day_indexes, days):
+        self.rbt = rbt
+        self.caseload = caseload
+        self.location_key = _location_key(rbt)
+        self.windows = parse_windows(rbt.preferred_session_time)
+        self._day_indexes = day_indexes
+        self._days = days
+        self._free = {}
+
+    def free_ratio(self, windows):
+        """Share of ``windows`` (on every horizon day) not covered by scheduler sessions"""
+        key = tuple(windows)
+        if key not in self._free:
+            total = _window_minutes(windows) * len(self._days)
+            free = 0
+            for day in self._days:
+                index = self._day_indexes.get((self.rbt.id, day))
+                for start, end in windows:
+                    if index is None:
+                        free += time_length(start, end).total_seconds() / 60
+                    else:
+                        free += sum(time_length(s, e).total_seconds() / 60 for s, e in index.free_slots(start, end))
+            self._free[key] = free / total if total else 0.0
+        return self._free[key]
+
+
+def current_caseloads(rbt_ids):
+    """{rbt_id: assigned clients} in one grouped query; RBTs without clients are omitted"""
+    from api.models import CustomUser
+
+    return dict(
+        CustomUser.objects.filter(assigned_rbt_id__in=rbt_ids)
+        .values('assigned_rbt_id').annotate(total=Count('id')).values_list('assigned_rbt_id', 'total')
+    )
+
+
+def build_profiles(rbts, horizon_days=DEFAULT_HORIZON_DAYS, start_date=None):
+    """RBTProfile per RBT: one grouped caseload query and one interval query"""
+    start_date = start_date or timezone.now().date()
+    # Weekdays only: weekend gaps would make everyone look available
+    days = [start_date + timedelta(days=offset) for offset in range(horizon_days)]
+    days = [day for day in days if day.weekday() < 5]
+
+    rbt_ids = [rbt.id for rbt in rbts]
+    caseloads = current_caseloads(rbt_ids)
+    day_indexes = dict(load_intervals(rbt_ids, start_date, start_date + timedelta(days=horizon_days))) if days else {}
+    return [RBTProfile(rbt, caseloads.get(rbt.id, 0), day_indexes, days) for rbt in rbts]
+
+
+def score_pair(client, client_key, client_windows, profile, weights):
+    """Pair scores without the caseload part (that changes as proposals are made)"""
+    location, location_reason = location_score(client, client_key, profile.rbt, profile.location_key)
+
+    if client_windows and profile.windows:
+        preference = min(1.0, _overlap_minutes(client_windows, profile.windows) / _window_minutes(client_windows))
+        preference_reason = f"Preferred times overlap {round(preference * 100)}%"
+    else:
+        preference = 0.5
+        preference_reason = 'No time preference on file for client or RBT'
+
+    windows = client_windows or [(start, end) for start, end in TIME_WINDOWS.values()]
+    availability = profile.free_ratio(windows)
+    window_label = client.preferred_session_time if client_windows else 'working hours'
+    availability_reason = f"{round(availability * 100)}% of {window_label} free over the next {len(profile._days)} weekdays"
+
+    static = weights['location'] * location + weights['preference'] * preference + weights['availability'] * availability
+    return static, {
+        'location': (round(location, 3), location_reason),
+        'preference': (round(preference, 3), preference_reason),
+        'availability': (round(availability, 3), availability_reason),
+    }
+
+
+def propose_assignments(clients, rbts, max_caseload=None, weights=None,
+                        horizon_days=DEFAULT_HORIZON_DAYS, alternatives=2):
+    """
+    Propose one RBT per client.
+
+    Returns {'proposals': [...], 'unassigned': [...]} where each proposal has
+    the score, per-component scores with reasons and the runner-up RBTs.
+    """
+    max_caseload = max_caseload or get_max_caseload()
+    weights = weights or DEFAULT_WEIGHTS
+    profiles = build_profiles(list(rbts), horizon_days)
+    loads = {profile.rbt.id: profile.caseload for profile in profiles}
+
+    # Clients with the same location/telehealth/time preferences score identically
+    # against every RBT, so each distinct profile is scored once
+    by_signature = {}
+    scored = []
+    for client in clients:
+        client_key = _location_key(client)
+        client_windows = parse_windows(client.preferred_session_time)
+        signature = (_is_remote(client), client_key, tuple(client_windows))
+        if signature not in by_signature:
+            pairs = [score_pair(client, client_key, client_windows, profile, weights) for profile in profiles]
+            by_signature[signature] = ([static for static, _ in pairs], [components for _, components in pairs])
+        scored.append((client, by_signature[signature]))
+
+    # Most constrained first: clients whose best option is weakest choose before the rest
+    scored.sort(key=lambda item: max(item[1][0], default=0))
+
+    caseload_weight = weights['caseload']
+    proposals, unassigned = [], []
+    for client, (statics, components_list) in scored:
+        ranked = heapq.nlargest(
+            1 + alternatives,
+            (
+                (static + caseload_weight * (1 - loads[profile.rbt.id] / max_caseload), -loads[profile.rbt.id], -profile.rbt.id, position)
+                for position, (profile, static) in enumerate(zip(profiles, statics))
+                if loads[profile.rbt.id] < max_caseload
+            ),
+        )
+        if not ranked:
+            unassigned.append({'client_id': client.id, 'client_name': client.name or client.username,
+                               'reason': 'Every RBT is at maximum caseload'})
+            continue
+
+        score, _, _, position = ranked[0]
+        profile = profiles[position]
+        load = loads[profile.rbt.id]
+        loads[profile.rbt.id] += 1
+        components = dict(components_list[position])
+        components['caseload'] = (round(1 - load / max_caseload, 3), f'Caseload {load}/{max_caseload} before this assignment')
+        proposals.append({
+            'client_id': client.id,
+            'client_name': client.name or client.username,
+            'rbt_id': profile.rbt.id,
+            'rbt_name': profile.rbt.name or profile.rbt.username,
+            'score': round(score, 3),
+            'components': {name: {'score': value, 'reason': reason} for name, (value, reason) in components.items()},
+            'explanation': '; '.join(reason for _, reason in components.values()),
+            'alternatives': [
+                {'rbt_id': profiles[item[3]].rbt.id, 'rbt_name': profiles[item[3]].rbt.name or profiles[item[3]].rbt.username,
+                 'score': round(item[0], 3)}
+                for item in ranked[1:]
+            ],
+        })
+
+    proposals.sort(key=lambda proposal: proposal['client_id'])
+    return {'proposals': proposals, 'unassigned': unassigned, 'weights': weights, 'max_caseload': max_caseload}
+
+
+def assignment_candidates(admin=None):
+    """(unassigned clients, active RBTs), limited to ``admin``'s supervisees when given"""
+    from api.models import CustomUser
+
+    clients = CustomUser.objects.filter(role__name='Clients/Parent', assigned_rbt__isnull=True)
+    rbts = CustomUser.objects.filter(role__name='RBT').filter(Q(status='Active') | Q(status__isnull=True))
+    if admin is not None:
+        clients = clients.filter(supervisor=admin)
+        rbts = rbts.filter(supervisor=admin)
+    return clients.order_by('id'), rbts.order_by('id')
@@ -0,0 +1,126 @@
+"""
+Staff availability and conflict detection for scheduler sessions.
+
+Sessions are intervals on a (staff, session_date) line. Single checks go to
+the database, where the (staff, session_date, start_time) index turns the
+overlap test into a short range scan. Bulk work (free-slot search, recurring
+series) loads every interval in the range with one query and answers from a
+per-day sorted index with binary search.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+
+from .models import Session
+
+
+def get_working_hours():
+    """(day_start, day_end) used when a free-slot request doesn't specify them"""
+    day_start = getattr(settings, 'SCHEDULING_DAY_START', '08:00')
+    day_end = getattr(settings, 'SCHEDULING_DAY_END', '18:00')
+    return time.fromisoformat(day_start), time.fromisoformat(day_end)
+
+
+def find_conflicts(staff_id, session_date, start_time, end_time, exclude_id=None):
+    """Sessions of ``staff_id`` on ``session_date`` overlapping [start_time, end_time)"""
+    conflicts = Session.objects.filter(
+        staff_id=staff_id,
+        session_date=session_date,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    )
+    if exclude_id:
+        conflicts = conflicts.exclude(id=exclude_id)
+    return conflicts
+
+
+class IntervalIndex:
+    """
+    Sorted intervals for one staff member on one day.
+
+    ``max_end[i]`` is the latest end among the first i+1 intervals, so an
+    overlap test is one bisect even if legacy data already overlaps.
+    """
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals)
+        self._rebuild()
+
+    def _rebuild(self):
+        self.starts = [start for start, _ in self.intervals]
+        self.max_end = []
+        latest = None
+        for _, end in self.intervals:
+            latest = end if latest is None or end > latest else latest
+            self.max_end.append(latest)
+
+    def overlaps(self, start, end):
+        # Intervals starting before `end` are candidates; the latest of their ends decides
+        position = bisect_left(self.starts, end)
+        return position > 0 and self.max_end[position - 1] > start
+
+    def add(self, start, end):
+        insort(self.intervals, (start, end))
+        self._rebuild()
+
+    def free_slots(self, day_start, day_end, min_length=timedelta(0)):
+        """Gaps between day_start and day_end not covered by any interval (sweep)"""
+        slots = []
+        cursor = day_start
+        for start, end in self.intervals:
+            if end <= cursor:
+                continue
+            if start >= day_end:
+                break
+            if start > cursor:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < day_end:
+            slots.append((cursor, day_end))
+        return [(start, end) for start, end in slots if time_length(start, end) >= min_length]
+
+
+def time_length(start, end):
+    """Length of a same-day start/end time pair as a timedelta"""
+    return datetime.combine(datetime.min, end) - datetime.combine(datetime.min, start)
+
+
+def load_intervals(staff_ids, start_date, end_date):
+    """One query: {(staff_id, date): IntervalIndex} for every session in the range"""
+    grouped = defaultdict(list)
+    rows = Session.objects.filter(
+        staff_id__in=staff_ids,
+        session_date__gte=start_date,
+        session_date__lte=end_date,
+    ).values_list('staff_id', 'session_date', 'start_time', 'end_time')
+    for staff_id, session_date, start_time, end_time in rows:
+        grouped[(staff_id, session_date)].append((start_time, end_time))
+    return defaultdict(IntervalIndex, {key: IntervalIndex(intervals) for key, intervals in grouped.items()})
+
+
+def free_slots(staff_id, start_date, days, day_start=None, day_end=None, min_minutes=0):
+    """
+    Free time for one staff member over ``days`` days starting at ``start_date``.
+
+    Returns a list of {'date', 'start_time', 'end_time', 'minutes'} dicts.
+    """
+    default_start, default_end = get_working_hours()
+    day_start = day_start or default_start
+    day_end = day_end or default_end
+    end_date = start_date + timedelta(days=days - 1)
+    index = load_intervals([staff_id], start_date, end_date)
+    min_length = timedelta(minutes=min_minutes)
+
+    slots = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        for start, end in index[(staff_id, day)].free_slots(day_start, day_end, min_length):
+            slots.append({
+                'date': day,
+                'start_time': start,
+                'end_time': end,
+                'minutes': int(time_length(start, end).total_seconds() // 60),
+            })
+    return slots
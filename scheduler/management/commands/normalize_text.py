@@ -0,0 +1,51 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from scheduler.normalization import NORMALIZED_FIELDS, normalize_instance
+
+
+class Command(BaseCommand):
+    help = 'Normalize stored text (NFC, strip surrogates/control characters) in batches; safe to re-run or resume'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', choices=sorted(NORMALIZED_FIELDS),
+            help='Model label to normalize (repeatable, default: all)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows read and updated per batch')
+        parser.add_argument('--after-pk', type=int, default=0, help='Resume after this primary key (printed after each batch)')
+        parser.add_argument('--dry-run', action='store_true', help='Report rows that would change without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        labels = options['model'] or sorted(NORMALIZED_FIELDS)
+        if options['after_pk'] and len(labels) > 1:
+            raise CommandError('--after-pk needs a single --model')
+
+        for label in labels:
+            model = apps.get_model(label)
+            fields = NORMALIZED_FIELDS[label]
+            scanned, changed = self._normalize(model, fields, batch_size, options['after_pk'], options['dry_run'])
+            prefix = '[DRY RUN] Would update' if options['dry_run'] else 'Updated'
+            self.stdout.write(self.style.SUCCESS(f'{label}: {prefix} {changed} of {scanned} row(s)'))
+
+    def _normalize(self, model, fields, batch_size, last_pk, dry_run):
+        scanned = changed = 0
+        queryset = model._base_manager.only('pk', *fields).order_by('pk')
+        while True:
+            # Keyset batches: a restart with --after-pk picks up exactly where this stopped
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return scanned, changed
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            dirty = [instance for instance in batch if normalize_instance(instance, fields)]
+            if dirty and not dry_run:
+                # bulk_update bypasses save(), signals and history: this is a data fix, not an edit
+                with transaction.atomic():
+                    model._base_manager.bulk_update(dirty, fields)
+            changed += len(dirty)
+            self.stdout.write(f'  {model._meta.label}: scanned through pk {last_pk} ({changed} changed)')
@@ -0,0 +1,53 @@
+import time as clock
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import CustomUser
+from scheduler.assignment import DEFAULT_HORIZON_DAYS, assignment_candidates, propose_assignments
+
+
+class Command(BaseCommand):
+    help = 'Propose (and optionally apply) RBT assignments for clients without an RBT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admin-id', type=int, help='Only clients and RBTs supervised by this admin')
+        parser.add_argument('--max-caseload', type=int, help='Clients per RBT (default RBT_MAX_CASELOAD)')
+        parser.add_argument('--horizon-days', type=int, default=DEFAULT_HORIZON_DAYS, help='Days of calendar checked for availability')
+        parser.add_argument('--apply', action='store_true', help='Save the proposed assignments')
+
+    def handle(self, *args, **options):
+        admin = None
+        if options['admin_id']:
+            admin = CustomUser.objects.filter(id=options['admin_id']).first()
+            if admin is None:
+                raise CommandError(f"No user with id {options['admin_id']}")
+
+        clients, rbts = assignment_candidates(admin)
+        started = clock.monotonic()
+        result = propose_assignments(
+            clients, rbts,
+            max_caseload=options['max_caseload'],
+            horizon_days=options['horizon_days'],
+        )
+        elapsed = clock.monotonic() - started
+
+        for proposal in result['proposals']:
+            self.stdout.write(
+                f"{proposal['client_name']} (#{proposal['client_id']}) -> {proposal['rbt_name']} "
+                f"(#{proposal['rbt_id']}) score {proposal['score']}: {proposal['explanation']}"
+            )
+        for item in result['unassigned']:
+            self.stdout.write(self.style.WARNING(f"{item['client_name']} (#{item['client_id']}): {item['reason']}"))
+
+        if options['apply'] and result['proposals']:
+            rbts = {rbt.id: rbt for rbt in rbts}
+            clients = {client.id: client for client in clients.filter(id__in=[p['client_id'] for p in result['proposals']])}
+            for proposal in result['proposals']:
+                client = clients[proposal['client_id']]
+                client.assigned_rbt = rbts[proposal['rbt_id']]
+                client.save(update_fields=['assigned_rbt'])
+
+        action = 'Applied' if options['apply'] else 'Proposed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {len(result['proposals'])} assignment(s), {len(result['unassigned'])} left unassigned "
+            f"({elapsed:.2f}s)"
+        ))
@@ -1,58 +1,136 @@
-from django.core.management.base import BaseCommand
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from scheduler.models import Session as ScheduledSession
 from session.models import Session as TherapySession
 
 
 class Command(BaseCommand):
-    help = 'Sync existing scheduler sessions to therapy sessions'
+    help = 'Sync scheduler sessions to therapy sessions (set-based: one anti-join, chunked bulk inserts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only sync scheduler sessions on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--dry-run', action='store_true', help='Report counts without writing anything')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert/update')
+        parser.add_argument(
+            '--update-drifted', action='store_true',
+            help="Also fix client/notes on still-scheduled therapy sessions that no longer match their schedule"
+        )
 
     def handle(self, *args, **options):
-        self.stdout.write('Starting session sync...')
-        
-        # Get all scheduled sessions
-        scheduled_sessions = ScheduledSession.objects.all()
-        
-        created_count = 0
-        skipped_count = 0
-        
-        for scheduled in scheduled_sessions:
-            # Check if therapy session already exists
-            existing = TherapySession.objects.filter(
-                client=scheduled.client,
-                staff=scheduled.staff,
-                session_date=scheduled.session_date,
-                start_time=scheduled.start_time,
-                end_time=scheduled.end_time
-            ).exists()
-            
-            if not existing:
-                # Create the therapy session
-                TherapySession.objects.create(
-                    client=scheduled.client,
-                    staff=scheduled.staff,
-                    session_date=scheduled.session_date,
-                    start_time=scheduled.start_time,
-                    end_time=scheduled.end_time,
-                    location='Scheduled Location',
-                    service_type='ABA',
-                    status='scheduled',
-                    session_notes=scheduled.session_notes or ''
-                )
-                created_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'✓ Created therapy session from schedule ID {scheduled.id}'
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        scheduled = ScheduledSession.objects.all()
+        if options['since']:
+            try:
+                scheduled = scheduled.filter(session_date__gte=date.fromisoformat(options['since']))
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        # Therapy sessions on the same slot (the therapy table is unique on staff/date/start/end)
+        same_slot = TherapySession.objects.filter(
+            session_date=OuterRef('session_date'),
+            start_time=OuterRef('start_time'),
+            end_time=OuterRef('end_time'),
+        ).filter(Q(staff_id=OuterRef('staff_id')) | Q(staff__isnull=True, client_id=OuterRef('client_id')))
+        scheduled = scheduled.annotate(
+            has_match=Exists(same_slot.filter(client_id=OuterRef('client_id'))),
+            slot_taken=Exists(same_slot),
+        )
+
+        # Anti-join: schedule rows with no therapy session for the same client and slot
+        missing = scheduled.filter(has_match=False, slot_taken=False)
+        # Slot used by a therapy session for another client: can't insert, may be drift
+        blocked = scheduled.filter(has_match=False, slot_taken=True)
+
+        missing_count = missing.count()
+        blocked_count = blocked.count()
+        drifted = self._drifted(scheduled) if options['update_drifted'] else None
+        drifted_count = drifted.count() if drifted is not None else None
+
+        if options['dry_run']:
+            self.stdout.write(f'[DRY RUN] Would create {missing_count} therapy session(s)')
+            self.stdout.write(f'[DRY RUN] {blocked_count} schedule(s) blocked by another client\'s therapy session in the same slot')
+            if drifted_count is not None:
+                self.stdout.write(f'[DRY RUN] Would update {drifted_count} drifted therapy session(s)')
+            return
+
+        updated = self._update_drifted(drifted, batch_size) if drifted is not None else 0
+        created = self._create_missing(missing, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sync complete. Created: {created}, updated: {updated}, '
+            f'blocked by another client in the same slot: {blocked.count()}'
+        ))
+
+    def _create_missing(self, missing, batch_size):
+        created = 0
+        last_pk = 0
+        while True:
+            # Keyset batches; inserted rows drop out of the anti-join on their own
+            batch = list(
+                missing.filter(pk__gt=last_pk).order_by('pk')
+                .values('pk', 'client_id', 'staff_id', 'session_date', 'start_time', 'end_time', 'session_notes')[:batch_size]
+            )
+            if not batch:
+                return created
+            last_pk = batch[-1]['pk']
+            with transaction.atomic():
+                TherapySession.objects.bulk_create([
+                    TherapySession(
+                        client_id=row['client_id'],
+                        staff_id=row['staff_id'],
+                        session_date=row['session_date'],
+                        start_time=row['start_time'],
+                        end_time=row['end_time'],
+                        location='Scheduled Location',
+                        service_type='ABA',
+                        status='scheduled',
+                        session_notes=row['session_notes'] or ''
                     )
-                )
-            else:
-                skipped_count += 1
-                self.stdout.write(
-                    f'⊘ Skipped schedule ID {scheduled.id} (already exists)'
-                )
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'\n✓ Sync complete! Created: {created_count}, Skipped: {skipped_count}'
+                    for row in batch
+                ])
+            created += len(batch)
+            self.stdout.write(f'  inserted {created} so far')
+
+    def _drifted(self, scheduled):
+        """Still-scheduled therapy sessions whose schedule row now has a different client or notes"""
+        schedule = scheduled.filter(
+            staff_id=OuterRef('staff_id'),
+            session_date=OuterRef('session_date'),
+            start_time=OuterRef('start_time'),
+            end_time=OuterRef('end_time'),
+        ).order_by('-pk')
+        return (
+            TherapySession.objects.filter(status='scheduled', staff__isnull=False)
+            .annotate(
+                schedule_client_id=Subquery(schedule.values('client_id')[:1]),
+                schedule_notes=Coalesce(Subquery(schedule.values('session_notes')[:1]), Value(''), output_field=TextField()),
+                current_notes=Coalesce('session_notes', Value(''), output_field=TextField()),
             )
+            .filter(schedule_client_id__isnull=False)
+            .exclude(client_id=F('schedule_client_id'), current_notes=F('schedule_notes'))
         )
 
+    def _update_drifted(self, drifted, batch_size):
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(drifted.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return updated
+            last_pk = batch[-1].pk
+            now = timezone.now()
+            for therapy_session in batch:
+                therapy_session.client_id = therapy_session.schedule_client_id
+                therapy_session.session_notes = therapy_session.schedule_notes
+                therapy_session.updated_at = now
+            with transaction.atomic():
+                TherapySession.objects.bulk_update(batch, ['client', 'session_notes', 'updated_at'])
+            updated += len(batch)
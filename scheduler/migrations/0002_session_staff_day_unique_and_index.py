@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='session',
+            unique_together={('staff', 'session_date', 'start_time', 'end_time')},
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['staff', 'session_date', 'start_time'], name='scheduler_staff_day_idx'),
+        ),
+    ]
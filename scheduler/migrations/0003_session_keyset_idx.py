@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0002_session_staff_day_unique_and_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['session_date', 'start_time', 'id'], name='scheduler_keyset_idx'),
+        ),
+    ]
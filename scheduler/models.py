@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 
 User = get_user_model()
 
@@ -66,7 +66,14 @@ class Session(models.Model):
 
     class Meta:
         ordering = ['start_time']
-        unique_together = ['staff', 'start_time', 'end_time']  # basic conflict prevention
+        # Exact duplicates on the same day; overlaps are rejected by scheduler.availability
+        unique_together = ['staff', 'session_date', 'start_time', 'end_time']
+        indexes = [
+            # Interval lookups per staff per day (conflict checks, free-slot search)
+            models.Index(fields=['staff', 'session_date', 'start_time'], name='scheduler_staff_day_idx'),
+            # Keyset pagination order (session/pagination.py)
+            models.Index(fields=['session_date', 'start_time', 'id'], name='scheduler_keyset_idx'),
+        ]
 
     def __str__(self):
         try:
@@ -132,4 +139,16 @@ def create_therapy_session_from_schedule(sender, instance, created, **kwargs):
                 print(f"[SUCCESS] Therapy session automatically created from schedule ID {instance.id}")
         except Exception as e:
             # Log error but don't break the schedule creation
-            print(f"[ERROR] Failed to create therapy session from schedule: {str(e)}")
\ No newline at end of file
+            print(f"[ERROR] Failed to create therapy session from schedule: {str(e)}")
+
+
+# Normalize text once on write so responses don't have to scrub it
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Session)
+def normalize_text_fields(sender, instance, update_fields=None, **kwargs):
+    from .normalization import NORMALIZED_FIELDS, normalize_instance
+
+    fields = NORMALIZED_FIELDS.get(sender._meta.label, ())
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    normalize_instance(instance, fields)
@@ -0,0 +1,50 @@
+"""
+Write-time text normalization.
+
+Text reaching the scheduler (client/staff profiles, session notes) is
+normalized once, when it is saved, instead of being scrubbed on every
+response. Normalization is lossless for real text: it applies NFC and drops
+what actually breaks encoding or display (lone surrogates, control
+characters, zero-width/BOM characters). Accented names are kept as they are.
+
+``normalize_instance`` runs from pre_save (see scheduler.models); rows written
+before that, or via bulk_create/update(), are fixed by the
+``normalize_text`` management command.
+"""
+import re
+import unicodedata
+
+# model label -> text fields that are normalized on save
+NORMALIZED_FIELDS = {
+    'api.CustomUser': (
+        'name', 'username', 'email', 'phone', 'business_name', 'business_address',
+        'business_website', 'goals', 'session_focus', 'session_note',
+    ),
+    'scheduler.Session': ('session_notes',),
+}
+
+# Lone surrogates, C0/C1 controls except tab/newline/carriage return, zero-width and BOM
+_INVALID = re.compile('[\ud800-\udfff\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\u200b-\u200d\u2060\ufeff]')
+
+
+def normalize_text(value):
+    if not isinstance(value, str) or not value:
+        return value
+    if value.isascii() and value.isprintable():
+        return value
+    return unicodedata.normalize('NFC', _INVALID.sub('', value))
+
+
+def normalize_instance(instance, fields=None):
+    """Normalize ``fields`` on ``instance`` in place; returns the names that changed"""
+    if fields is None:
+        fields = NORMALIZED_FIELDS.get(instance._meta.label, ())
+    changed = []
+    for field in fields:
+        value = getattr(instance, field, None)
+        normalized = normalize_text(value)
+        if normalized != value:
+            setattr(instance, field, normalized)
+            changed.append(field)
+    return changed
+
@@ -0,0 +1,125 @@
+"""
+Recurring session series.
+
+A series ("Mon/Wed/Fri 15:00-17:00 for 12 weeks") is expanded into dates,
+checked against the staff member's existing sessions with one query, and
+written with bulk_create: scheduler sessions and their therapy sessions in a
+single transaction. bulk_create doesn't send post_save, so
+``create_therapy_session_from_schedule`` is not run per row; the therapy rows
+it would have created are built here instead.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from .availability import load_intervals
+from .models import Session
+from .normalization import normalize_text
+
+MAX_OCCURRENCES = 366
+
+WEEKDAYS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+
+
+def expand_occurrences(start_date, weekdays, weeks=None, end_date=None):
+    """Dates on ``weekdays`` (0=Monday) from start_date for ``weeks`` weeks or up to end_date"""
+    if end_date is None:
+        end_date = start_date + timedelta(weeks=weeks) - timedelta(days=1)
+    weekdays = set(weekdays)
+    dates = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            dates.append(day)
+            if len(dates) > MAX_OCCURRENCES:
+                raise ValueError(f"A series can have at most {MAX_OCCURRENCES} occurrences")
+        day += timedelta(days=1)
+    return dates
+
+
+def create_series(client, staff, dates, start_time, end_time, treatment_plan=None,
+                  session_notes='', skip_conflicts=False):
+    """
+    Create one scheduler session (and therapy session) per date.
+
+    Returns {'created': [Session], 'conflicts': [date], 'therapy_sessions_created': int,
+    'therapy_sessions_blocked': [date]}. When conflicts exist and ``skip_conflicts`` is False
+    nothing is written. A date whose therapy slot (staff, date, start, end) is already taken by
+    another client's therapy session still gets its schedule row but no therapy session, and
+    is listed in therapy_sessions_blocked.
+    """
+    from session.models import Session as TherapySession
+
+    if not dates:
+        return {'created': [], 'conflicts': [], 'therapy_sessions_created': 0, 'therapy_sessions_blocked': []}
+    # bulk_create skips the pre_save normalization
+    session_notes = normalize_text(session_notes)
+
+    with transaction.atomic():
+        # Serialize bookings per staff member so the conflict check can't race another insert
+        type(staff).objects.select_for_update().filter(pk=staff.pk).first()
+
+        # One query for every interval the staff member has in the series range
+        index = load_intervals([staff.id], dates[0], dates[-1])
+        conflicts = []
+        free_dates = []
+        for day in dates:
+            day_index = index[(staff.id, day)]
+            if day_index.overlaps(start_time, end_time):
+                conflicts.append(day)
+            else:
+                day_index.add(start_time, end_time)
+                free_dates.append(day)
+
+        if conflicts and not skip_conflicts:
+            return {'created': [], 'conflicts': conflicts, 'therapy_sessions_created': 0, 'therapy_sessions_blocked': []}
+
+        # Existing therapy rows on the therapy table's unique key (staff, date, start, end).
+        # The slot may belong to another client; those dates get no therapy session and are reported.
+        existing_therapy = dict(
+            TherapySession.objects.filter(
+                staff=staff,
+                session_date__in=free_dates,
+                start_time=start_time,
+                end_time=end_time,
+            ).values_list('session_date', 'client_id')
+        )
+        therapy_blocked = [day for day in free_dates if day in existing_therapy and existing_therapy[day] != client.pk]
+
+        schedule = [
+            Session(
+                client=client,
+                staff=staff,
+                treatment_plan=treatment_plan,
+                session_date=day,
+                start_time=start_time,
+                end_time=end_time,
+                session_notes=session_notes,
+            )
+            for day in free_dates
+        ]
+        therapy_sessions = [
+            TherapySession(
+                client=client,
+                staff=staff,
+                session_date=day,
+                start_time=start_time,
+                end_time=end_time,
+                location='Scheduled Location',
+                service_type='ABA',
+                status='scheduled',
+                session_notes=session_notes or '',
+            )
+            for day in free_dates
+            if day not in existing_therapy
+        ]
+
+        created = Session.objects.bulk_create(schedule)
+        TherapySession.objects.bulk_create(therapy_sessions)
+
+        return {
+            'created': created,
+            'conflicts': conflicts,
+            'therapy_sessions_created': len(therapy_sessions),
+            'therapy_sessions_blocked': therapy_blocked,
+        }
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from api.models import CustomUser
 from .models import Session
+from .availability import find_conflicts
 from django.utils import timezone
+from django.db.models import Prefetch
 from datetime import date
-import re
 
 # Client serializer using CustomUser from API
 class ClientSerializer(serializers.ModelSerializer):
@@ -18,58 +19,79 @@ class ClientSerializer(serializers.ModelSerializer):
             return today.year - obj.dob.year - ((today.month, today.day) < (obj.dob.month, obj.dob.day))
         return None
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Prefetch each user's last and upcoming session for list views.
+
+        Sliced Prefetch querysets are evaluated with a ROW_NUMBER() window, so a
+        paginated page costs four queries (count, page, two prefetches) however
+        many rows it has.
+        """
+        today = timezone.now().date()
+        return queryset.prefetch_related(
+            Prefetch(
+                'sessions_as_client',
+                queryset=Session.objects.select_related('staff')
+                .filter(session_date__lt=today).order_by('-session_date', '-start_time')[:1],
+                to_attr='prefetched_last_session'
+            ),
+            Prefetch(
+                'sessions_as_client',
+                queryset=Session.objects.select_related('staff')
+                .filter(session_date__gte=today).order_by('session_date', 'start_time')[:1],
+                to_attr='prefetched_upcoming_session'
+            ),
+        )
+
+    @staticmethod
+    def _session_summary(session, include_notes=False):
+        summary = {
+            'id': session.id,
+            'session_date': session.session_date,
+            'start_time': session.start_time,
+            'end_time': session.end_time,
+            'staff_name': session.staff.name if session.staff else None,
+            'duration': str(session.duration) if session.duration else None,
+        }
+        if include_notes:
+            summary['notes'] = session.session_notes
+        return summary
+
     def get_last_session(self, obj):
         """Get the most recent completed session for this client"""
+        if hasattr(obj, 'prefetched_last_session'):
+            sessions = obj.prefetched_last_session
+            return self._session_summary(sessions[0], include_notes=True) if sessions else None
         try:
-            last_session = Session.objects.filter(
+            last_session = Session.objects.select_related('staff').filter(
                 client=obj,
                 session_date__lt=timezone.now().date()
             ).order_by('-session_date', '-start_time').first()
             
             if last_session:
-                return {
-                    'id': last_session.id,
-                    'session_date': last_session.session_date,
-                    'start_time': last_session.start_time,
-                    'end_time': last_session.end_time,
-                    'staff_name': last_session.staff.name if last_session.staff else None,
-                    'duration': str(last_session.duration) if last_session.duration else None,
-                    'notes': last_session.session_notes
-                }
+                return self._session_summary(last_session, include_notes=True)
         except Exception as e:
             pass
         return None
     
     def get_upcoming_session(self, obj):
         """Get the next upcoming session for this client"""
+        if hasattr(obj, 'prefetched_upcoming_session'):
+            sessions = obj.prefetched_upcoming_session
+            return self._session_summary(sessions[0]) if sessions else None
         try:
-            upcoming_session = Session.objects.filter(
+            upcoming_session = Session.objects.select_related('staff').filter(
                 client=obj,
                 session_date__gte=timezone.now().date()
             ).order_by('session_date', 'start_time').first()
             
             if upcoming_session:
-                return {
-                    'id': upcoming_session.id,
-                    'session_date': upcoming_session.session_date,
-                    'start_time': upcoming_session.start_time,
-                    'end_time': upcoming_session.end_time,
-                    'staff_name': upcoming_session.staff.name if upcoming_session.staff else None,
-                    'duration': str(upcoming_session.duration) if upcoming_session.duration else None
-                }
+                return self._session_summary(upcoming_session)
         except Exception as e:
             pass
         return None
     
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Clean any problematic Unicode characters
-        for key, value in data.items():
-            if isinstance(value, str):
-                # Remove or replace problematic characters
-                data[key] = re.sub(r'[^\x00-\x7F]+', '?', value)
-        return data
-    
     class Meta:
         model = CustomUser
         fields = [
@@ -82,15 +104,6 @@ class ClientSerializer(serializers.ModelSerializer):
 
 # Staff serializer for nested representation
 class StaffSerializer(serializers.ModelSerializer):
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Clean any problematic Unicode characters
-        for key, value in data.items():
-            if isinstance(value, str):
-                # Remove or replace problematic characters
-                data[key] = re.sub(r'[^\x00-\x7F]+', '?', value)
-        return data
-    
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'name', 'email', 'phone', 'goals', 'session_focus', 'telehealth', 'session_note']
@@ -102,25 +115,6 @@ class SessionSerializer(serializers.ModelSerializer):
     client_details = ClientSerializer(source='client', read_only=True)
     treatment_plan_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     
-    def to_representation(self, instance):
-        try:
-            data = super().to_representation(instance)
-            # Clean any problematic Unicode characters
-            for key, value in data.items():
-                if isinstance(value, str):
-                    # Remove or replace problematic characters
-                    data[key] = re.sub(r'[^\x00-\x7F]+', '?', value)
-            return data
-        except UnicodeEncodeError as e:
-            # If there's still a Unicode error, return minimal safe data
-            return {
-                'id': instance.id,
-                'session_date': str(instance.session_date) if instance.session_date else None,
-                'start_time': str(instance.start_time) if instance.start_time else None,
-                'end_time': str(instance.end_time) if instance.end_time else None,
-                'error': 'Unicode encoding issue with this record'
-            }
-    
     class Meta:
         model = Session
         fields = '__all__'
@@ -210,15 +204,81 @@ class SessionSerializer(serializers.ModelSerializer):
                 'treatment_plan_id': 'Either "client" or "treatment_plan_id" must be provided.'
             })
 
-        # Optional: Check for overlapping sessions (commented out to allow overlaps)
-        # overlapping = Session.objects.filter(
-        #     staff=staff,
-        #     start_time__lt=end_time,
-        #     end_time__gt=start_time
-        # )
-        # if self.instance:
-        #     overlapping = overlapping.exclude(id=self.instance.id)
-
-        # if overlapping.exists():
-        #     raise serializers.ValidationError("Staff has overlapping session at this time.")
+        # Reject sessions overlapping another session of the same staff member that day
+        instance = self.instance
+        staff = staff if 'staff' in data else getattr(instance, 'staff', None)
+        session_date = data.get('session_date', getattr(instance, 'session_date', None))
+        start_time = start_time or getattr(instance, 'start_time', None)
+        end_time = end_time or getattr(instance, 'end_time', None)
+        if start_time and end_time and end_time <= start_time:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time.'})
+        if staff and session_date and start_time and end_time:
+            conflict = find_conflicts(
+                staff.id, session_date, start_time, end_time,
+                exclude_id=instance.id if instance else None
+            ).order_by('start_time').first()
+            if conflict:
+                raise serializers.ValidationError(
+                    f"Staff has an overlapping session on {session_date} "
+                    f"({conflict.start_time:%H:%M}-{conflict.end_time:%H:%M})."
+                )
+        return data
+
+
+# Recurring series request (expanded and bulk-created by scheduler.recurrence)
+SERIES_STAFF_ROLES = ('RBT', 'BCBA')
+
+
+class SessionSeriesSerializer(serializers.Serializer):
+    client = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
+    staff = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
+    treatment_plan_id = serializers.IntegerField(required=False, allow_null=True)
+    weekdays = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    start_date = serializers.DateField()
+    weeks = serializers.IntegerField(required=False, min_value=1, max_value=52)
+    end_date = serializers.DateField(required=False)
+    session_notes = serializers.CharField(required=False, allow_blank=True, default='')
+    skip_conflicts = serializers.BooleanField(default=False)
+
+    def validate_weekdays(self, value):
+        from .recurrence import WEEKDAYS
+        weekdays = []
+        for day in value:
+            key = str(day).strip().lower()[:3]
+            if key.isdigit() and 0 <= int(key) <= 6:
+                weekdays.append(int(key))
+            elif key in WEEKDAYS:
+                weekdays.append(WEEKDAYS[key])
+            else:
+                raise serializers.ValidationError(f'Unknown weekday "{day}". Use mon..sun or 0 (Monday)..6.')
+        return sorted(set(weekdays))
+
+    def validate_client(self, value):
+        if not value.role or value.role.name != 'Clients/Parent':
+            raise serializers.ValidationError('The specified client must have the role "Clients/Parent".')
+        return value
+
+    def validate_staff(self, value):
+        if not value.role or value.role.name not in SERIES_STAFF_ROLES:
+            raise serializers.ValidationError('The specified staff member must have the role "RBT" or "BCBA".')
+        return value
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time.'})
+        if bool(data.get('weeks')) == bool(data.get('end_date')):
+            raise serializers.ValidationError('Provide exactly one of "weeks" or "end_date".')
+        if data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({'end_date': 'End date must not be before start date.'})
+
+        treatment_plan_id = data.pop('treatment_plan_id', None)
+        data['treatment_plan'] = None
+        if treatment_plan_id:
+            from treatment_plan.models import TreatmentPlan
+            try:
+                data['treatment_plan'] = TreatmentPlan.objects.get(id=treatment_plan_id)
+            except TreatmentPlan.DoesNotExist:
+                raise serializers.ValidationError({'treatment_plan_id': 'Treatment plan not found.'})
         return data
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     ClientListView, ClientDetailView, SessionListCreateView, SessionDetailView, 
-    RBTListView, BCBAListView, StaffListView
+    RBTListView, BCBAListView, StaffListView, staff_free_slots, create_session_series,
+    rbt_assignment_proposals, apply_rbt_assignments
 )
 
 urlpatterns = [
@@ -14,5 +15,13 @@ urlpatterns = [
 
     # Sessions
     path('sessions/', SessionListCreateView.as_view(), name='sessions-list-create'),
+    path('sessions/series/', create_session_series, name='sessions-series-create'),
     path('sessions/<int:pk>/', SessionDetailView.as_view(), name='sessions-detail'),
+
+    # Availability
+    path('staff/<int:staff_id>/free-slots/', staff_free_slots, name='staff-free-slots'),
+
+    # RBT assignment
+    path('assignments/rbt-proposals/', rbt_assignment_proposals, name='rbt-assignment-proposals'),
+    path('assignments/rbt-proposals/apply/', apply_rbt_assignments, name='rbt-assignment-apply'),
 ]
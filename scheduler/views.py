@@ -1,13 +1,22 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from api.models import CustomUser
+from session.pagination import SessionPagination
 from .models import Session, TimeTracker, SessionLog
-from .serializers import ClientSerializer, SessionSerializer
+from .serializers import SERIES_STAFF_ROLES, ClientSerializer, SessionSerializer, SessionSeriesSerializer
+from .availability import free_slots
+from .recurrence import create_series, expand_occurrences
+from .assignment import (
+    DEFAULT_HORIZON_DAYS, assignment_candidates, current_caseloads, get_max_caseload, propose_assignments,
+)
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
+from django.db import transaction
 from django.db.models import Count
+from datetime import date, time
 import logging
 import sys
 
@@ -25,7 +34,9 @@ class ClientListView(generics.ListAPIView):
             return CustomUser.objects.none()
         
         if admin_user.role.name == "Admin":
-            return CustomUser.objects.filter(role__name="Clients/Parent", supervisor=admin_user).order_by('-id')
+            return ClientSerializer.setup_eager_loading(
+                CustomUser.objects.filter(role__name="Clients/Parent", supervisor=admin_user).order_by('-id')
+            )
         else:
             return CustomUser.objects.none()
 
@@ -40,7 +51,9 @@ class RBTListView(generics.ListAPIView):
             return CustomUser.objects.none()
         
         if admin_user.role.name == "Admin":
-            return CustomUser.objects.filter(role__name="RBT", supervisor=admin_user).order_by('-id')
+            return ClientSerializer.setup_eager_loading(
+                CustomUser.objects.filter(role__name="RBT", supervisor=admin_user).order_by('-id')
+            )
         else:
             return CustomUser.objects.none()
 
@@ -56,7 +69,9 @@ class BCBAListView(generics.ListAPIView):
             return CustomUser.objects.none()
         
         if admin_user.role.name == "Admin":
-            return CustomUser.objects.filter(role__name="BCBA", supervisor=admin_user).order_by('-id')
+            return ClientSerializer.setup_eager_loading(
+                CustomUser.objects.filter(role__name="BCBA", supervisor=admin_user).order_by('-id')
+            )
         else:
             return CustomUser.objects.none()
 
@@ -71,7 +86,9 @@ class StaffListView(generics.ListAPIView):
             return CustomUser.objects.none()
         
         if admin_user.role.name == "Admin":
-            return CustomUser.objects.filter(role__name__in=["BCBA", "RBT"], supervisor=admin_user).order_by('-id')
+            return ClientSerializer.setup_eager_loading(
+                CustomUser.objects.filter(role__name__in=["BCBA", "RBT"], supervisor=admin_user).order_by('-id')
+            )
         else:
             return CustomUser.objects.none()
 
@@ -97,36 +114,31 @@ class SessionListCreateView(generics.ListCreateAPIView):
     queryset = Session.objects.all().order_by('-session_date')
     serializer_class = SessionSerializer
     permission_classes = [permissions.IsAuthenticated]  
+    # ?cursor= for keyset pages on (session_date, start_time, id)
+    pagination_class = SessionPagination
     
     def get_queryset(self):
         user = self.request.user
         now = timezone.now()
 
-        try:
-            # Filter only sessions for the logged-in staff and only upcoming sessions
-            queryset = Session.objects.filter(
-                staff=user,
-                session_date__gte=now.date()  # only future dates (including today)
-            ).select_related('treatment_plan', 'client')
-            
-            # Filter by treatment_plan_id if provided
-            treatment_plan_id = self.request.query_params.get('treatment_plan_id')
-            if treatment_plan_id:
-                queryset = queryset.filter(treatment_plan_id=treatment_plan_id)
-            
-            queryset = queryset.order_by('session_date', 'start_time') # ascending order
-            
-            # Test the queryset by converting to list to catch Unicode issues early
-            list(queryset)
-            return queryset
-        except UnicodeEncodeError as e:
-            logging.error(f"Unicode error in queryset: {e}")
-            # Return empty queryset if Unicode error occurs
-            return Session.objects.none()
+        # Filter only sessions for the logged-in staff and only upcoming sessions
+        queryset = Session.objects.filter(
+            staff=user,
+            session_date__gte=now.date()  # only future dates (including today)
+        ).select_related('treatment_plan', 'client', 'staff')
+        
+        # Filter by treatment_plan_id if provided
+        treatment_plan_id = self.request.query_params.get('treatment_plan_id')
+        if treatment_plan_id:
+            queryset = queryset.filter(treatment_plan_id=treatment_plan_id)
+        
+        return queryset.order_by('session_date', 'start_time') # ascending order
     
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
+        except APIException:
+            raise
         except UnicodeEncodeError as e:
             logging.error(f"Unicode encoding error: {e}")
             return JsonResponse({
@@ -161,46 +173,54 @@ def start_session(request, session_id):
     return JsonResponse({'message': 'Session started'})
 
 def end_session(request, session_id):
+    """End a scheduled session through the therapy session's finalize pipeline (session/finalize.py)"""
+    from session.finalize import FinalizeBlocked, finalize, idempotency_key
+    from session.models import Session as TherapySession
+
     session = get_object_or_404(Session, id=session_id)
     if request.user != session.staff:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
 
-    # Check if session note is completed before allowing session to end
-    from ocean.models import SessionNoteFlow
-    try:
-        note_flow = SessionNoteFlow.objects.get(session=session)
-        if not note_flow.final_note_submitted:
-            return JsonResponse({
-                'error': 'Session note must be completed before ending session',
-                'note_completed': note_flow.is_note_completed,
-                'note_finalized': note_flow.final_note_submitted,
-                'message': 'Please complete and finalize your session note before ending the session.'
-            }, status=400)
-    except SessionNoteFlow.DoesNotExist:
+    therapy_session = TherapySession.objects.filter(
+        client_id=session.client_id,
+        staff_id=session.staff_id,
+        session_date=session.session_date,
+        start_time=session.start_time,
+        end_time=session.end_time
+    ).first()
+    if therapy_session is None:
         return JsonResponse({
             'error': 'Session note flow not initialized',
             'message': 'Please start the session note flow before ending the session.'
         }, status=400)
 
-    session.status = 'completed'
-    session.save()
-
-    # Update time tracker if it exists
     try:
-        tracker = TimeTracker.objects.get(session=session)
-        tracker.end_time = timezone.now()
-        tracker.save()
-        
-        # Update duration in Session
-        session.duration = tracker.duration
-        session.save()
-    except TimeTracker.DoesNotExist:
-        pass
-
-    return JsonResponse({
-        'message': 'Session ended successfully', 
-        'duration': getattr(tracker, 'duration', None) if 'tracker' in locals() else None
+        with transaction.atomic():
+            # The session note must already be submitted before the session can end
+            payload, status_code = finalize(
+                therapy_session.id, request.user, 'scheduler_end', idempotency_key(request),
+                note_requirement='submitted'
+            )
+
+            # Close the time tracker once; retries keep the first end time
+            tracker = TimeTracker.objects.select_for_update().filter(session=session).first()
+            if tracker and tracker.start_time and not tracker.end_time:
+                tracker.end_time = timezone.now()
+                tracker.save(update_fields=['end_time'])
+                session.duration = tracker.end_time - tracker.start_time
+                session.save(update_fields=['duration'])
+    except FinalizeBlocked as e:
+        blocked = dict(e.payload)
+        note = blocked.pop('note_flow_status', {})
+        blocked['note_completed'] = note.get('is_note_completed', False)
+        blocked['note_finalized'] = note.get('final_note_submitted', False)
+        return JsonResponse(blocked, status=e.status_code)
+
+    payload.update({
+        'message': 'Session ended successfully',
+        'duration': tracker.duration if tracker else None
     })
+    return JsonResponse(payload, status=status_code)
 
 def log_behavior(request, session_id):
     session = get_object_or_404(Session, id=session_id)
@@ -225,3 +245,219 @@ def log_behavior(request, session_id):
     return JsonResponse({'message': 'Behavior logged successfully'})
 
 
+
+
+# Maximum look-ahead for free-slot searches
+MAX_FREE_SLOT_DAYS = 60
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def staff_free_slots(request, staff_id):
+    """
+    Free time slots for a staff member over the next N days
+
+    Query Parameters:
+    - days: number of days to search (default 7, max 60)
+    - start_date: first day, YYYY-MM-DD (default today)
+    - day_start / day_end: working hours, HH:MM (default SCHEDULING_DAY_START/END)
+    - min_minutes: drop gaps shorter than this (default 0)
+    """
+    user = request.user
+    role_name = user.role.name if hasattr(user, 'role') and user.role else None
+    if user.id != staff_id and role_name not in ['Admin', 'Superadmin', 'BCBA']:
+        return Response({'error': 'You do not have permission to view this staff member\'s availability'}, status=403)
+
+    staff = get_object_or_404(CustomUser, id=staff_id)
+
+    try:
+        days = int(request.query_params.get('days', 7))
+        min_minutes = int(request.query_params.get('min_minutes', 0))
+        start_date = request.query_params.get('start_date')
+        start_date = date.fromisoformat(start_date) if start_date else timezone.now().date()
+        day_start = request.query_params.get('day_start')
+        day_end = request.query_params.get('day_end')
+        day_start = time.fromisoformat(day_start) if day_start else None
+        day_end = time.fromisoformat(day_end) if day_end else None
+    except ValueError:
+        return Response({'error': 'Invalid days, min_minutes, start_date (YYYY-MM-DD) or day_start/day_end (HH:MM)'}, status=400)
+
+    if not 1 <= days <= MAX_FREE_SLOT_DAYS:
+        return Response({'error': f'days must be between 1 and {MAX_FREE_SLOT_DAYS}'}, status=400)
+    if day_start and day_end and day_end <= day_start:
+        return Response({'error': 'day_end must be after day_start'}, status=400)
+
+    slots = free_slots(staff.id, start_date, days, day_start, day_end, min_minutes)
+    return Response({
+        'staff_id': staff.id,
+        'start_date': start_date,
+        'days': days,
+        'slots': slots,
+        'total_free_minutes': sum(slot['minutes'] for slot in slots),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_session_series(request):
+    """
+    Create a recurring series of sessions in one request, e.g. Mon/Wed/Fri 15:00-17:00 for 12 weeks
+
+    Body: client, staff (default: current user), weekdays (["mon", "wed", "fri"] or 0-6),
+    start_time, end_time, start_date, weeks or end_date, treatment_plan_id, session_notes,
+    skip_conflicts (default false: any conflict rejects the whole series)
+
+    Admin, Superadmin and BCBA users can book any RBT/BCBA; RBTs only themselves.
+    """
+    user = request.user
+    role_name = user.role.name if hasattr(user, 'role') and user.role else None
+    if role_name not in ['Admin', 'Superadmin', 'BCBA', 'RBT']:
+        return Response({'error': 'You do not have permission to create session series'}, status=403)
+
+    serializer = SessionSeriesSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    staff = data.get('staff')
+    if staff is None:
+        if role_name not in SERIES_STAFF_ROLES:
+            return Response({'staff': ['This field is required.']}, status=400)
+        staff = user
+    if role_name == 'RBT' and staff.id != user.id:
+        return Response({'error': 'RBTs can only create session series for themselves'}, status=403)
+
+    try:
+        dates = expand_occurrences(data['start_date'], data['weekdays'], weeks=data.get('weeks'), end_date=data.get('end_date'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    result = create_series(
+        client=data['client'],
+        staff=staff,
+        dates=dates,
+        start_time=data['start_time'],
+        end_time=data['end_time'],
+        treatment_plan=data['treatment_plan'],
+        session_notes=data['session_notes'],
+        skip_conflicts=data['skip_conflicts'],
+    )
+
+    if result['conflicts'] and not data['skip_conflicts']:
+        return Response({
+            'error': 'Staff has overlapping sessions on some dates of this series',
+            'conflicts': result['conflicts'],
+        }, status=409)
+
+    return Response({
+        'message': f"Created {len(result['created'])} session(s)",
+        'occurrences': len(dates),
+        'created': len(result['created']),
+        'therapy_sessions_created': result['therapy_sessions_created'],
+        'therapy_sessions_blocked': result['therapy_sessions_blocked'],
+        'skipped_conflicts': result['conflicts'],
+        'sessions': [
+            {'id': session.id, 'session_date': session.session_date, 'start_time': session.start_time, 'end_time': session.end_time}
+            for session in result['created']
+        ],
+    }, status=201)
+
+
+def _assignment_scope(user):
+    """None for Superadmin (everyone), the admin for Admin (their supervisees), False otherwise"""
+    role_name = user.role.name if hasattr(user, 'role') and user.role else None
+    if role_name == 'Superadmin':
+        return None
+    if role_name == 'Admin':
+        return user
+    return False
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def rbt_assignment_proposals(request):
+    """
+    Proposed RBT assignments for clients without an RBT, with per-score explanations
+
+    Query Parameters:
+    - max_caseload: clients per RBT (default RBT_MAX_CASELOAD)
+    - horizon_days: days of scheduler calendar checked for availability (default 14, max 60)
+    - client_id: only propose for these clients (repeatable)
+    """
+    scope = _assignment_scope(request.user)
+    if scope is False:
+        return Response({'error': 'Only Admin and Superadmin users can view assignment proposals'}, status=403)
+
+    try:
+        max_caseload = int(request.query_params.get('max_caseload', 0)) or None
+        horizon_days = int(request.query_params.get('horizon_days', DEFAULT_HORIZON_DAYS))
+    except ValueError:
+        return Response({'error': 'max_caseload and horizon_days must be integers'}, status=400)
+    if not 1 <= horizon_days <= MAX_FREE_SLOT_DAYS:
+        return Response({'error': f'horizon_days must be between 1 and {MAX_FREE_SLOT_DAYS}'}, status=400)
+
+    clients, rbts = assignment_candidates(scope)
+    client_ids = request.query_params.getlist('client_id')
+    if client_ids:
+        clients = clients.filter(id__in=client_ids)
+
+    result = propose_assignments(clients, rbts, max_caseload=max_caseload, horizon_days=horizon_days)
+    result['total_proposals'] = len(result['proposals'])
+    return Response(result)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def apply_rbt_assignments(request):
+    """
+    Apply reviewed assignments
+
+    Body: {"assignments": [{"client_id": 1, "rbt_id": 2}, ...], "max_caseload": 10 (optional)}
+    Clients that already have an RBT, and pairs that would take an RBT over the
+    maximum caseload, are skipped with a reason.
+    """
+    scope = _assignment_scope(request.user)
+    if scope is False:
+        return Response({'error': 'Only Admin and Superadmin users can assign RBTs'}, status=403)
+
+    assignments = request.data.get('assignments')
+    if not isinstance(assignments, list) or not assignments:
+        return Response({'error': 'assignments must be a non-empty list of {client_id, rbt_id}'}, status=400)
+    try:
+        pairs = {int(item['client_id']): int(item['rbt_id']) for item in assignments}
+        max_caseload = int(request.data.get('max_caseload') or 0) or get_max_caseload()
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'Each assignment needs integer client_id and rbt_id; max_caseload must be an integer'}, status=400)
+
+    applied, skipped = [], []
+    with transaction.atomic():
+        clients, rbts = assignment_candidates(scope)
+        # Lock the RBTs so concurrent applies can't both take the last caseload slot
+        rbts = {rbt.id: rbt for rbt in rbts.filter(id__in=set(pairs.values())).select_for_update()}
+        # Proposals may be stale: count caseloads as they are now
+        loads = current_caseloads(list(rbts))
+        for client in clients.filter(id__in=pairs):
+            rbt = rbts.get(pairs[client.id])
+            if rbt is None:
+                skipped.append({'client_id': client.id, 'rbt_id': pairs[client.id], 'reason': 'RBT not found or not active'})
+                continue
+            load = loads.get(rbt.id, 0)
+            if load >= max_caseload:
+                skipped.append({'client_id': client.id, 'rbt_id': rbt.id,
+                                'reason': f'RBT is at maximum caseload ({load}/{max_caseload})'})
+                continue
+            client.assigned_rbt = rbt
+            client.save(update_fields=['assigned_rbt'])
+            loads[rbt.id] = load + 1
+            applied.append({'client_id': client.id, 'rbt_id': rbt.id})
+
+    handled = {item['client_id'] for item in applied + skipped}
+    skipped.extend(
+        {'client_id': client_id, 'rbt_id': rbt_id, 'reason': 'Client already has an RBT or is not in your scope'}
+        for client_id, rbt_id in pairs.items() if client_id not in handled
+    )
+
+    return Response({
+        'message': f'Assigned {len(applied)} client(s)',
+        'applied': applied,
+        'skipped': skipped,
+        'skipped_client_ids': [item['client_id'] for item in skipped],
+    })
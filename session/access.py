@@ -0,0 +1,104 @@
+"""
+BCBA access scope.
+
+A BCBA can see a client's sessions when the client is assigned to them
+(``assigned_bcba``) or when one of their treatment plans points at the client.
+Plans reference clients loosely (``client_id`` may hold the user id, username
+or staff id, and ``client_name`` a display name), so resolving the scope means
+matching plans against the user table. That is done once per BCBA and cached;
+views then filter with a plain ``client_id__in``.
+
+Cache entries are dropped by the receivers in session.models when a plan or a
+client assignment changes. Changes to a user's identifying fields may affect
+any BCBA's plans, so those bump a global generation instead. This is an
+authorization decision, so it is only cached when that invalidation reaches
+every worker (see session/shared_cache.py); otherwise it is resolved per call.
+"""
+from functools import reduce
+import operator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from .shared_cache import shared_cache_enabled
+
+SCOPE_KEY = 'access:bcba:{generation}:{user_id}'
+GENERATION_KEY = 'access:bcba:generation'
+
+# User fields that plans are matched against
+IDENTITY_FIELDS = ('name', 'username', 'staff_id')
+
+
+def get_scope_ttl():
+    return int(getattr(settings, 'BCBA_ACCESS_SCOPE_TTL_SECONDS', 300))
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def _scope_key(user_id):
+    return SCOPE_KEY.format(generation=_generation(), user_id=user_id)
+
+
+def _resolve_client_ids(user_id):
+    from treatment_plan.models import TreatmentPlan
+
+    User = get_user_model()
+    client_ids = set(User.objects.filter(assigned_bcba_id=user_id).values_list('id', flat=True))
+
+    plans = list(TreatmentPlan.objects.filter(bcba_id=user_id).values_list('client_id', 'client_name'))
+    identifiers = {str(client_id) for client_id, _ in plans if client_id}
+    names = {client_name for _, client_name in plans if client_name}
+
+    matches = []
+    if identifiers:
+        numeric_ids = [int(identifier) for identifier in identifiers if identifier.isdigit()]
+        matches.append(Q(id__in=numeric_ids) | Q(username__in=identifiers) | Q(staff_id__in=identifiers))
+    matches.extend(Q(name__icontains=name) for name in names)
+    if matches:
+        client_ids.update(User.objects.filter(reduce(operator.or_, matches)).values_list('id', flat=True))
+
+    return client_ids
+
+
+def bcba_client_ids(user):
+    """Ids of clients visible to a BCBA through assignment or treatment plans (cached)"""
+    if not shared_cache_enabled():
+        return _resolve_client_ids(user.id)
+    key = _scope_key(user.id)
+    client_ids = cache.get(key)
+    if client_ids is None:
+        client_ids = sorted(_resolve_client_ids(user.id))
+        cache.set(key, client_ids, timeout=get_scope_ttl())
+    return set(client_ids)
+
+
+def bcba_session_filter(user, include_staffed=True):
+    """Q for sessions a BCBA may see: their clients' sessions, plus sessions they run"""
+    scope = Q(client_id__in=bcba_client_ids(user))
+    if include_staffed:
+        scope |= Q(staff=user)
+    return scope
+
+
+def bcba_can_access_session(user, session, include_staffed=True):
+    if include_staffed and session.staff_id == user.id:
+        return True
+    return session.client_id in bcba_client_ids(user)
+
+
+def invalidate_bcba_scope(*user_ids):
+    keys = [_scope_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_all_scopes():
+    """Make every cached scope stale (old entries simply expire)"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
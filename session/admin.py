@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Session, SessionTimer, AdditionalTime, PreSessionChecklist,
     Activity, ReinforcementStrategy, ABCEvent, GoalProgress,
-    Incident, SessionNote, TimeTracker
+    Incident, SessionNote, TimeTracker, PayrollExport, FinalizeRequest,
+    GoalTrial, GoalMastery
 )
 
 
@@ -412,3 +413,35 @@ class TimeTrackerAdmin(admin.ModelAdmin):
     
     date_hierarchy = 'start_time'
     ordering = ['-start_time']
+
+
+# PayrollExport Admin
+@admin.register(PayrollExport)
+class PayrollExportAdmin(admin.ModelAdmin):
+    list_display = ['id', 'requested_by', 'start_date', 'end_date', 'period', 'rounding', 'status', 'row_count', 'created_at']
+    list_filter = ['status', 'period', 'rounding']
+    readonly_fields = ['file', 'row_count', 'error', 'created_at', 'completed_at']
+
+
+# FinalizeRequest Admin
+@admin.register(FinalizeRequest)
+class FinalizeRequestAdmin(admin.ModelAdmin):
+    list_display = ['id', 'session', 'user', 'source', 'key', 'status_code', 'created_at']
+    list_filter = ['source']
+    search_fields = ['key']
+    readonly_fields = ['response', 'created_at']
+
+
+@admin.register(GoalTrial)
+class GoalTrialAdmin(admin.ModelAdmin):
+    list_display = ['goal_progress', 'trial_number', 'is_correct', 'prompt_level', 'latency_seconds', 'recorded_at']
+    list_filter = ['is_correct', 'prompt_level']
+    search_fields = ['goal_progress__session__client__username']
+
+
+@admin.register(GoalMastery)
+class GoalMasteryAdmin(admin.ModelAdmin):
+    list_display = ['client', 'goal_id', 'criterion', 'status', 'progress', 'sessions_evaluated', 'mastered_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['client__username', 'criterion']
+    readonly_fields = ['detail', 'updated_at']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SessionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'session'
+
+    def ready(self):
+        # Register system checks
+        import session.checks  # noqa: F401
@@ -0,0 +1,231 @@
+"""
+Behavior analytics for one client: ABC event and incident time series plus an
+antecedent/behavior/consequence contingency table.
+
+Binning and counting happen in the database (one grouped query per series,
+Trunc on the session date / incident start); only the filled-in bins are
+post-processed here to add per-session rates and a least-squares trend.
+Results are cached per client and range with ``statistics.cached``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Avg, Case, Count, F, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Lower, Trim, TruncDate, TruncWeek
+
+from .models import ABCEvent, Incident, Session
+from .statistics import cached
+
+
+BINS = ('day', 'week')
+DEFAULT_RANGE_DAYS = 90
+MAX_RANGE_DAYS = 731
+CONTINGENCY_LIMIT = 50
+SEVERITY_SCORES = {'low': 1, 'moderate': 2, 'high': 3, 'critical': 4}
+SEVERITY_NAMES = {score: name for name, score in SEVERITY_SCORES.items()}
+INCIDENT_TYPES = [choice for choice, _ in Incident.INCIDENT_TYPE_CHOICES]
+
+
+def _severity_score():
+    return Case(
+        *[When(behavior_severity=name, then=Value(score)) for name, score in SEVERITY_SCORES.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _bin(field, bin_size, is_datetime=False):
+    """Bin expression; a DateField is grouped on as-is for daily bins"""
+    if bin_size == 'week':
+        return TruncWeek(field)
+    return TruncDate(field) if is_datetime else F(field)
+
+
+def _bin_start(day, bin_size):
+    return day - timedelta(days=day.weekday()) if bin_size == 'week' else day
+
+
+def _bins(start_date, end_date, bin_size):
+    step = timedelta(days=7 if bin_size == 'week' else 1)
+    current = _bin_start(start_date, bin_size)
+    bins = []
+    while current <= end_date:
+        bins.append(current)
+        current += step
+    return bins
+
+
+def _as_date(value):
+    return value.date() if hasattr(value, 'date') else value
+
+
+def trend(values):
+    """Least-squares slope per bin, and its direction, of an evenly spaced series"""
+    n = len(values)
+    if n < 2:
+        return {'slope': 0.0, 'direction': 'flat'}
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    denominator = sum((x - mean_x) ** 2 for x in range(n))
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / denominator
+    # Changes under 1% of the mean per bin are noise
+    tolerance = abs(mean_y) * 0.01
+    direction = 'flat' if abs(slope) <= tolerance else ('increasing' if slope > 0 else 'decreasing')
+    return {'slope': round(slope, 4), 'direction': direction}
+
+
+def time_series(client_id, start_date, end_date, bin_size='day'):
+    """Per-bin ABC and incident counts, incident duration and severity, and rates per session"""
+    sessions = (
+        Session.objects.filter(client_id=client_id, session_date__gte=start_date, session_date__lte=end_date)
+        .annotate(bin=_bin('session_date', bin_size))
+        .order_by()
+        .values('bin')
+        .annotate(sessions=Count('pk'))
+    )
+    abc = (
+        ABCEvent.objects.filter(
+            session__client_id=client_id,
+            session__session_date__gte=start_date, session__session_date__lte=end_date,
+        )
+        .annotate(bin=_bin('session__session_date', bin_size))
+        .order_by()
+        .values('bin')
+        .annotate(abc_events=Count('pk'))
+    )
+    incidents = (
+        Incident.objects.filter(
+            session__client_id=client_id,
+            start_time__date__gte=start_date, start_time__date__lte=end_date,
+        )
+        .annotate(bin=_bin('start_time', bin_size, is_datetime=True), score=_severity_score())
+        .order_by()
+        .values('bin')
+        .annotate(
+            incidents=Count('pk'),
+            duration_minutes=Sum('duration_minutes'),
+            mean_severity=Avg('score'),
+            max_severity=Max('score'),
+            **{incident_type: Count('pk', filter=Q(incident_type=incident_type)) for incident_type in INCIDENT_TYPES},
+        )
+    )
+
+    by_bin = defaultdict(dict)
+    for rows in (sessions, abc, incidents):
+        for row in rows:
+            by_bin[_as_date(row.pop('bin'))].update(row)
+
+    series = []
+    for start in _bins(start_date, end_date, bin_size):
+        row = by_bin.get(start, {})
+        session_count = row.get('sessions', 0)
+        abc_count = row.get('abc_events', 0)
+        incident_count = row.get('incidents', 0)
+        mean_severity = row.get('mean_severity')
+        series.append({
+            'bin_start': start,
+            'sessions': session_count,
+            'abc_events': abc_count,
+            'incidents': incident_count,
+            'incident_duration_minutes': row.get('duration_minutes') or 0,
+            'mean_severity': round(mean_severity, 2) if mean_severity is not None else None,
+            'max_severity': SEVERITY_NAMES.get(row.get('max_severity')),
+            'incident_types': {incident_type: row.get(incident_type, 0) for incident_type in INCIDENT_TYPES},
+            'abc_events_per_session': round(abc_count / session_count, 3) if session_count else None,
+            'incidents_per_session': round(incident_count / session_count, 3) if session_count else None,
+        })
+    return series
+
+
+def contingency(client_id, start_date, end_date, limit=CONTINGENCY_LIMIT):
+    """
+    Antecedent -> behavior -> consequence co-occurrence counts.
+
+    The free-text fields are grouped case- and whitespace-insensitively in one
+    query; pair tables and P(behavior | antecedent) are summed from those rows.
+    """
+    rows = list(
+        ABCEvent.objects.filter(
+            session__client_id=client_id,
+            session__session_date__gte=start_date, session__session_date__lte=end_date,
+        )
+        .annotate(
+            a=Lower(Trim('antecedent')),
+            b=Lower(Trim('behavior')),
+            c=Lower(Trim('consequence')),
+        )
+        .order_by()
+        .values('a', 'b', 'c')
+        .annotate(count=Count('pk'))
+    )
+    total = sum(row['count'] for row in rows)
+    antecedent_totals = defaultdict(int)
+    behavior_totals = defaultdict(int)
+    antecedent_behavior = defaultdict(int)
+    behavior_consequence = defaultdict(int)
+    for row in rows:
+        antecedent_totals[row['a']] += row['count']
+        behavior_totals[row['b']] += row['count']
+        antecedent_behavior[row['a'], row['b']] += row['count']
+        behavior_consequence[row['b'], row['c']] += row['count']
+
+    def top(counts):
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    return {
+        'total_events': total,
+        'triples': [
+            {'antecedent': row['a'], 'behavior': row['b'], 'consequence': row['c'], 'count': row['count']}
+            for row in sorted(rows, key=lambda row: (-row['count'], row['a'], row['b'], row['c']))[:limit]
+        ],
+        'antecedent_behavior': [
+            {
+                'antecedent': antecedent, 'behavior': behavior, 'count': count,
+                'probability': round(count / antecedent_totals[antecedent], 3),
+            }
+            for (antecedent, behavior), count in top(antecedent_behavior)
+        ],
+        'behavior_consequence': [
+            {
+                'behavior': behavior, 'consequence': consequence, 'count': count,
+                'probability': round(count / behavior_totals[behavior], 3),
+            }
+            for (behavior, consequence), count in top(behavior_consequence)
+        ],
+        'antecedents': [{'antecedent': name, 'count': count} for name, count in top(antecedent_totals)],
+        'behaviors': [{'behavior': name, 'count': count} for name, count in top(behavior_totals)],
+    }
+
+
+def client_behavior_analytics(client_id, start_date, end_date, bin_size='day'):
+    """Time series, trends and contingency table for one client, cached per client/range/bin"""
+    def build():
+        series = time_series(client_id, start_date, end_date, bin_size)
+        trends = {
+            field: trend([entry[field] for entry in series])
+            for field in ('abc_events', 'incidents', 'incident_duration_minutes')
+        }
+        # Severity only trends over bins that had incidents
+        trends['mean_severity'] = trend([entry['mean_severity'] for entry in series if entry['mean_severity'] is not None])
+        sessions = sum(entry['sessions'] for entry in series)
+        abc_events = sum(entry['abc_events'] for entry in series)
+        incidents = sum(entry['incidents'] for entry in series)
+        return {
+            'client_id': client_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'bin': bin_size,
+            'totals': {
+                'sessions': sessions,
+                'abc_events': abc_events,
+                'incidents': incidents,
+                'incident_duration_minutes': sum(entry['incident_duration_minutes'] for entry in series),
+                'abc_events_per_session': round(abc_events / sessions, 3) if sessions else None,
+                'incidents_per_session': round(incidents / sessions, 3) if sessions else None,
+            },
+            'trends': trends,
+            'series': series,
+            'contingency': contingency(client_id, start_date, end_date),
+        }
+
+    return cached('behavior', f'client:{client_id}', {'start': start_date, 'end': end_date, 'bin': bin_size}, build)
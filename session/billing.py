@@ -0,0 +1,237 @@
+"""
+Payroll and billing export.
+
+Billable time comes from three places, each aggregated in SQL per staff
+member, client, service type, category and pay period:
+
+- SessionTimer.total_duration (category "session")
+- TimeTracker entries, end_time - start_time (category = time type)
+- AdditionalTime entries, minutes or hours (category = time type)
+
+Rows are streamed as CSV through generators (``iterator()`` on the queries,
+one CSV line at a time), so memory stays flat however large the range is.
+The CSV starts with a UTF-8 BOM so Excel opens it with the right encoding.
+
+Each row also gets billing units (15 minutes by default) using one of the
+ROUNDING_RULES. Units are rounded per date of service, as the CMS 8-minute
+rule counts them, and then summed over the week or month of the row: the
+queries group by service day too, and consecutive day rows are folded into
+their period row while streaming.
+"""
+import csv
+import os
+import secrets
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, Count, DateField, DurationField, ExpressionWrapper, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import AdditionalTime, PayrollExport, SessionTimer, TimeTracker
+
+PERIODS = ('day', 'week', 'month')
+ROUNDING_RULES = ('cms_8_minute', 'up', 'down', 'nearest')
+
+CSV_HEADER = [
+    'source', 'period_start', 'staff_id', 'staff_name', 'client_id', 'client_name',
+    'service_type', 'category', 'entries', 'minutes', 'hours', 'units',
+]
+
+
+def get_unit_minutes():
+    return int(getattr(settings, 'BILLING_UNIT_MINUTES', 15))
+
+
+def get_default_rounding():
+    return getattr(settings, 'BILLING_ROUNDING', 'cms_8_minute')
+
+
+def billing_units(minutes, rounding, unit_minutes=None):
+    """
+    Units for ``minutes`` of service on one date of service.
+
+    cms_8_minute: a unit needs more than half of it (8+ of 15 minutes), as
+    Medicare's 8-minute rule; up/down: ceiling/floor; nearest: half rounds up.
+    """
+    unit_minutes = unit_minutes or get_unit_minutes()
+    whole, remainder = divmod(int(round(minutes)), unit_minutes)
+    if rounding == 'cms_8_minute':
+        return whole + (1 if remainder > unit_minutes / 2 else 0)
+    if rounding == 'up':
+        return whole + (1 if remainder else 0)
+    if rounding == 'down':
+        return whole
+    if rounding == 'nearest':
+        return whole + (1 if remainder >= unit_minutes / 2 else 0)
+    raise ValueError(f"Unknown rounding rule '{rounding}'")
+
+
+def _period(field, period, is_datetime):
+    if period == 'week':
+        return TruncWeek(field, output_field=DateField())
+    if period == 'month':
+        return TruncMonth(field, output_field=DateField())
+    return TruncDate(field) if is_datetime else F(field)
+
+
+def _grouped(queryset, period_expression, day_expression, staff, minutes_expression, category):
+    """values() + annotate() with one row per (period, staff, client, service type, category, service day)"""
+    return (
+        queryset
+        .annotate(
+            period_start=period_expression,
+            service_day=day_expression,
+            row_staff_id=F(staff),
+            row_staff_name=F(f'{staff}__name'),
+            row_staff_username=F(f'{staff}__username'),
+            row_category=category,
+        )
+        .values(
+            'period_start', 'service_day', 'row_staff_id', 'row_staff_name', 'row_staff_username',
+            'session__client_id', 'session__client__name', 'session__client__username',
+            'session__service_type', 'row_category',
+        )
+        .annotate(entries=Count('id'), total=Sum(minutes_expression))
+        # Day rows of one output row are adjacent, so export_rows can fold them in a single pass
+        .order_by(
+            'period_start', 'row_staff_id', 'session__client_id', 'session__service_type',
+            'row_category', 'service_day',
+        )
+    )
+
+
+def source_queries(start_date, end_date, period='week'):
+    """(source name, grouped queryset, total is a timedelta) for every billable source"""
+    duration = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+    additional_minutes = Case(
+        When(unit='hours', then=F('duration') * 60),
+        default=F('duration'),
+        output_field=IntegerField(),
+    )
+    in_range = {'session__session_date__gte': start_date, 'session__session_date__lte': end_date}
+
+    return [
+        ('session_timer', _grouped(
+            SessionTimer.objects.filter(**in_range),
+            _period('session__session_date', period, False), F('session__session_date'),
+            'session__staff', F('total_duration'), Value('session'),
+        ), True),
+        ('time_tracker', _grouped(
+            TimeTracker.objects.filter(start_time__date__gte=start_date, start_time__date__lte=end_date),
+            _period('start_time', period, True), TruncDate('start_time'),
+            'created_by', duration, F('time_type'),
+        ), True),
+        ('additional_time', _grouped(
+            AdditionalTime.objects.filter(**in_range),
+            _period('session__session_date', period, False), F('session__session_date'),
+            'session__staff', additional_minutes, F('time_type'),
+        ), False),
+    ]
+
+
+def export_rows(start_date, end_date, period='week', rounding=None, chunk_size=2000):
+    """Yield one list per CSV row (header first); units are rounded per service day and summed"""
+    rounding = rounding or get_default_rounding()
+    unit_minutes = get_unit_minutes()
+    yield CSV_HEADER
+    for source, queryset, is_duration in source_queries(start_date, end_date, period):
+        current, key = None, None
+        for row in queryset.iterator(chunk_size=chunk_size):
+            total = row['total']
+            minutes = (total.total_seconds() / 60 if total else 0) if is_duration else (total or 0)
+            row_key = (
+                row['period_start'], row['row_staff_id'], row['session__client_id'],
+                row['session__service_type'], row['row_category'],
+            )
+            if row_key != key:
+                if current is not None:
+                    yield _csv_row(current)
+                key = row_key
+                current = dict(row, source=source, entries=0, minutes=0, units=0)
+            current['entries'] += row['entries']
+            current['minutes'] += minutes
+            current['units'] += billing_units(minutes, rounding, unit_minutes)
+        if current is not None:
+            yield _csv_row(current)
+
+
+def _csv_row(row):
+    minutes = row['minutes']
+    return [
+        row['source'],
+        row['period_start'],
+        row['row_staff_id'],
+        row['row_staff_name'] or row['row_staff_username'] or '',
+        row['session__client_id'],
+        row['session__client__name'] or row['session__client__username'] or '',
+        row['session__service_type'] or '',
+        row['row_category'],
+        row['entries'],
+        round(minutes, 2),
+        round(minutes / 60, 2),
+        row['units'],
+    ]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Generator of CSV text chunks for ``rows`` (BOM first for Excel)"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_export(export):
+    """
+    Run ``export`` synchronously: stream its CSV to PRIVATE_MEDIA_ROOT/exports/ and record the outcome.
+
+    The file holds client/staff and pay data, so it lives outside MEDIA_ROOT under an
+    unguessable name and is only served by the authenticated download view.
+    """
+    export.status = 'running'
+    export.save(update_fields=['status'])
+    name = f'exports/payroll-{export.id}-{secrets.token_urlsafe(16)}.csv'
+    path = export.file.storage.path(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = 0
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            for chunk in stream_csv(export_rows(export.start_date, export.end_date, export.period, export.rounding)):
+                handle.write(chunk)
+                rows += 1
+        export.file.name = name
+        export.row_count = max(rows - 2, 0)  # BOM and header
+        export.status = 'completed'
+    except Exception as e:
+        export.status = 'failed'
+        export.error = str(e)
+    export.completed_at = timezone.now()
+    export.save(update_fields=['file', 'row_count', 'status', 'error', 'completed_at'])
+    return export
+
+
+def _run_in_background(export_id):
+    close_old_connections()
+    try:
+        export = PayrollExport.objects.filter(id=export_id, status='pending').first()
+        if export:
+            write_export(export)
+    finally:
+        close_old_connections()
+
+
+def start_export(export):
+    """Run ``export`` in a background thread once the creating transaction commits"""
+    def launch():
+        thread = threading.Thread(target=_run_in_background, args=(export.id,), daemon=True)
+        thread.start()
+    transaction.on_commit(launch)
@@ -0,0 +1,105 @@
+"""
+Calendar feed helpers: compact session rows, a cheap version stamp for
+conditional GETs, and iCalendar rendering.
+
+The version stamp is Max(updated_at) plus Count over the same window, so an
+edit moves the max and a delete moves the count; clients revalidate with
+If-None-Match and get a 304 without any rows being read or serialized.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+MAX_CALENDAR_DAYS = 93
+
+CALENDAR_FIELDS = (
+    'id', 'session_date', 'start_time', 'end_time', 'status', 'location',
+    'client_id', 'client__name', 'client__username',
+    'staff_id', 'staff__name', 'staff__username',
+)
+
+ICAL_STATUS = {
+    'scheduled': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+}
+
+
+def calendar_etag(queryset, *scope):
+    """Weak ETag for a calendar window from one aggregate query"""
+    stamp = queryset.order_by().aggregate(last_updated=Max('updated_at'), total=Count('id'))
+    last_updated = stamp['last_updated'].isoformat() if stamp['last_updated'] else '-'
+    digest = hashlib.md5(
+        ':'.join([last_updated, str(stamp['total'])] + [str(part) for part in scope]).encode('utf-8')
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def calendar_rows(queryset):
+    """Compact rows for the calendar grid, straight from values() (no serializer)"""
+    rows = []
+    for row in queryset.order_by('session_date', 'start_time', 'id').values(*CALENDAR_FIELDS):
+        rows.append({
+            'id': row['id'],
+            'date': row['session_date'],
+            'start': row['start_time'],
+            'end': row['end_time'],
+            'status': row['status'],
+            'location': row['location'],
+            'client_id': row['client_id'],
+            'client_name': row['client__name'] or row['client__username'],
+            'staff_id': row['staff_id'],
+            'staff_name': row['staff__name'] or row['staff__username'],
+        })
+    return rows
+
+
+def _ical_escape(value):
+    return (
+        str(value or '')
+        .replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _ical_datetime(day, clock):
+    value = datetime.combine(day, clock)
+    if settings.USE_TZ:
+        # Session times are wall-clock times in the project time zone
+        value = timezone.make_aware(value).astimezone(dt_timezone.utc)
+        return value.strftime('%Y%m%dT%H%M%SZ')
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def render_ical(rows, calendar_name):
+    """Render calendar_rows() output as an iCalendar (RFC 5545) document"""
+    now = timezone.now().astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Sapphire//Session Calendar//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ical_escape(calendar_name)}',
+    ]
+    for row in rows:
+        lines.extend([
+            'BEGIN:VEVENT',
+            f"UID:session-{row['id']}@sapphire",
+            f'DTSTAMP:{now}',
+            f"DTSTART:{_ical_datetime(row['date'], row['start'])}",
+            f"DTEND:{_ical_datetime(row['date'], row['end'])}",
+            f"SUMMARY:{_ical_escape('Session with ' + (row['client_name'] or 'client'))}",
+            f"LOCATION:{_ical_escape(row['location'])}",
+            f"STATUS:{ICAL_STATUS.get(row['status'], 'TENTATIVE')}",
+            'END:VEVENT',
+        ])
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
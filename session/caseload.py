@@ -0,0 +1,99 @@
+"""
+Caseload statistics for therapy sessions.
+
+Every helper here answers from a single grouped/conditional aggregate over
+session.Session, so the number of queries does not grow with the number of
+clients on a caseload.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import Session
+
+RECENT_DAYS = 30
+UPCOMING_STATUSES = ['scheduled', 'in_progress']
+
+
+def _session_counts(today, recent_date):
+    """Conditional counts shared by the caseload and per-client helpers"""
+    return {
+        'total_sessions': Count('id'),
+        'completed_sessions': Count('id', filter=Q(status='completed')),
+        'cancelled_sessions': Count('id', filter=Q(status='cancelled')),
+        'missed_sessions': Count('id', filter=Q(status='cancelled', session_date__lt=today)),
+        'late_cancellations': Count('id', filter=Q(status='cancelled', session_date=today)),
+        'recent_sessions_30_days': Count('id', filter=Q(session_date__gte=recent_date)),
+        'upcoming_sessions': Count('id', filter=Q(session_date__gte=today, status__in=UPCOMING_STATUSES)),
+        'future_sessions': Count('id', filter=Q(session_date__gte=today)),
+    }
+
+
+def _with_rates(stats):
+    total = stats['total_sessions']
+    stats['completion_rate'] = round((stats['completed_sessions'] / total * 100), 2) if total > 0 else 0
+    return stats
+
+
+def empty_statistics():
+    stats = {key: 0 for key in _session_counts(None, None)}
+    stats.update({'last_session_date': None, 'last_session_id': None, 'last_session_status': None})
+    return _with_rates(stats)
+
+
+def caseload_statistics(client_ids=None, staff=None):
+    """
+    Per-client session statistics from one grouped query.
+
+    Returns {client_id: stats}; clients without sessions are absent, use
+    ``empty_statistics()`` for them. When ``staff`` is given only sessions run
+    by that staff member are counted.
+    """
+    today = timezone.now().date()
+    recent_date = today - timedelta(days=RECENT_DAYS)
+
+    sessions = Session.objects.all()
+    if staff is not None:
+        sessions = sessions.filter(staff=staff)
+    if client_ids is not None:
+        sessions = sessions.filter(client_id__in=client_ids)
+
+    last_session = sessions.filter(client_id=OuterRef('client_id')).order_by('-session_date', '-start_time')
+    rows = (
+        sessions.order_by()
+        .values('client_id')
+        .annotate(
+            **_session_counts(today, recent_date),
+            last_session_date=Max('session_date'),
+            last_session_id=Subquery(last_session.values('id')[:1]),
+            last_session_status=Subquery(last_session.values('status')[:1]),
+        )
+    )
+
+    statistics = {}
+    for row in rows:
+        client_id = row.pop('client_id')
+        statistics[client_id] = _with_rates(row)
+    return statistics
+
+
+def client_statistics(client, staff=None):
+    """Session statistics for one client"""
+    return caseload_statistics([client.id], staff=staff).get(client.id) or empty_statistics()
+
+
+def user_session_statistics(user):
+    """Staff-side and client-side session counts for one user in a single aggregate"""
+    today = timezone.now().date()
+    recent_date = today - timedelta(days=RECENT_DAYS)
+    as_staff = Q(staff=user)
+    as_client = Q(client=user)
+
+    return Session.objects.filter(as_staff | as_client).aggregate(
+        total_sessions_as_staff=Count('id', filter=as_staff),
+        total_sessions_as_client=Count('id', filter=as_client),
+        recent_sessions_as_staff=Count('id', filter=as_staff & Q(session_date__gte=recent_date)),
+        recent_sessions_as_client=Count('id', filter=as_client & Q(session_date__gte=recent_date)),
+        upcoming_sessions=Count('id', filter=Q(session_date__gte=today)),
+    )
@@ -0,0 +1,28 @@
+"""
+System checks for session deployment settings.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CHANNEL_LAYERS = (
+    'channels.layers.InMemoryChannelLayer',
+)
+
+
+@register()
+def channel_layer_check(app_configs, **kwargs):
+    """Timer pushes (session/timer.py) need a channel layer shared by every worker"""
+    backend = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CHANNEL_LAYERS:
+        return []
+    return [
+        Warning(
+            'The default channel layer is process-local.',
+            hint=(
+                'Timer updates published by one worker never reach sockets on another. Configure a shared '
+                'layer such as channels_redis.core.RedisChannelLayer, or add "session.W001" to '
+                'SILENCED_SYSTEM_CHECKS if a single process serves both HTTP and websockets.'
+            ),
+            id='session.W001',
+        )
+    ]
@@ -0,0 +1,55 @@
+import json
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+
+class SessionTimerConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes timer state for one session (ws/sessions/<session_id>/timer/).
+
+    The current state is sent on connect and after every transition; clients
+    derive elapsed time from start_time/total_seconds locally.
+    """
+
+    async def connect(self):
+        from .timer import group_name
+
+        self.user = self.scope.get('user')
+        self.session_id = int(self.scope['url_route']['kwargs']['session_id'])
+        self.group_name = group_name(self.session_id)
+
+        state = await self._current_state()
+        if state is None:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send(text_data=json.dumps({'type': 'timer_state', 'state': state}))
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data):
+        # Clients only listen; a resync request gets the current state back
+        data = json.loads(text_data)
+        if data.get('type') == 'sync':
+            state = await self._current_state()
+            if state is not None:
+                await self.send(text_data=json.dumps({'type': 'timer_state', 'state': state}))
+
+    async def timer_state(self, event):
+        await self.send(text_data=json.dumps({'type': 'timer_state', 'state': event['state']}))
+
+    @database_sync_to_async
+    def _current_state(self):
+        """Current state, or None if the user may not see this session"""
+        from .models import Session, SessionTimer
+        from .timer import can_manage, timer_state
+
+        if self.user is None or not self.user.is_authenticated:
+            return None
+        session = Session.objects.filter(id=self.session_id).first()
+        if session is None or not can_manage(self.user, session):
+            return None
+        return timer_state(SessionTimer.objects.filter(session=session).first(), session.id)
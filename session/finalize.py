@@ -0,0 +1,213 @@
+"""
+Session finalize pipeline.
+
+Every way of finishing a session (submit, Ocean finalize, scheduler end,
+timer stop) goes through ``finalize``, which in one transaction:
+
+1. locks the session row (``select_for_update``), so concurrent duplicates queue up
+2. replays the stored outcome if this user already sent the same Idempotency-Key
+3. stops the timer (session/timer.py)
+4. validates and finalizes the SessionNoteFlow when the caller requires a note
+5. marks the session completed and records the outcome under the key
+6. queues DOWNSTREAM_TASKS to run in the background once the transaction commits
+
+A session that is already completed (with its note finalized, when one is
+required) is reported as such without touching anything, so retries without
+a key are cheap too.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .models import FinalizeRequest, Session, SessionNote
+from .timer import apply_action as apply_timer_action
+
+logger = logging.getLogger(__name__)
+
+NOTE_REQUIREMENTS = (None, 'completed', 'submitted')
+
+
+class FinalizeBlocked(Exception):
+    """The session can't be finalized yet; ``payload`` explains why"""
+
+    def __init__(self, payload, status_code=400):
+        super().__init__(payload.get('error'))
+        self.payload = payload
+        self.status_code = status_code
+
+
+def idempotency_key(request):
+    """Idempotency-Key header, or idempotency_key in the body; None if absent"""
+    key = request.headers.get('Idempotency-Key')
+    if not key and hasattr(request, 'data') and hasattr(request.data, 'get'):
+        key = request.data.get('idempotency_key')
+    return str(key)[:100] if key else None
+
+
+def _note_flow_status(note_flow):
+    return {
+        'is_note_completed': note_flow.is_note_completed if note_flow else False,
+        'final_note_submitted': note_flow.final_note_submitted if note_flow else False,
+        'ai_generated_note': note_flow.ai_generated_note if note_flow else None,
+    }
+
+
+def _check_note(note_flow, note_requirement):
+    if note_flow is None:
+        raise FinalizeBlocked({
+            'can_finalize': False,
+            'error': 'Session note flow not initialized',
+            'message': 'Please start the session note flow before finalizing the session.',
+            'note_flow_status': _note_flow_status(None),
+        })
+    if note_requirement == 'submitted' and not note_flow.final_note_submitted:
+        raise FinalizeBlocked({
+            'can_finalize': False,
+            'error': 'Session note must be completed before ending session',
+            'message': 'Please complete and finalize your session note before ending the session.',
+            'note_flow_status': _note_flow_status(note_flow),
+        })
+    if not note_flow.is_note_completed:
+        raise FinalizeBlocked({
+            'can_finalize': False,
+            'error': 'Session note must be completed before finalizing',
+            'required_actions': [
+                'Complete session note content',
+                'Review and finalize session note',
+                'Submit final session note'
+            ],
+            'note_flow_status': _note_flow_status(note_flow),
+        })
+
+
+def finalize(session_id, user, source, key=None, note_requirement=None):
+    """
+    Finalize ``session_id`` for ``user``; returns (payload, status_code).
+
+    ``note_requirement``: None (finalize the note flow only if it is complete),
+    'completed' (note must be completed) or 'submitted' (note must already be
+    submitted). Raises FinalizeBlocked when the requirement isn't met or ``key``
+    was already used for another session or source, and
+    Session.DoesNotExist for an unknown session; neither leaves any change behind.
+    """
+    from ocean.models import SessionNoteFlow
+
+    with transaction.atomic():
+        session = Session.objects.select_for_update().get(id=session_id)
+
+        if key:
+            previous = FinalizeRequest.objects.filter(user=user, key=key).first()
+            if previous is not None:
+                # A key is only a retry of the same call; never replay another session's outcome
+                if previous.session_id != session.id or previous.source != source:
+                    raise FinalizeBlocked({
+                        'error': 'Idempotency-Key was already used for a different request',
+                        'message': 'Use a new Idempotency-Key for each session action.',
+                    }, status_code=422)
+                return dict(previous.response, idempotent_replay=True), previous.status_code
+
+        note_flow = SessionNoteFlow.objects.select_for_update().filter(session=session).first()
+        note_done = note_flow is not None and note_flow.final_note_submitted
+        if session.status == 'completed' and (note_requirement is None or note_done):
+            # Status is editable elsewhere, so a completed session can still have a running timer
+            apply_timer_action(session, 'stop')
+            payload = {
+                'session_id': session.id,
+                'status': session.status,
+                'already_finalized': True,
+                'note_flow_status': _note_flow_status(note_flow),
+            }
+            return payload, 200
+
+        if note_requirement:
+            _check_note(note_flow, note_requirement)
+
+        timer, _ = apply_timer_action(session, 'stop')
+
+        fields = ['status', 'updated_at']
+        if note_flow is not None and note_flow.is_note_completed:
+            if not note_flow.final_note_submitted:
+                note_flow.final_note_submitted = True
+                note_flow.save(update_fields=['final_note_submitted', 'updated_at'])
+            final_note = note_flow.ai_generated_note or note_flow.note_content
+            if final_note:
+                session.session_notes = final_note
+                fields.append('session_notes')
+        session.status = 'completed'
+        session.save(update_fields=fields)
+
+        payload = {
+            'session_id': session.id,
+            'status': session.status,
+            'already_finalized': False,
+            'total_duration': str(timer.total_duration) if timer else None,
+            'note_flow_status': _note_flow_status(note_flow),
+        }
+        if key:
+            FinalizeRequest.objects.create(key=key, user=user, session=session, source=source, response=payload)
+        enqueue_downstream(session.id)
+    return payload, 200
+
+
+def refresh_rollups(session):
+    """Drop cached aggregates that include this session's week"""
+    from .utilization import WEEK_KEY, week_start
+    cache.delete(WEEK_KEY.format(week=week_start(session.session_date).isoformat()))
+
+
+def generate_ai_note(session):
+    """Store an AI summary note (FINALIZE_AI_NOTES); skipped if one already exists"""
+    if not getattr(settings, 'FINALIZE_AI_NOTES', False):
+        return
+    if session.notes.filter(note_type='ai_generated').exists():
+        return
+    from ocean.utils import generate_session_notes
+
+    timer = getattr(session, 'timer', None)
+    session_data = {
+        'session_info': {
+            'client': session.client.name or session.client.username,
+            'staff': (session.staff.name or session.staff.username) if session.staff else '',
+            'date': str(session.session_date),
+            'start_time': str(session.start_time),
+            'end_time': str(session.end_time),
+            'location': session.location or 'Not specified',
+            'service_type': session.service_type or 'ABA',
+            'status': session.status,
+        },
+        'timer': {'total_duration': str(timer.total_duration) if timer else 'Not tracked', 'is_running': False},
+        'activities': list(session.activities.values('activity_name', 'duration_minutes', 'notes')),
+        'goals': list(session.goal_progress.values('goal_description', 'is_met', 'implementation_method', 'notes')),
+        'abc_events': list(session.abc_events.values('antecedent', 'behavior', 'consequence')),
+        'reinforcement_strategies': list(session.reinforcement_strategies.values('strategy_type', 'frequency', 'notes')),
+        'incidents': list(session.incidents.values('incident_type', 'behavior_severity', 'duration_minutes', 'description')),
+    }
+    note = generate_session_notes(session_data)
+    if note and not note.startswith('AI error'):
+        SessionNote.objects.create(session=session, note_content=note, note_type='ai_generated')
+
+
+DOWNSTREAM_TASKS = (refresh_rollups, generate_ai_note)
+
+
+def _run_downstream(session_id):
+    close_old_connections()
+    try:
+        session = Session.objects.select_related('client', 'staff').filter(id=session_id).first()
+        for task in DOWNSTREAM_TASKS if session else ():
+            try:
+                task(session)
+            except Exception:
+                logger.exception('Finalize task %s failed for session %s', task.__name__, session_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_downstream(session_id):
+    """Run DOWNSTREAM_TASKS in a background thread once the current transaction commits"""
+    def launch():
+        threading.Thread(target=_run_downstream, args=(session_id,), daemon=True).start()
+    transaction.on_commit(launch)
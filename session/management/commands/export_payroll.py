@@ -0,0 +1,38 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from session.billing import PERIODS, ROUNDING_RULES, export_rows, get_default_rounding, stream_csv
+
+
+class Command(BaseCommand):
+    help = 'Export payroll/billing hours and units per staff, client, service type and period as CSV (streamed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', required=True, help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--period', choices=PERIODS, default='week', help='Pay period grouping')
+        parser.add_argument('--rounding', choices=ROUNDING_RULES, help='Billing unit rounding rule (default BILLING_ROUNDING)')
+        parser.add_argument('--output', default='-', help="File to write, or '-' for stdout")
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start'])
+            end_date = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+        if end_date < start_date:
+            raise CommandError('--end must be on or after --start')
+
+        rows = export_rows(start_date, end_date, options['period'], options['rounding'] or get_default_rounding())
+        if options['output'] == '-':
+            for chunk in stream_csv(rows):
+                sys.stdout.write(chunk.lstrip('\ufeff'))
+            return
+
+        written = 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+            for chunk in stream_csv(rows):
+                handle.write(chunk)
+                written += 1
+        self.stdout.write(self.style.SUCCESS(f"Wrote {max(written - 2, 0)} row(s) to {options['output']}"))
@@ -0,0 +1,264 @@
+"""
+Goal mastery engine.
+
+Every TreatmentGoal mastery criterion is parsed into a rule (see ``RULES``)
+and evaluated against the goal's per-session series for a client: one row
+per session, in session order, with trial/success/independent counts,
+occurrences and mean latency (GoalProgress columns, rolled up from GoalTrial
+rows when trials are recorded individually).
+
+A client's whole series comes from one ordered values() query; each rule
+is then a pass over plain numeric lists (per-session ratios, the trailing
+streak of sessions at or above the threshold, baseline vs recent means), so
+evaluating every goal for a client costs three queries. Results are stored
+in GoalMastery, updated incrementally from the GoalProgress/GoalTrial
+receivers in session.models, and read as-is by progress screens.
+
+Criteria that need a clinician's judgement (generalization, prompt fading,
+custom text, multi-target criteria) are stored as ``needs_review``.
+"""
+import re
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import GoalMastery, GoalProgress, GoalTrial
+
+DEFAULT_THRESHOLD = 80.0
+SERIES_FIELDS = (
+    'goal_id', 'session__session_date', 'trial_count', 'success_count',
+    'independent_count', 'occurrence_count', 'mean_latency_seconds', 'percentage', 'is_met',
+)
+
+_ACCURACY = re.compile(r'^(\d+)%_accuracy(?:_for_(\d+)_consecutive_sessions)?$')
+_OPPORTUNITIES = re.compile(r'^(\d+)/(\d+)_opportunities$')
+_CONSECUTIVE = re.compile(r'^(\d+)_consecutive_sessions$')
+
+RULES = {
+    'independent_in_80%_of_trials': {'kind': 'independent', 'threshold': 80.0, 'sessions': 1},
+    'independent_in_3_consecutive_sessions': {'kind': 'independent', 'threshold': 80.0, 'sessions': 3},
+    'no_prompts_in_3_consecutive_sessions': {'kind': 'independent', 'threshold': 100.0, 'sessions': 3},
+    'maintained_for_2_weeks': {'kind': 'maintained', 'threshold': DEFAULT_THRESHOLD, 'days': 14},
+    'maintained_for_1_month': {'kind': 'maintained', 'threshold': DEFAULT_THRESHOLD, 'days': 30},
+    'meets_goal_for_2_weeks': {'kind': 'maintained', 'threshold': DEFAULT_THRESHOLD, 'days': 14},
+    'reduced_by_50%': {'kind': 'reduction', 'reduction': 50.0, 'window': 3},
+    'reduced_by_80%': {'kind': 'reduction', 'reduction': 80.0, 'window': 3},
+    'less_than_1_occurrence_per_day': {'kind': 'frequency', 'below': 1.0, 'days': 7},
+    'within_10_seconds_of_instruction': {'kind': 'latency', 'seconds': 10.0},
+    'latency_under_5_seconds': {'kind': 'latency', 'seconds': 5.0},
+    'spontaneous_3_times_per_session': {'kind': 'count', 'field': 'independent_count', 'minimum': 3},
+    '3+_activities_per_session': {'kind': 'count', 'field': 'trial_count', 'minimum': 3},
+}
+
+
+def parse_criterion(criterion):
+    """Rule dict for a MASTERY_CRITERIA_CHOICES value; kind 'manual' when it can't be evaluated from data"""
+    criterion = criterion or ''
+    if criterion in RULES:
+        return dict(RULES[criterion])
+    match = _ACCURACY.match(criterion)
+    if match:
+        return {'kind': 'accuracy', 'threshold': float(match.group(1)), 'sessions': int(match.group(2) or 1)}
+    match = _OPPORTUNITIES.match(criterion)
+    if match:
+        successes, opportunities = int(match.group(1)), int(match.group(2))
+        return {'kind': 'accuracy', 'threshold': successes / opportunities * 100, 'sessions': 1,
+                'min_trials': opportunities}
+    match = _CONSECUTIVE.match(criterion)
+    if match:
+        return {'kind': 'accuracy', 'threshold': DEFAULT_THRESHOLD, 'sessions': int(match.group(1))}
+    return {'kind': 'manual'}
+
+
+def session_threshold(criterion):
+    """Per-session accuracy (%) that counts a session as met under ``criterion``"""
+    rule = parse_criterion(criterion)
+    return rule.get('threshold', DEFAULT_THRESHOLD)
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator * 100 if denominator else None
+
+
+def _trailing_streak(flags):
+    streak = 0
+    for flag in reversed(flags):
+        if not flag:
+            break
+        streak += 1
+    return streak
+
+
+def evaluate(rule, series, today=None):
+    """
+    (status, progress 0-1, detail) for one goal's session series (oldest first).
+
+    ``series`` rows are dicts with SERIES_FIELDS.
+    """
+    if rule['kind'] == 'manual':
+        return 'needs_review', 0.0, {'reason': 'Criterion requires clinician review'}
+    if not series:
+        return 'no_data', 0.0, {}
+
+    today = today or timezone.now().date()
+    kind = rule['kind']
+    accuracy = [row['percentage'] if row['percentage'] is not None else (100.0 if row['is_met'] else 0.0) for row in series]
+
+    if kind in ('accuracy', 'independent'):
+        if kind == 'independent':
+            values = [_ratio(row['independent_count'] or 0, row['trial_count']) for row in series]
+        else:
+            values = accuracy
+        min_trials = rule.get('min_trials', 0)
+        flags = [
+            value is not None and value >= rule['threshold'] and (row['trial_count'] or 0) >= min_trials
+            for value, row in zip(values, series)
+        ]
+        streak = _trailing_streak(flags)
+        required = rule['sessions']
+        detail = {'threshold': rule['threshold'], 'required_sessions': required, 'current_streak': streak,
+                  'recent_values': [round(value, 1) if value is not None else None for value in values[-required:]]}
+        if min_trials:
+            detail['min_trials'] = min_trials
+        return ('mastered' if streak >= required else 'in_progress'), min(streak / required, 1.0), detail
+
+    if kind == 'maintained':
+        start = today - timedelta(days=rule['days'])
+        window = [value for value, row in zip(accuracy, series) if row['session__session_date'] >= start]
+        covered = (today - series[0]['session__session_date']).days >= rule['days']
+        met = bool(window) and covered and all(value >= rule['threshold'] for value in window)
+        share = sum(value >= rule['threshold'] for value in window) / len(window) if window else 0.0
+        detail = {'threshold': rule['threshold'], 'days': rule['days'], 'sessions_in_window': len(window),
+                  'history_covers_window': covered}
+        return ('mastered' if met else 'in_progress'), (1.0 if met else share * (0.99 if covered else 0.5)), detail
+
+    if kind == 'reduction':
+        counts = [row['occurrence_count'] for row in series if row['occurrence_count'] is not None]
+        window = rule['window']
+        if len(counts) < window * 2:
+            return 'in_progress', 0.0, {'reason': f'Needs {window * 2} sessions with occurrence counts', 'sessions': len(counts)}
+        baseline = sum(counts[:window]) / window
+        recent = sum(counts[-window:]) / window
+        reduction = (baseline - recent) / baseline * 100 if baseline else 0.0
+        detail = {'baseline_mean': round(baseline, 2), 'recent_mean': round(recent, 2),
+                  'reduction_percent': round(reduction, 1), 'target_percent': rule['reduction']}
+        return ('mastered' if reduction >= rule['reduction'] else 'in_progress'), max(0.0, min(reduction / rule['reduction'], 1.0)), detail
+
+    if kind == 'frequency':
+        start = today - timedelta(days=rule['days'])
+        per_day = {}
+        for row in series:
+            if row['session__session_date'] >= start and row['occurrence_count'] is not None:
+                day = row['session__session_date']
+                per_day[day] = per_day.get(day, 0) + row['occurrence_count']
+        if not per_day:
+            return 'in_progress', 0.0, {'reason': 'No occurrence counts in the window', 'days': rule['days']}
+        rate = sum(per_day.values()) / len(per_day)
+        detail = {'occurrences_per_day': round(rate, 2), 'below': rule['below'], 'days_with_data': len(per_day)}
+        return ('mastered' if rate < rule['below'] else 'in_progress'), (1.0 if rate < rule['below'] else rule['below'] / rate), detail
+
+    if kind == 'latency':
+        latencies = [row['mean_latency_seconds'] for row in series if row['mean_latency_seconds'] is not None]
+        if not latencies:
+            return 'in_progress', 0.0, {'reason': 'No latency recorded'}
+        latest = latencies[-1]
+        detail = {'latest_latency_seconds': round(latest, 2), 'target_seconds': rule['seconds']}
+        return ('mastered' if latest <= rule['seconds'] else 'in_progress'), min(rule['seconds'] / latest, 1.0) if latest else 1.0, detail
+
+    if kind == 'count':
+        latest = series[-1][rule['field']] or 0
+        detail = {'latest': latest, 'minimum': rule['minimum']}
+        return ('mastered' if latest >= rule['minimum'] else 'in_progress'), min(latest / rule['minimum'], 1.0), detail
+
+    return 'needs_review', 0.0, {'reason': f"Unknown rule kind '{kind}'"}
+
+
+def _criteria(goal_ids):
+    from treatment_plan.models import TreatmentGoal
+    return dict(TreatmentGoal.objects.filter(id__in=goal_ids).values_list('id', 'mastery_criteria'))
+
+
+def evaluate_client(client_id, goal_ids=None):
+    """
+    Re-evaluate mastery of ``goal_ids`` (default: every goal with data) for one client.
+
+    Three queries: the ordered series, the goals' criteria and the existing
+    GoalMastery rows; then one bulk create and one bulk update.
+    """
+    rows = GoalProgress.objects.filter(session__client_id=client_id, goal_id__isnull=False)
+    if goal_ids is not None:
+        rows = rows.filter(goal_id__in=goal_ids)
+    series = {}
+    for row in rows.order_by('session__session_date', 'session__start_time', 'id').values(*SERIES_FIELDS):
+        series.setdefault(row['goal_id'], []).append(row)
+
+    goal_ids = set(series) | set(goal_ids or ())
+    criteria = _criteria(goal_ids)
+    existing = {mastery.goal_id: mastery for mastery in GoalMastery.objects.filter(client_id=client_id, goal_id__in=goal_ids)}
+    now = timezone.now()
+    today = now.date()
+
+    created, updated, newly_mastered = [], [], []
+    for goal_id in goal_ids:
+        criterion = criteria.get(goal_id, '')
+        goal_series = series.get(goal_id, [])
+        status, progress, detail = evaluate(parse_criterion(criterion), goal_series, today)
+        mastery = existing.get(goal_id) or GoalMastery(client_id=client_id, goal_id=goal_id)
+        if status == 'mastered' and mastery.status != 'mastered':
+            mastery.mastered_at = now
+            newly_mastered.append(goal_id)
+        elif status != 'mastered':
+            mastery.mastered_at = None
+        mastery.criterion = criterion
+        mastery.status = status
+        mastery.progress = round(progress, 3)
+        mastery.sessions_evaluated = len(goal_series)
+        mastery.latest_percentage = goal_series[-1]['percentage'] if goal_series else None
+        mastery.detail = detail
+        mastery.updated_at = now
+        (updated if mastery.pk else created).append(mastery)
+
+    with transaction.atomic():
+        GoalMastery.objects.bulk_create(created)
+        GoalMastery.objects.bulk_update(updated, [
+            'criterion', 'status', 'progress', 'sessions_evaluated', 'latest_percentage',
+            'detail', 'mastered_at', 'updated_at',
+        ])
+        if newly_mastered:
+            from treatment_plan.models import TreatmentGoal
+            TreatmentGoal.objects.filter(id__in=newly_mastered, is_achieved=False).update(is_achieved=True, achieved_date=now)
+    return created + updated
+
+
+def rollup_trials(goal_progress_id):
+    """Recompute a GoalProgress row's counts from its GoalTrial rows"""
+    totals = GoalTrial.objects.filter(goal_progress_id=goal_progress_id).aggregate(
+        trials=Count('id'),
+        successes=Count('id', filter=Q(is_correct=True)),
+        independent=Count('id', filter=Q(is_correct=True, prompt_level='independent')),
+        latency=Avg('latency_seconds'),
+    )
+    progress = GoalProgress.objects.filter(id=goal_progress_id).first()
+    if progress is None:
+        return None
+    progress.trial_count = totals['trials']
+    progress.success_count = totals['successes']
+    progress.independent_count = totals['independent']
+    progress.mean_latency_seconds = totals['latency']
+    if totals['trials']:
+        threshold = session_threshold(_criteria([progress.goal_id]).get(progress.goal_id)) if progress.goal_id else DEFAULT_THRESHOLD
+        progress.is_met = totals['successes'] / totals['trials'] * 100 >= threshold
+    progress.save()
+    return progress
+
+
+def refresh_after_bulk(goal_progress_rows):
+    """Evaluate mastery for GoalProgress rows written without save() (bulk_create)"""
+    by_client = {}
+    for row in goal_progress_rows:
+        if row.goal_id:
+            by_client.setdefault(row.session.client_id, set()).add(row.goal_id)
+    for client_id, goal_ids in by_client.items():
+        evaluate_client(client_id, goal_ids)
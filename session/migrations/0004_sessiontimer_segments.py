@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0003_session_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessiontimer',
+            name='paused_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sessiontimer',
+            name='segments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='sessiontimer',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0006_syncoperation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goalprogress',
+            name='goal_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='independent_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='mean_latency_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='percentage',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='success_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='trial_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GoalMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('goal_id', models.PositiveBigIntegerField()),
+                ('criterion', models.CharField(blank=True, max_length=250)),
+                ('status', models.CharField(choices=[('no_data', 'No Data'), ('in_progress', 'In Progress'), ('mastered', 'Mastered'), ('needs_review', 'Needs Manual Review')], default='no_data', max_length=20)),
+                ('progress', models.FloatField(default=0)),
+                ('sessions_evaluated', models.PositiveIntegerField(default=0)),
+                ('latest_percentage', models.FloatField(blank=True, null=True)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('mastered_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goal_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('client', 'goal_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GoalTrial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trial_number', models.PositiveIntegerField()),
+                ('is_correct', models.BooleanField()),
+                ('prompt_level', models.CharField(choices=[('independent', 'Independent'), ('gestural', 'Gestural'), ('verbal', 'Verbal'), ('model', 'Model'), ('partial_physical', 'Partial Physical'), ('full_physical', 'Full Physical')], default='independent', max_length=20)),
+                ('latency_seconds', models.FloatField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('goal_progress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trial_records', to='session.goalprogress')),
+            ],
+            options={
+                'ordering': ['goal_progress', 'trial_number'],
+                'unique_together': {('goal_progress', 'trial_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:30
+
+import session.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0007_goal_trials_and_mastery'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrollexport',
+            name='file',
+            field=models.FileField(blank=True, storage=session.models.private_storage, upload_to='exports/'),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from datetime import timedelta
 
 User = get_user_model()
@@ -43,6 +47,10 @@ class Session(models.Model):
     class Meta:
         ordering = ['session_date', 'start_time']
         unique_together = ['staff', 'session_date', 'start_time', 'end_time']
+        indexes = [
+            # Keyset pagination order (session/pagination.py)
+            models.Index(fields=['session_date', 'start_time', 'id'], name='session_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.client.username} - {self.session_date} ({self.start_time}-{self.end_time})"
@@ -54,12 +62,16 @@ class SessionTimer(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     is_running = models.BooleanField(default=False)
     total_duration = models.DurationField(default=timedelta(seconds=0))
+    # Pause/resume state (session/timer.py): closed segments as [start epoch seconds, length seconds]
+    paused_at = models.DateTimeField(null=True, blank=True)
+    segments = models.JSONField(default=list, blank=True)
+    version = models.PositiveIntegerField(default=0)
 
     @property
     def current_duration(self):
         if self.start_time and self.is_running:
             from django.utils import timezone
-            return timezone.now() - self.start_time
+            return self.total_duration + (timezone.now() - self.start_time)
         return self.total_duration
 
     def __str__(self):
@@ -146,9 +158,53 @@ class GoalProgress(models.Model):
     implementation_method = models.CharField(max_length=20, choices=IMPLEMENTATION_CHOICES)
     notes = models.TextField(blank=True, null=True)
 
+    # Structured session data for the mastery engine (session/mastery.py).
+    # goal_id is a TreatmentGoal id; a plain integer because treatment_plan has no migrations.
+    goal_id = models.PositiveBigIntegerField(null=True, blank=True, db_index=True)
+    trial_count = models.PositiveIntegerField(null=True, blank=True)
+    success_count = models.PositiveIntegerField(null=True, blank=True)
+    independent_count = models.PositiveIntegerField(null=True, blank=True)
+    occurrence_count = models.PositiveIntegerField(null=True, blank=True)
+    mean_latency_seconds = models.FloatField(null=True, blank=True)
+    percentage = models.FloatField(null=True, blank=True)
+
+    def compute_percentage(self):
+        """Set percentage from the trial counts; bulk_create callers must call this themselves"""
+        if self.trial_count:
+            self.percentage = round((self.success_count or 0) / self.trial_count * 100, 1)
+
+    def save(self, *args, **kwargs):
+        self.compute_percentage()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.goal_description[:50]}... - {'Met' if self.is_met else 'Not Met'}"
 
+class GoalTrial(models.Model):
+    """One discrete trial for a goal in a session; GoalProgress counts are rolled up from these"""
+    PROMPT_LEVEL_CHOICES = [
+        ('independent', 'Independent'),
+        ('gestural', 'Gestural'),
+        ('verbal', 'Verbal'),
+        ('model', 'Model'),
+        ('partial_physical', 'Partial Physical'),
+        ('full_physical', 'Full Physical'),
+    ]
+
+    goal_progress = models.ForeignKey(GoalProgress, on_delete=models.CASCADE, related_name='trial_records')
+    trial_number = models.PositiveIntegerField()
+    is_correct = models.BooleanField()
+    prompt_level = models.CharField(max_length=20, choices=PROMPT_LEVEL_CHOICES, default='independent')
+    latency_seconds = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['goal_progress', 'trial_number']
+        unique_together = ['goal_progress', 'trial_number']
+
+    def __str__(self):
+        return f"Trial {self.trial_number} - {'+' if self.is_correct else '-'} ({self.prompt_level})"
+
 class Incident(models.Model):
     """Model for incidents and crisis details"""
     INCIDENT_TYPE_CHOICES = [
@@ -248,3 +304,177 @@ class TimeTracker(models.Model):
         ordering = ['-start_time']
         verbose_name = "Time Tracker Entry"
         verbose_name_plural = "Time Tracker Entries"
+
+
+def private_storage():
+    """Storage outside MEDIA_ROOT for files that must only be served by authenticated views"""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+class PayrollExport(models.Model):
+    """Background payroll/billing CSV export (see session/billing.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payroll_exports')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    period = models.CharField(max_length=10, default='week')
+    rounding = models.CharField(max_length=20, default='cms_8_minute')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', storage=private_storage, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Payroll export {self.start_date} - {self.end_date} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class FinalizeRequest(models.Model):
+    """Outcome of a finalize call, replayed for retries with the same Idempotency-Key (see session/finalize.py)"""
+    key = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='finalize_requests')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='finalize_requests')
+    source = models.CharField(max_length=20)
+    status_code = models.PositiveSmallIntegerField(default=200)
+    response = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+    def __str__(self):
+        return f"{self.source} {self.key} for session {self.session_id}"
+
+
+class SyncOperation(models.Model):
+    """A client-generated capture operation applied by the batch sync endpoint (see session/sync.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_operations')
+    client_id = models.UUIDField()
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='sync_operations')
+    operation_type = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'client_id']
+
+    def __str__(self):
+        return f"{self.operation_type} {self.client_id} -> {self.object_id}"
+
+
+class GoalMastery(models.Model):
+    """Precomputed mastery status of one treatment goal for one client (see session/mastery.py)"""
+    STATUS_CHOICES = [
+        ('no_data', 'No Data'),
+        ('in_progress', 'In Progress'),
+        ('mastered', 'Mastered'),
+        ('needs_review', 'Needs Manual Review'),
+    ]
+
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goal_mastery')
+    goal_id = models.PositiveBigIntegerField()
+    criterion = models.CharField(max_length=250, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='no_data')
+    progress = models.FloatField(default=0)
+    sessions_evaluated = models.PositiveIntegerField(default=0)
+    latest_percentage = models.FloatField(null=True, blank=True)
+    detail = models.JSONField(default=dict, blank=True)
+    mastered_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['client', 'goal_id']
+
+    def __str__(self):
+        return f"Goal {self.goal_id} for {self.client_id}: {self.status}"
+
+# Keep cached BCBA access scopes (session/access.py) in step with assignments and plans
+@receiver(pre_save, sender=User)
+def remember_access_scope_fields(sender, instance, update_fields=None, **kwargs):
+    from .access import IDENTITY_FIELDS
+    tracked = ('assigned_bcba_id',) + IDENTITY_FIELDS
+    # e.g. last_login updates pass update_fields and can't change a scope
+    if not instance.pk or (update_fields is not None and not {'assigned_bcba', *IDENTITY_FIELDS} & set(update_fields)):
+        instance._access_scope_before = None
+        return
+    instance._access_scope_before = sender.objects.filter(pk=instance.pk).values(*tracked).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_access_scope_for_user(sender, instance, created, **kwargs):
+    from .access import IDENTITY_FIELDS, invalidate_bcba_scope, invalidate_all_scopes
+    if created:
+        # A new user may match identifiers on existing plans
+        invalidate_all_scopes()
+        return
+    before = getattr(instance, '_access_scope_before', None)
+    if not before:
+        return
+    if before['assigned_bcba_id'] != instance.assigned_bcba_id:
+        invalidate_bcba_scope(before['assigned_bcba_id'], instance.assigned_bcba_id)
+    if any(before[field] != getattr(instance, field) for field in IDENTITY_FIELDS):
+        invalidate_all_scopes()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_access_scope_for_deleted_user(sender, instance, **kwargs):
+    from .access import invalidate_all_scopes
+    invalidate_all_scopes()
+
+
+@receiver(pre_save, sender='treatment_plan.TreatmentPlan')
+def remember_treatment_plan_bcba(sender, instance, **kwargs):
+    instance._access_scope_bcba_id = (
+        sender.objects.filter(pk=instance.pk).values_list('bcba_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender='treatment_plan.TreatmentPlan')
+@receiver(post_delete, sender='treatment_plan.TreatmentPlan')
+def invalidate_access_scope_for_plan(sender, instance, **kwargs):
+    from .access import invalidate_bcba_scope
+    invalidate_bcba_scope(instance.bcba_id, getattr(instance, '_access_scope_bcba_id', None))
+
+
+# Cached time tracker summaries (session/time_tracking.py) are dropped on any entry change
+@receiver(post_save, sender=TimeTracker)
+@receiver(post_delete, sender=TimeTracker)
+def invalidate_time_tracker_summaries(sender, instance, **kwargs):
+    from .time_tracking import invalidate_summaries
+    invalidate_summaries()
+
+
+# Keep precomputed goal mastery (session/mastery.py) current as goal data is saved
+@receiver(post_save, sender=GoalProgress)
+@receiver(post_delete, sender=GoalProgress)
+def update_goal_mastery(sender, instance, **kwargs):
+    if not instance.goal_id:
+        return
+    from django.db import transaction
+    from .mastery import evaluate_client
+    client_id = Session.objects.filter(id=instance.session_id).values_list('client_id', flat=True).first()
+    if client_id:
+        transaction.on_commit(lambda: evaluate_client(client_id, [instance.goal_id]))
+
+
+@receiver(post_save, sender=GoalTrial)
+@receiver(post_delete, sender=GoalTrial)
+def roll_up_goal_trials(sender, instance, origin=None, **kwargs):
+    # Trials removed by a cascade (GoalProgress or session deleted) have no row left to roll up into
+    if origin is not None:
+        origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+        if origin_model is not GoalTrial:
+            return
+    from .mastery import rollup_trials
+    rollup_trials(instance.goal_progress_id)
+
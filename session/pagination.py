@@ -0,0 +1,148 @@
+"""
+Pagination shared by the session and scheduler list endpoints.
+
+``page_size`` is accepted on every list endpoint but never above
+SESSION_MAX_PAGE_SIZE, so a client can't ask for the whole table in one page.
+
+Passing ``cursor`` (empty for the first page) switches an endpoint to keyset
+pagination on (session_date, start_time, id): each page is a range scan on
+the matching composite index that starts where the previous page ended, so
+page 500 costs the same as page 1 and no COUNT(*) is run. ``count=approx``
+adds the planner's row estimate (PostgreSQL; exact elsewhere) and
+``count=exact`` a real count.
+"""
+import base64
+import json
+from datetime import date, time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+DEFAULT_PAGE_SIZE = 20
+KEYSET_FIELDS = ('session_date', 'start_time', 'id')
+COUNT_MODES = ('approx', 'exact')
+
+
+def get_max_page_size():
+    return int(getattr(settings, 'SESSION_MAX_PAGE_SIZE', 100))
+
+
+def page_params(query_params, default_page_size=DEFAULT_PAGE_SIZE):
+    """(page, page_size) with page_size capped; ValueError on non-positive or non-numeric values"""
+    page = int(query_params.get('page', 1))
+    page_size = int(query_params.get('page_size', default_page_size))
+    if page < 1 or page_size < 1:
+        raise ValueError('page and page_size must be positive integers')
+    return page, min(page_size, get_max_page_size())
+
+
+def wants_cursor(query_params):
+    return 'cursor' in query_params
+
+
+def encode_cursor(session):
+    position = [session.session_date.isoformat(), session.start_time.isoformat(), session.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(session_date, start_time, id) from a cursor; ValueError if it was tampered with"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        session_date, start_time, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(session_date), time.fromisoformat(start_time), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def after_position(queryset, position, descending=True):
+    """Rows strictly after ``position`` in (session_date, start_time, id) order"""
+    session_date, start_time, pk = position
+    op = 'lt' if descending else 'gt'
+    # The plain range on session_date keeps the index scan bounded; the OR picks the exact start point
+    return queryset.filter(**{f'session_date__{op}e': session_date}).filter(
+        Q(**{f'session_date__{op}': session_date})
+        | Q(session_date=session_date, **{f'start_time__{op}': start_time})
+        | Q(session_date=session_date, start_time=start_time, **{f'id__{op}': pk})
+    )
+
+
+def approximate_count(queryset):
+    """Planner row estimate on PostgreSQL (no scan); an exact COUNT on other backends"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), True
+
+
+def keyset_page(queryset, query_params, descending=True, default_page_size=DEFAULT_PAGE_SIZE):
+    """
+    (rows, metadata) for one keyset page of ``queryset``.
+
+    ValueError for a bad cursor, page_size or count mode.
+    """
+    _, page_size = page_params({'page_size': query_params.get('page_size', default_page_size)})
+    count_mode = query_params.get('count')
+    if count_mode and count_mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    ordering = [f'-{field}' if descending else field for field in KEYSET_FIELDS]
+    page = queryset.order_by(*ordering)
+    cursor = query_params.get('cursor')
+    if cursor:
+        page = after_position(page, decode_cursor(cursor), descending)
+
+    rows = list(page[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    metadata = {
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+        'page_size': page_size,
+    }
+    if count_mode == 'exact':
+        metadata['count'], metadata['count_is_estimate'] = queryset.count(), False
+    elif count_mode == 'approx':
+        metadata['count'], metadata['count_is_estimate'] = approximate_count(queryset)
+    return rows, metadata
+
+
+class SessionPagination(PageNumberPagination):
+    """
+    PageNumberPagination with a client-chosen, capped page_size; keyset
+    pagination when ``cursor`` is passed.
+
+    Keyset order follows the view's queryset: descending when it is ordered
+    by -session_date, ascending otherwise.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return get_max_page_size()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not wants_cursor(request.query_params):
+            return super().paginate_queryset(queryset, request, view)
+        descending = bool(queryset.query.order_by) and queryset.query.order_by[0] == '-session_date'
+        try:
+            rows, self.keyset = keyset_page(queryset, request.query_params, descending)
+        except ValueError as e:
+            raise ValidationError({'error': str(e)})
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response(dict(self.keyset, results=data))
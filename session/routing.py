@@ -0,0 +1,6 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/sessions/(?P<session_id>\d+)/timer/$', consumers.SessionTimerConsumer.as_asgi()),
+]
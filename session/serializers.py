@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from .models import (
     Session, SessionTimer, AdditionalTime, PreSessionChecklist,
     Activity, ReinforcementStrategy, ABCEvent, GoalProgress,
-    Incident, SessionNote, TimeTracker
+    Incident, SessionNote, TimeTracker, GoalTrial, GoalMastery
 )
 
 User = get_user_model()
@@ -20,7 +21,8 @@ class SessionTimerSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = SessionTimer
-        fields = ['id', 'start_time', 'end_time', 'is_running', 'total_duration', 'current_duration']
+        fields = ['id', 'start_time', 'end_time', 'is_running', 'total_duration', 'current_duration',
+                  'paused_at', 'segments', 'version']
 
 class AdditionalTimeSerializer(serializers.ModelSerializer):
     """Serializer for AdditionalTime"""
@@ -56,7 +58,34 @@ class GoalProgressSerializer(serializers.ModelSerializer):
     """Serializer for GoalProgress"""
     class Meta:
         model = GoalProgress
-        fields = ['id', 'goal_description', 'is_met', 'implementation_method', 'notes']
+        fields = [
+            'id', 'goal_description', 'is_met', 'implementation_method', 'notes',
+            'goal_id', 'trial_count', 'success_count', 'independent_count', 'occurrence_count',
+            'mean_latency_seconds', 'percentage'
+        ]
+        read_only_fields = ['percentage']
+
+    def validate(self, data):
+        trials = data.get('trial_count')
+        for field in ('success_count', 'independent_count'):
+            if trials is not None and (data.get(field) or 0) > trials:
+                raise serializers.ValidationError({field: f"Cannot exceed trial_count ({trials})"})
+        return data
+
+class GoalTrialSerializer(serializers.ModelSerializer):
+    """Serializer for GoalTrial"""
+    class Meta:
+        model = GoalTrial
+        fields = ['id', 'trial_number', 'is_correct', 'prompt_level', 'latency_seconds', 'recorded_at']
+
+class GoalMasterySerializer(serializers.ModelSerializer):
+    """Serializer for GoalMastery"""
+    class Meta:
+        model = GoalMastery
+        fields = [
+            'goal_id', 'criterion', 'status', 'progress', 'sessions_evaluated',
+            'latest_percentage', 'detail', 'mastered_at', 'updated_at'
+        ]
 
 class IncidentSerializer(serializers.ModelSerializer):
     """Serializer for Incident"""
@@ -95,7 +124,55 @@ class TimeTrackerSerializer(serializers.ModelSerializer):
         
         return data
 
-class SessionListSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    ``fields=`` / ``expand=`` selection for list endpoints.
+
+    ``expandable_fields`` are the nested relations. With neither argument every
+    field is serialized, as before. ``expand`` alone keeps the plain fields and
+    adds only the listed relations; ``fields`` limits the output to exactly
+    those names (relations included).
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        keep = set(fields) if fields is not None else set(self.fields) - set(self.expandable_fields)
+        keep |= set(expand or ())
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, fields=None, expand=None):
+        """Names that will be serialized for this fields/expand combination"""
+        all_fields = list(cls.Meta.fields)
+        if fields is None and expand is None:
+            return all_fields
+        keep = set(fields) if fields is not None else set(all_fields) - set(cls.expandable_fields)
+        keep |= set(expand or ())
+        return [name for name in all_fields if name in keep]
+
+    @classmethod
+    def parse_sparse_params(cls, query_params):
+        """(fields, expand) from comma-separated query params; unknown names are a 400"""
+        parsed = []
+        for param, allowed in (('fields', cls.Meta.fields), ('expand', cls.expandable_fields)):
+            value = query_params.get(param)
+            if value is None:
+                parsed.append(None)
+                continue
+            names = [name.strip() for name in value.split(',') if name.strip()]
+            unknown = sorted(set(names) - set(allowed))
+            if unknown:
+                raise serializers.ValidationError({param: f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}"})
+            parsed.append(names)
+        return tuple(parsed)
+
+
+class SessionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for session lists"""
     client = UserSerializer(read_only=True)
     staff = UserSerializer(read_only=True)
@@ -107,7 +184,7 @@ class SessionListSerializer(serializers.ModelSerializer):
             'status', 'location', 'service_type', 'created_at'
         ]
 
-class SessionDetailSerializer(serializers.ModelSerializer):
+class SessionDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Detailed serializer for session with all related data"""
     client = UserSerializer(read_only=True)
     staff = UserSerializer(read_only=True)
@@ -132,6 +209,28 @@ class SessionDetailSerializer(serializers.ModelSerializer):
             'incidents', 'notes', 'time_trackers'
         ]
 
+    expandable_fields = (
+        'timer', 'additional_times', 'checklist_items', 'activities', 'reinforcement_strategies',
+        'abc_events', 'goal_progress', 'incidents', 'notes', 'time_trackers',
+    )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=None):
+        """select/prefetch only what the requested fields will serialize"""
+        selected = set(cls.selected_fields(fields, expand))
+        related = [name for name in ('client', 'staff') if name in selected]
+        if related:
+            queryset = queryset.select_related(*related, *[f'{name}__role' for name in related])
+        prefetches = []
+        for name in cls.expandable_fields:
+            if name not in selected:
+                continue
+            if name == 'time_trackers':
+                prefetches.append(Prefetch('time_trackers', queryset=TimeTracker.objects.select_related('created_by__role')))
+            else:
+                prefetches.append(name)
+        return queryset.prefetch_related(*prefetches) if prefetches else queryset
+
 class SessionCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating and updating sessions"""
     class Meta:
@@ -152,12 +251,12 @@ class SessionCreateUpdateSerializer(serializers.ModelSerializer):
         return data
 
 class SessionTimerStartStopSerializer(serializers.Serializer):
-    """Serializer for starting/stopping session timer"""
-    action = serializers.ChoiceField(choices=['start', 'stop'])
+    """Serializer for starting/pausing/resuming/stopping session timer"""
+    action = serializers.ChoiceField(choices=['start', 'pause', 'resume', 'stop'])
     
     def validate_action(self, value):
-        if value not in ['start', 'stop']:
-            raise serializers.ValidationError("Action must be 'start' or 'stop'")
+        if value not in ['start', 'pause', 'resume', 'stop']:
+            raise serializers.ValidationError("Action must be 'start', 'pause', 'resume' or 'stop'")
         return value
 
 class SessionSubmitSerializer(serializers.Serializer):
@@ -0,0 +1,24 @@
+"""
+Guard for caches that are invalidated on write.
+
+The BCBA access scope (session/access.py) and time tracker summaries
+(session/time_tracking.py) are dropped by receivers when their data changes.
+With a process-local backend (LocMemCache, the default) that invalidation only
+reaches the worker that handled the write, so other workers would keep
+serving stale - for access scopes, revoked - data until the TTL. Those caches
+are therefore only used when the default cache is shared (Redis, Memcached,
+database), or when CACHE_SINGLE_PROCESS says there is only one worker.
+"""
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_enabled():
+    """True when writes invalidating the default cache are seen by every worker"""
+    if getattr(settings, 'CACHE_SINGLE_PROCESS', False):
+        return True
+    return settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_BACKENDS
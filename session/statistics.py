@@ -0,0 +1,101 @@
+"""
+Dashboard statistics from single conditional aggregates.
+
+``conditional_counts`` turns a set of named filters into one ``aggregate()``
+with ``Count(filter=Q(...))``, replacing a ``.filter(...).count()`` per
+number. Results are cached briefly per role scope (all sessions, one staff
+member's, one client's) because dashboards poll them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+STATS_KEY = 'stats:{name}:{scope}:{params}'
+SESSION_STATUSES = ('completed', 'in_progress', 'scheduled', 'cancelled')
+RECENT_DAYS = 7
+DEFAULT_HISTOGRAM_DAYS = 30
+MAX_HISTOGRAM_DAYS = 366
+
+
+def get_statistics_ttl():
+    return int(getattr(settings, 'STATISTICS_CACHE_TTL_SECONDS', 60))
+
+
+def conditional_counts(queryset, **conditions):
+    """One aggregate: ``total`` plus a count for every named Q"""
+    aggregates = {'total': Count('pk')}
+    aggregates.update({name: Count('pk', filter=condition) for name, condition in conditions.items()})
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def cached(name, scope, params, build):
+    """``build()`` cached for a few seconds under the statistic, role scope and params"""
+    key = STATS_KEY.format(
+        name=name,
+        scope=scope,
+        params=':'.join(f'{field}={params[field]}' for field in sorted(params)),
+    )
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, timeout=get_statistics_ttl())
+    return result
+
+
+def session_status_counts(queryset, today=None):
+    """Total, per-status and last-7-days counts for ``queryset`` in one query"""
+    today = today or timezone.now().date()
+    counts = conditional_counts(
+        queryset,
+        recent=Q(session_date__gte=today - timedelta(days=RECENT_DAYS)),
+        **{status: Q(status=status) for status in SESSION_STATUSES},
+    )
+    total = counts['total']
+    return {
+        'total_sessions': total,
+        'completed_sessions': counts['completed'],
+        'in_progress_sessions': counts['in_progress'],
+        'scheduled_sessions': counts['scheduled'],
+        'cancelled_sessions': counts['cancelled'],
+        'completion_rate': round(counts['completed'] / total * 100, 2) if total > 0 else 0,
+        'recent_sessions_7_days': counts['recent'],
+    }
+
+
+def daily_histogram(queryset, start_date, end_date, date_field='session_date'):
+    """
+    Per-day total and per-status counts from one grouped query; empty days are filled with zeros.
+
+    A DateTimeField ``date_field`` is grouped with TruncDate; a DateField is grouped on as-is.
+    """
+    lookup = date_field
+    day = F(date_field)
+    if queryset.model._meta.get_field(date_field).get_internal_type() == 'DateTimeField':
+        lookup = f'{date_field}__date'
+        day = TruncDate(date_field)
+    rows = (
+        queryset.filter(**{f'{lookup}__gte': start_date, f'{lookup}__lte': end_date})
+        .annotate(day=day)
+        .order_by()
+        .values('day')
+        .annotate(
+            total=Count('pk'),
+            **{status: Count('pk', filter=Q(status=status)) for status in SESSION_STATUSES},
+        )
+    )
+    by_day = {row['day']: row for row in rows}
+
+    histogram = []
+    current = start_date
+    while current <= end_date:
+        row = by_day.get(current, {})
+        entry = {'date': current, 'total': row.get('total', 0)}
+        entry.update({status: row.get(status, 0) for status in SESSION_STATUSES})
+        histogram.append(entry)
+        current += timedelta(days=1)
+    return histogram
@@ -0,0 +1,174 @@
+"""
+Offline batch sync for session data capture.
+
+Mobile clients queue capture operations while offline and upload them in one
+request::
+
+    {"operations": [
+        {"client_id": "<uuid>", "type": "abc_event", "session_id": 12,
+         "data": {"antecedent": "...", "behavior": "...", "consequence": "..."}},
+        ...
+    ]}
+
+Each operation is validated with the same serializer as its single-item
+endpoint. Operations whose client_id this user has already synced (or that
+repeat inside the batch) are reported as duplicates with the original object
+id, so re-sending a queue after a dropped connection is safe. Everything else
+is written with one bulk_create per type plus one for the SyncOperation log,
+in a single transaction.
+
+The response carries a result per operation and ``cursor``, the id of this
+user's latest SyncOperation; ``GET ?since=<cursor>`` lists what was synced
+after it (e.g. from another device).
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .mastery import refresh_after_bulk
+from .models import GoalProgress, Session, SyncOperation
+from .serializers import (
+    AdditionalTimeSerializer, PreSessionChecklistSerializer, ActivitySerializer,
+    ReinforcementStrategySerializer, ABCEventSerializer, GoalProgressSerializer,
+    IncidentSerializer, SessionNoteSerializer,
+)
+
+OPERATION_SERIALIZERS = {
+    'additional_time': AdditionalTimeSerializer,
+    'checklist_item': PreSessionChecklistSerializer,
+    'activity': ActivitySerializer,
+    'reinforcement_strategy': ReinforcementStrategySerializer,
+    'abc_event': ABCEventSerializer,
+    'goal_progress': GoalProgressSerializer,
+    'incident': IncidentSerializer,
+    'note': SessionNoteSerializer,
+}
+
+
+class SyncConflict(Exception):
+    """Another request synced some of the same client ids concurrently; the batch should be retried"""
+
+
+def get_max_operations():
+    return int(getattr(settings, 'SYNC_MAX_OPERATIONS', 500))
+
+
+def can_capture(user, session):
+    """Admins and the session's own staff member"""
+    if hasattr(user, 'role') and user.role:
+        role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+        if role_name in ['Admin', 'Superadmin']:
+            return True
+        return role_name in ['RBT', 'BCBA'] and session.staff_id == user.id
+    return False
+
+
+def _parse(operation):
+    """(client_id, type, session_id, data) or raise ValueError"""
+    if not isinstance(operation, dict):
+        raise ValueError('Operation must be an object')
+    try:
+        client_id = uuid.UUID(str(operation.get('client_id')))
+    except ValueError:
+        raise ValueError('client_id must be a UUID')
+    operation_type = operation.get('type')
+    if operation_type not in OPERATION_SERIALIZERS:
+        raise ValueError(f"type must be one of: {', '.join(OPERATION_SERIALIZERS)}")
+    try:
+        session_id = int(operation.get('session_id'))
+    except (TypeError, ValueError):
+        raise ValueError('session_id must be an integer')
+    data = operation.get('data')
+    if not isinstance(data, dict):
+        raise ValueError('data must be an object')
+    return client_id, operation_type, session_id, data
+
+
+def apply_operations(user, operations):
+    """
+    Validate, deduplicate and apply ``operations``; returns (results, cursor).
+
+    Results are in request order: status is created, duplicate or error.
+    """
+    results = [None] * len(operations)
+    parsed = {}
+    for index, operation in enumerate(operations):
+        try:
+            parsed[index] = _parse(operation)
+        except ValueError as e:
+            client_id = operation.get('client_id') if isinstance(operation, dict) else None
+            results[index] = {'client_id': client_id, 'status': 'error', 'errors': {'operation': [str(e)]}}
+
+    client_ids = [client_id for client_id, _, _, _ in parsed.values()]
+    synced = dict(
+        SyncOperation.objects.filter(user=user, client_id__in=client_ids).values_list('client_id', 'object_id')
+    )
+    sessions = Session.objects.in_bulk({session_id for _, _, session_id, _ in parsed.values()})
+
+    pending = defaultdict(list)  # type -> [(index, client_id, session, validated_data)]
+    seen = set()
+    for index, (client_id, operation_type, session_id, data) in parsed.items():
+        result = {'client_id': str(client_id), 'type': operation_type}
+        if client_id in synced:
+            results[index] = dict(result, status='duplicate', id=synced[client_id])
+            continue
+        if client_id in seen:
+            results[index] = dict(result, status='duplicate', id=None)
+            continue
+        seen.add(client_id)
+        session = sessions.get(session_id)
+        if session is None or not can_capture(user, session):
+            results[index] = dict(result, status='error', errors={'session_id': ['Session not found or not yours']})
+            continue
+        serializer = OPERATION_SERIALIZERS[operation_type](data=data)
+        if not serializer.is_valid():
+            results[index] = dict(result, status='error', errors=serializer.errors)
+            continue
+        pending[operation_type].append((index, client_id, session, serializer.validated_data))
+
+    try:
+        with transaction.atomic():
+            log = []
+            goal_rows = []
+            for operation_type, items in pending.items():
+                model = OPERATION_SERIALIZERS[operation_type].Meta.model
+                objects = [model(session=session, **validated) for _, _, session, validated in items]
+                if model is GoalProgress:
+                    for obj in objects:
+                        obj.compute_percentage()
+                    goal_rows = objects
+                if connection.features.can_return_rows_from_bulk_insert:
+                    model.objects.bulk_create(objects)
+                else:
+                    # No primary keys back from a bulk insert on this backend
+                    for obj in objects:
+                        obj.save()
+                for (index, client_id, session, _), obj in zip(items, objects):
+                    log.append(SyncOperation(user=user, client_id=client_id, session=session,
+                                             operation_type=operation_type, object_id=obj.pk))
+                    results[index] = {'client_id': str(client_id), 'type': operation_type, 'status': 'created', 'id': obj.pk}
+            SyncOperation.objects.bulk_create(log)
+            if goal_rows:
+                # bulk_create skips the post_save receiver that keeps GoalMastery current
+                transaction.on_commit(lambda: refresh_after_bulk(goal_rows))
+    except IntegrityError:
+        raise SyncConflict()
+
+    cursor = SyncOperation.objects.filter(user=user).order_by('-id').values_list('id', flat=True).first()
+    # Duplicates inside the batch point at the object created for their first occurrence
+    created = {result['client_id']: result['id'] for result in results if result and result['status'] == 'created'}
+    for result in results:
+        if result and result['status'] == 'duplicate' and result['id'] is None:
+            result['id'] = created.get(result['client_id'])
+    return results, cursor
+
+
+def operations_since(user, since, limit):
+    """(operations after cursor ``since``, new cursor) for ``user``"""
+    rows = list(
+        SyncOperation.objects.filter(user=user, id__gt=since).order_by('id')
+        .values('id', 'client_id', 'operation_type', 'session_id', 'object_id', 'created_at')[:limit]
+    )
+    return rows, rows[-1]['id'] if rows else since
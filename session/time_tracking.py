@@ -0,0 +1,122 @@
+"""
+Time tracker totals computed in SQL.
+
+Durations are summed as ``end_time - start_time`` in the database and grouped
+by time type (and optionally by day, week or staff member), so a summary costs
+one query however many entries it covers. Summaries are cached per user and
+filter set; any TimeTracker write bumps a generation (see session.models) so
+cached summaries never outlive the data. Caching is skipped when that bump
+would not reach other workers (session/shared_cache.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+
+from .models import TimeTracker
+from .shared_cache import shared_cache_enabled
+
+SUMMARY_KEY = 'time_tracker_summary:{generation}:{user_id}:{params}'
+GENERATION_KEY = 'time_tracker_summary:generation'
+
+GROUPINGS = {
+    'day': ('period', lambda: TruncDate('start_time')),
+    'week': ('period', lambda: TruncWeek('start_time', output_field=DateField())),
+    'staff': ('staff_id', lambda: F('created_by_id')),
+}
+
+TYPE_LABELS = dict(TimeTracker.TIME_TYPE_CHOICES)
+
+
+def get_summary_ttl():
+    return int(getattr(settings, 'TIME_TRACKER_SUMMARY_TTL_SECONDS', 300))
+
+
+def duration_expression():
+    return ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+
+
+def _minutes(value):
+    return value.total_seconds() / 60 if value else 0
+
+
+def _totals(minutes, entries):
+    return {
+        'total_entries': entries,
+        'total_duration_minutes': minutes,
+        'total_duration_hours': round(minutes / 60, 2),
+        'total_duration_display': f"{int(minutes // 60):02d}:{int(minutes % 60):02d}",
+    }
+
+
+def summarize(queryset, group_by=None):
+    """
+    Totals per time type, plus per-group totals when ``group_by`` is day/week/staff.
+
+    One grouped query: rows come back as (group, time_type, count, duration).
+    """
+    group_field = None
+    rows = queryset.order_by()
+    if group_by:
+        group_field, expression = GROUPINGS[group_by]
+        rows = rows.annotate(**{group_field: expression()})
+    values = ['time_type'] + ([group_field] if group_field else [])
+    rows = rows.values(*values).annotate(entries=Count('id'), duration=Sum(duration_expression()))
+
+    time_type_summary = {}
+    groups = {}
+    for row in rows:
+        minutes = _minutes(row['duration'])
+        summary = time_type_summary.setdefault(row['time_type'], {
+            'count': 0,
+            'total_duration': 0,
+            'display_name': TYPE_LABELS.get(row['time_type'], row['time_type']),
+        })
+        summary['count'] += row['entries']
+        summary['total_duration'] += minutes
+
+        if group_field:
+            group = groups.setdefault(row[group_field], {group_field: row[group_field], 'minutes': 0, 'entries': 0, 'time_type_summary': {}})
+            group['minutes'] += minutes
+            group['entries'] += row['entries']
+            group['time_type_summary'][row['time_type']] = {'count': row['entries'], 'total_duration': minutes}
+
+    total_minutes = sum(summary['total_duration'] for summary in time_type_summary.values())
+    total_entries = sum(summary['count'] for summary in time_type_summary.values())
+    result = _totals(total_minutes, total_entries)
+    result['time_type_summary'] = time_type_summary
+
+    if group_field:
+        result['group_by'] = group_by
+        result['groups'] = []
+        for key in sorted(groups, key=lambda value: (value is None, value)):
+            group = groups.pop(key)
+            entry = {group_field: group[group_field]}
+            entry.update(_totals(group['minutes'], group['entries']))
+            entry['time_type_summary'] = group['time_type_summary']
+            result['groups'].append(entry)
+    return result
+
+
+def cached_summary(user_id, params, build):
+    """``build()`` cached under the user and the normalized filter params"""
+    if not shared_cache_enabled():
+        return build()
+    generation = cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+    key = SUMMARY_KEY.format(
+        generation=generation,
+        user_id=user_id,
+        params=':'.join(f'{name}={params[name]}' for name in sorted(params)),
+    )
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, timeout=get_summary_ttl())
+    return result
+
+
+def invalidate_summaries():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
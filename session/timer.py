@@ -0,0 +1,138 @@
+"""
+Session timer state machine.
+
+The timer is a sequence of running segments. ``start``/``resume`` open one at
+``start_time``; ``pause``/``stop`` close it, add its length to
+``total_duration`` and append it to ``segments`` as a compact
+``[start epoch seconds, length seconds]`` pair. While running, elapsed time
+is ``total_duration + (now - start_time)``, which clients compute locally.
+
+Every transition bumps ``version`` and, once the transaction commits, pushes
+the new state to the ``session_timer_<id>`` channel group (see
+session.consumers), so clients subscribe once instead of polling. The
+request that changes the timer and the socket that watches it are usually on
+different workers, so this needs a shared channel layer (Redis); with
+InMemoryChannelLayer pushes only reach sockets on the same process and
+``session.W001`` (session/checks.py) warns at startup.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SessionTimer
+
+ACTIONS = ('start', 'pause', 'resume', 'stop')
+GROUP_NAME = 'session_timer_{session_id}'
+
+
+def group_name(session_id):
+    return GROUP_NAME.format(session_id=session_id)
+
+
+def can_manage(user, session):
+    """Admins, the session's staff member and its client"""
+    if hasattr(user, 'role') and user.role:
+        role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+        # Admin and Superadmin can access all sessions
+        if role_name in ['Admin', 'Superadmin']:
+            return True
+        return (role_name in ['RBT', 'BCBA'] and session.staff_id == user.id) or \
+               (role_name == 'Clients/Parent' and session.client_id == user.id)
+    return False
+
+
+def timer_state(timer, session_id=None):
+    """JSON-safe timer state; ``timer`` may be None for a session whose timer never started"""
+    if timer is None:
+        return {
+            'session_id': session_id, 'state': 'idle', 'version': 0, 'is_running': False,
+            'start_time': None, 'end_time': None, 'paused_at': None,
+            'total_seconds': 0, 'segments': [],
+        }
+    if timer.is_running:
+        state = 'running'
+    elif timer.paused_at:
+        state = 'paused'
+    elif timer.end_time:
+        state = 'stopped'
+    else:
+        state = 'idle'
+    return {
+        'session_id': timer.session_id,
+        'state': state,
+        'version': timer.version,
+        'is_running': timer.is_running,
+        'start_time': timer.start_time.isoformat() if timer.start_time else None,
+        'end_time': timer.end_time.isoformat() if timer.end_time else None,
+        'paused_at': timer.paused_at.isoformat() if timer.paused_at else None,
+        'total_seconds': int(timer.total_duration.total_seconds()),
+        'segments': timer.segments,
+    }
+
+
+def _close_segment(timer, now):
+    elapsed = now - timer.start_time
+    timer.total_duration += elapsed
+    timer.segments = timer.segments + [[int(timer.start_time.timestamp()), int(elapsed.total_seconds())]]
+
+
+def apply_action(session, action, now=None):
+    """
+    Apply ``action`` to ``session``'s timer under a row lock.
+
+    Returns (timer, changed); timer is None if it was never started. Repeating
+    the current state (start while running, pause while paused, ...) changes
+    nothing and publishes nothing. ``stop`` also marks the session completed
+    and ``start`` marks it in progress.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of: {', '.join(ACTIONS)}")
+    now = now or timezone.now()
+    with transaction.atomic():
+        if action == 'start':
+            SessionTimer.objects.get_or_create(session=session)
+        timer = SessionTimer.objects.select_for_update().filter(session=session).first()
+        if timer is None:
+            return None, False
+        session_status = None
+
+        if action in ('start', 'resume') and not timer.is_running:
+            if action == 'resume' and not timer.paused_at:
+                return timer, False
+            timer.start_time = now
+            timer.is_running = True
+            timer.paused_at = None
+            if action == 'start':
+                timer.end_time = None
+                session_status = 'in_progress'
+        elif action == 'pause' and timer.is_running:
+            _close_segment(timer, now)
+            timer.is_running = False
+            timer.paused_at = now
+        elif action == 'stop' and (timer.is_running or timer.paused_at):
+            if timer.is_running:
+                _close_segment(timer, now)
+            timer.is_running = False
+            timer.paused_at = None
+            timer.end_time = now
+            session_status = 'completed'
+        else:
+            return timer, False
+
+        timer.version += 1
+        timer.save()
+        if session_status and session.status != session_status:
+            session.status = session_status
+            session.save(update_fields=['status', 'updated_at'])
+        state = timer_state(timer)
+        transaction.on_commit(lambda: publish(session.id, state))
+    return timer, True
+
+
+def publish(session_id, state):
+    """Push ``state`` to everyone subscribed to the session's timer"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(group_name(session_id), {'type': 'timer_state', 'state': state})
@@ -13,6 +13,8 @@ urlpatterns = [
     path('sessions/<int:pk>/', views.SessionDetailView.as_view(), name='session-detail'),
     path('sessions/start-from-schedule/', views.start_session_from_schedule, name='start-from-schedule'),
     path('upcoming-sessions/', views.upcoming_sessions, name='upcoming-sessions'),
+    path('calendar/', views.calendar_sessions, name='calendar-sessions'),
+    path('calendar/staff/<int:staff_id>.ics', views.staff_calendar_ics, name='staff-calendar-ics'),
     path('completed-sessions/', views.completed_sessions, name='completed-sessions'),
     path('all-sessions-details/', views.all_sessions_with_details, name='all-sessions-details'),
     path('sessions/<int:session_id>/details/', views.get_session_details, name='session-details'),
@@ -23,6 +25,8 @@ urlpatterns = [
     path('treatment-plan/<int:client_id>/session-data/', views.get_treatment_plan_for_session, name='treatment-plan-session-data'),
     path('sessions/<int:session_id>/treatment-plan-data/', views.get_session_treatment_plan_data, name='session-treatment-plan-data'),
     path('clients/<int:client_id>/treatment-plan-details/', views.get_client_treatment_plan_details, name='client-treatment-plan-details'),
+    path('clients/<int:client_id>/goal-mastery/', views.client_goal_mastery, name='client-goal-mastery'),
+    path('clients/<int:client_id>/behavior-analytics/', views.client_behavior_analytics, name='client-behavior-analytics'),
     
     # Session timer endpoints
     path('sessions/<int:session_id>/timer/', views.SessionTimerView.as_view(), name='session-timer'),
@@ -34,11 +38,13 @@ urlpatterns = [
     path('sessions/<int:session_id>/reinforcement-strategies/', views.ReinforcementStrategyView.as_view(), name='reinforcement-strategies'),
     path('sessions/<int:session_id>/abc-events/', views.ABCEventView.as_view(), name='abc-events'),
     path('sessions/<int:session_id>/goal-progress/', views.GoalProgressView.as_view(), name='goal-progress'),
+    path('goal-progress/<int:goal_progress_id>/trials/', views.GoalTrialView.as_view(), name='goal-trials'),
     path('sessions/<int:session_id>/incidents/', views.IncidentView.as_view(), name='incidents'),
     path('sessions/<int:session_id>/notes/', views.SessionNoteView.as_view(), name='session-notes'),
     
     # Session actions
     path('sessions/submit/', views.submit_session, name='submit-session'),
+    path('sessions/sync/', views.sync_session_data, name='sync-session-data'),
     path('sessions/preview/', views.preview_session, name='preview-session'),
     path('sessions/<int:session_id>/save-and-generate-notes/', views.save_session_data_and_generate_notes, name='save-and-generate-notes'),
     path('sessions/<int:session_id>/generate-notes/', views.generate_ai_session_notes, name='generate-ai-notes'),
@@ -56,6 +62,11 @@ urlpatterns = [
     path('time-trackers/<int:pk>/', views.TimeTrackerDetailView.as_view(), name='time-tracker-detail'),
     path('time-trackers/summary/', views.time_tracker_summary, name='time-tracker-summary'),
 
+    # Payroll / billing exports
+    path('billing/exports/', views.payroll_exports, name='payroll-exports'),
+    path('billing/exports/<int:export_id>/', views.payroll_export_detail, name='payroll-export-detail'),
+    path('billing/exports/<int:export_id>/download/', views.payroll_export_download, name='payroll-export-download'),
+
     # AI suggestion question endpoint (automatically gets treatment_plan_id from session)
     path('sessions/<int:session_id>/ai-suggestions/', views.AISuggestionView.as_view(), name='ai-suggestions'),
     path('bcba-client-sessions/', views.bcba_client_sessions, name='bcba-client-sessions'),
@@ -0,0 +1,207 @@
+"""
+Staff utilization and capacity planning.
+
+For every staff member and ISO week (Monday start):
+
+- booked hours: length of the therapy sessions on their calendar (not cancelled)
+- delivered hours: SessionTimer time on those sessions plus their manual
+  TimeTracker entries. The timer is the record of a session's direct time, so
+  'direct' tracker entries only count for sessions without timer time;
+  other tracker types (indirect, supervision, ...) always count
+- gap to the weekly target, and an over/under-utilization flag on booked hours
+
+Each source is one grouped aggregate (staff, week) over the requested range.
+Raw per-week totals are cached independently of the target, so changing the
+target or widening the range only computes the weeks not already cached.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateField, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Session, SessionTimer, TimeTracker
+
+WEEK_KEY = 'utilization:v2:week:{week}'
+CURRENT_WEEK_TTL = 300
+MAX_WEEKS = 53
+STAFF_ROLES = ['RBT', 'BCBA']
+
+
+def get_thresholds():
+    return {
+        'target_hours': float(getattr(settings, 'UTILIZATION_TARGET_HOURS', 30)),
+        'over_ratio': float(getattr(settings, 'UTILIZATION_OVER_RATIO', 1.1)),
+        'under_ratio': float(getattr(settings, 'UTILIZATION_UNDER_RATIO', 0.8)),
+    }
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def weeks_between(start_date, end_date):
+    weeks = []
+    week = week_start(start_date)
+    while week <= end_date:
+        weeks.append(week)
+        week += timedelta(weeks=1)
+    return weeks
+
+
+def _duration(start, end):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def _seconds(value):
+    return value.total_seconds() if value else 0
+
+
+def _aggregate_weeks(first_week, last_week):
+    """{week: {staff_id: [booked, timer, tracked] seconds}} from three grouped queries"""
+    range_end = last_week + timedelta(days=6)
+    totals = {}
+
+    def add(week, staff_id, slot, value):
+        if staff_id is None:
+            return
+        totals.setdefault(week, {}).setdefault(staff_id, [0, 0, 0])[slot] += _seconds(value)
+
+    booked = (
+        Session.objects.filter(session_date__gte=first_week, session_date__lte=range_end)
+        .exclude(status='cancelled')
+        .annotate(week=TruncWeek('session_date'))
+        .values('staff_id', 'week')
+        .annotate(total=Sum(_duration('start_time', 'end_time')))
+        .order_by()
+    )
+    for row in booked:
+        add(row['week'], row['staff_id'], 0, row['total'])
+
+    timed = (
+        SessionTimer.objects.filter(session__session_date__gte=first_week, session__session_date__lte=range_end)
+        .annotate(week=TruncWeek('session__session_date'))
+        .values('session__staff_id', 'week')
+        .annotate(total=Sum('total_duration'))
+        .order_by()
+    )
+    for row in timed:
+        add(row['week'], row['session__staff_id'], 1, row['total'])
+
+    tracked = (
+        TimeTracker.objects.filter(start_time__date__gte=first_week, start_time__date__lte=range_end)
+        # Direct time on a timed session is already in the timer total
+        .exclude(time_type='direct', session__timer__total_duration__gt=timedelta(0))
+        .annotate(week=TruncWeek('start_time', output_field=DateField()))
+        .values('created_by_id', 'week')
+        .annotate(total=Sum(_duration('start_time', 'end_time')))
+        .order_by()
+    )
+    for row in tracked:
+        add(row['week'], row['created_by_id'], 2, row['total'])
+
+    return totals
+
+
+def weekly_totals(weeks):
+    """Raw totals per week, from cache where possible; missing weeks are computed in one pass"""
+    keys = {week: WEEK_KEY.format(week=week.isoformat()) for week in weeks}
+    cached = cache.get_many(keys.values())
+    result = {week: cached[key] for week, key in keys.items() if key in cached}
+
+    missing = [week for week in weeks if week not in result]
+    if missing:
+        computed = _aggregate_weeks(missing[0], missing[-1])
+        current_week = week_start(timezone.now().date())
+        closed, open_weeks = {}, {}
+        for week in missing:
+            result[week] = computed.get(week, {})
+            # Weeks still in progress (or ahead) change quickly; closed weeks barely move
+            (open_weeks if week >= current_week else closed)[keys[week]] = result[week]
+        if closed:
+            cache.set_many(closed, timeout=int(getattr(settings, 'UTILIZATION_CACHE_TTL_SECONDS', 86400)))
+        if open_weeks:
+            cache.set_many(open_weeks, timeout=CURRENT_WEEK_TTL)
+    return result
+
+
+def _flag(booked_hours, thresholds):
+    target = thresholds['target_hours']
+    if target <= 0:
+        return None
+    if booked_hours > target * thresholds['over_ratio']:
+        return 'over'
+    if booked_hours < target * thresholds['under_ratio']:
+        return 'under'
+    return 'ok'
+
+
+def staff_utilization(start_date, end_date, staff=None, thresholds=None):
+    """
+    Utilization rows for ``staff`` (a CustomUser queryset, default all RBT/BCBA)
+    over the weeks touching [start_date, end_date].
+    """
+    from api.models import CustomUser
+
+    thresholds = thresholds or get_thresholds()
+    target = thresholds['target_hours']
+    weeks = weeks_between(start_date, end_date)
+    totals = weekly_totals(weeks)
+
+    if staff is None:
+        staff = CustomUser.objects.filter(role__name__in=STAFF_ROLES)
+    staff = staff.select_related('role').order_by('name', 'username')
+
+    rows = []
+    flagged = {'over': 0, 'under': 0}
+    for member in staff:
+        weekly = []
+        sums = [0, 0, 0]
+        for week in weeks:
+            booked, timer, tracked = totals[week].get(member.id, (0, 0, 0))
+            sums = [sums[0] + booked, sums[1] + timer, sums[2] + tracked]
+            booked_hours = round(booked / 3600, 2)
+            delivered_hours = round((timer + tracked) / 3600, 2)
+            weekly.append({
+                'week_start': week,
+                'booked_hours': booked_hours,
+                'delivered_hours': delivered_hours,
+                'session_timer_hours': round(timer / 3600, 2),
+                'tracked_hours': round(tracked / 3600, 2),
+                'gap_to_target_hours': round(target - booked_hours, 2),
+                'utilization': round(booked_hours / target * 100, 1) if target > 0 else None,
+                'flag': _flag(booked_hours, thresholds),
+            })
+
+        average_booked = sums[0] / 3600 / len(weeks)
+        flag = _flag(average_booked, thresholds)
+        if flag in flagged:
+            flagged[flag] += 1
+        rows.append({
+            'staff_id': member.id,
+            'staff_name': member.name or member.username,
+            'role': member.role.name if member.role else None,
+            'booked_hours': round(sums[0] / 3600, 2),
+            'delivered_hours': round((sums[1] + sums[2]) / 3600, 2),
+            'average_weekly_booked_hours': round(average_booked, 2),
+            'delivery_rate': round((sums[1] + sums[2]) / sums[0] * 100, 1) if sums[0] else None,
+            'utilization': round(average_booked / target * 100, 1) if target > 0 else None,
+            'flag': flag,
+            'weeks': weekly,
+        })
+
+    return {
+        'weeks': weeks,
+        'thresholds': thresholds,
+        'staff': rows,
+        'summary': {
+            'staff_count': len(rows),
+            'over_utilized': flagged['over'],
+            'under_utilized': flagged['under'],
+            'total_booked_hours': round(sum(row['booked_hours'] for row in rows), 2),
+            'total_delivered_hours': round(sum(row['delivered_hours'] for row in rows), 2),
+            'capacity_hours': round(target * len(weeks) * len(rows), 2),
+        },
+    }
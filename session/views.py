@@ -1,34 +1,56 @@
 from rest_framework import generics, status, permissions
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.db import transaction, models
-from datetime import timedelta
-from treatment_plan.models import TreatmentPlan
+from django.db import IntegrityError, transaction, models
+from datetime import date, timedelta
+from treatment_plan.models import TreatmentPlan, TreatmentGoal
 import json
 
 from .models import (
     Session, SessionTimer, AdditionalTime, PreSessionChecklist,
     Activity, ReinforcementStrategy, ABCEvent, GoalProgress,
-    Incident, SessionNote, TimeTracker
+    Incident, SessionNote, TimeTracker, PayrollExport, GoalTrial, GoalMastery
 )
 from .serializers import (
     SessionListSerializer, SessionDetailSerializer, SessionCreateUpdateSerializer,
     SessionTimerSerializer, SessionTimerStartStopSerializer,
     AdditionalTimeSerializer, PreSessionChecklistSerializer,
     ActivitySerializer, ReinforcementStrategySerializer,
-    ABCEventSerializer, GoalProgressSerializer,
+    ABCEventSerializer, GoalProgressSerializer, GoalTrialSerializer, GoalMasterySerializer,
     IncidentSerializer, SessionNoteSerializer,
     SessionSubmitSerializer, SessionPreviewSerializer,
     TimeTrackerSerializer, TimeTrackerCreateSerializer, TimeTrackerUpdateSerializer
 )
+from .caseload import caseload_statistics, empty_statistics, user_session_statistics
+from .access import bcba_client_ids, bcba_can_access_session, bcba_session_filter
+from .calendar import MAX_CALENDAR_DAYS, calendar_etag, calendar_rows, etag_matches, render_ical
+from .time_tracking import GROUPINGS as TIME_TRACKER_GROUPINGS, cached_summary, summarize
+from .behavior_analytics import BINS as BEHAVIOR_BINS, DEFAULT_RANGE_DAYS as BEHAVIOR_DEFAULT_RANGE_DAYS, MAX_RANGE_DAYS as BEHAVIOR_MAX_RANGE_DAYS, client_behavior_analytics as behavior_analytics
+from .billing import PERIODS as PAYROLL_PERIODS, ROUNDING_RULES, get_default_rounding, start_export
+from .mastery import evaluate_client as evaluate_goal_mastery, rollup_trials, session_threshold
+from .sync import SyncConflict, can_capture, apply_operations as apply_sync_operations, get_max_operations as get_max_sync_operations, operations_since
+from .finalize import FinalizeBlocked, finalize as finalize_session, idempotency_key
+from .timer import apply_action as apply_timer_action, can_manage as can_manage_timer, timer_state
+from .pagination import SessionPagination, keyset_page, page_params, wants_cursor
+from .statistics import DEFAULT_HISTOGRAM_DAYS, MAX_HISTOGRAM_DAYS, cached as cached_statistics, daily_histogram, session_status_counts
 
 class SessionListView(generics.ListCreateAPIView):
     """API view for listing and creating sessions"""
     serializer_class = SessionListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SessionPagination
+    
+    def get_serializer(self, *args, **kwargs):
+        # ?fields= only narrows list output; writes always use the full serializer
+        if self.request.method == 'GET':
+            kwargs['fields'], _ = SessionListSerializer.parse_sparse_params(self.request.query_params)
+        return super().get_serializer(*args, **kwargs)
     
     def get_queryset(self):
         user = self.request.user
@@ -107,87 +129,40 @@ class SessionDetailView(generics.RetrieveUpdateDestroyAPIView):
                 # BCBA can see sessions where:
                 # 1. They are the staff
                 # 2. Client is assigned to them (assigned_bcba)
-                # 3. They have treatment plans for the client (using client_id matching)
-                from django.db.models import Q
-                from treatment_plan.models import TreatmentPlan
-                
-                # Get treatment plans for this BCBA
-                treatment_plans = TreatmentPlan.objects.filter(bcba=user)
-                
-                # Build Q objects for matching
-                q_objects = Q(staff=user) | Q(client__assigned_bcba=user)
-                
-                # Add treatment plan matching by client_id, username, or name
-                if treatment_plans.exists():
-                    q_treatment_plan = Q()
-                    for tp in treatment_plans:
-                        client_id_str = str(tp.client_id)
-                        # Match by numeric ID if possible
-                        if client_id_str.isdigit():
-                            try:
-                                q_treatment_plan |= Q(client__id=int(client_id_str))
-                            except (ValueError, TypeError):
-                                pass
-                        # Match by username
-                        q_treatment_plan |= Q(client__username=client_id_str)
-                        # Match by staff_id if exists on client model
-                        try:
-                            q_treatment_plan |= Q(client__staff_id=client_id_str)
-                        except Exception:
-                            pass
-                        # Match by name if exists
-                        if tp.client_name:
-                            try:
-                                from django.db.models import CharField
-                                # Try to match by name field
-                                q_treatment_plan |= Q(client__name__icontains=tp.client_name)
-                            except Exception:
-                                pass
-                    q_objects |= q_treatment_plan
-                
-                queryset = queryset.filter(q_objects).distinct()
+                # 3. They have treatment plans for the client
+                queryset = queryset.filter(bcba_session_filter(user))
             elif role_name == 'Clients/Parent':
                 queryset = queryset.filter(client=user)
                 
         return queryset
 
 class SessionTimerView(APIView):
-    """API view for managing session timer"""
+    """
+    API view for managing session timer
+    
+    GET returns the current state without creating anything; POST with action
+    start/pause/resume/stop applies a transition (session/timer.py). Clients
+    should subscribe to ws/sessions/<session_id>/timer/ for changes and compute
+    elapsed time locally instead of polling GET.
+    """
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, session_id):
-        session = get_object_or_404(Session, id=session_id)
+        session = get_object_or_404(Session.objects.select_related('staff', 'client'), id=session_id)
         
         # Check permissions
         if not self._has_permission(request.user, session):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        timer, created = SessionTimer.objects.get_or_create(session=session)
-        serializer = SessionTimerSerializer(timer)
-        response_data = serializer.data
-        
-        # Add treatment_plan_id from related scheduler session if exists
-        try:
-            from scheduler.models import Session as SchedulerSession
-            scheduler_session = SchedulerSession.objects.filter(
-                client=session.client,
-                staff=session.staff,
-                session_date=session.session_date,
-                start_time=session.start_time,
-                end_time=session.end_time
-            ).first()
-            
-            if scheduler_session and scheduler_session.treatment_plan:
-                response_data['treatment_plan_id'] = scheduler_session.treatment_plan.id
-            else:
-                response_data['treatment_plan_id'] = None
-        except Exception:
-            response_data['treatment_plan_id'] = None
-        
+        timer = SessionTimer.objects.filter(session=session).first()
+        # An unsaved timer renders the idle state without writing a row
+        response_data = SessionTimerSerializer(timer or SessionTimer(session=session)).data
+        response_data['state'] = timer_state(timer, session.id)
+        response_data['treatment_plan_id'] = self._treatment_plan_id(session)
         return Response(response_data)
     
     def post(self, request, session_id):
-        session = get_object_or_404(Session, id=session_id)
+        session = get_object_or_404(Session.objects.select_related('staff', 'client'), id=session_id)
         
         # Check permissions
         if not self._has_permission(request.user, session):
@@ -195,78 +170,60 @@ class SessionTimerView(APIView):
         
         serializer = SessionTimerStartStopSerializer(data=request.data)
         if serializer.is_valid():
-            timer, created = SessionTimer.objects.get_or_create(session=session)
             action = serializer.validated_data['action']
             ai_suggestion = None
-            
-            if action == 'start':
-                if not timer.is_running:
-                    timer.start_time = timezone.now()
-                    timer.is_running = True
-                    session.status = 'in_progress'
-                    session.save()
-                    # Optional: trigger AI suggestion when an RBT starts the session
+            if action == 'stop':
+                # Stopping a live timer finishes the session, so it goes through the finalize pipeline
+                timer, changed = SessionTimer.objects.filter(session=session).first(), False
+                if timer and (timer.is_running or timer.paused_at):
                     try:
-                        treatment_plan_id = request.data.get('treatment_plan_id')
-                        if treatment_plan_id:
-                            from session.utils import generate_ai_suggestion
-                            suggestion = generate_ai_suggestion(int(treatment_plan_id))
-                            SessionNote.objects.create(
-                                session=session,
-                                note_content=suggestion,
-                                note_type='ai_suggestion'
-                            )
-                            ai_suggestion = suggestion
-                    except Exception:
-                        # Swallow exceptions to avoid blocking timer start
-                        return Response({'error': 'Failed to generate AI suggestion'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            elif action == 'stop':
-                if timer.is_running:
-                    timer.end_time = timezone.now()
-                    timer.is_running = False
-                    if timer.start_time:
-                        elapsed = timer.end_time - timer.start_time
-                        timer.total_duration += elapsed
-                    session.status = 'completed'
-                    session.save()
-            
-            timer.save()
-            data = SessionTimerSerializer(timer).data
+                        finalize_session(session.id, request.user, 'timer_stop', idempotency_key(request))
+                    except FinalizeBlocked as e:
+                        return Response(e.payload, status=e.status_code)
+                    timer.refresh_from_db()
+            else:
+                timer, changed = apply_timer_action(session, action)
             
-            # Add treatment_plan_id from related scheduler session if exists
-            try:
-                from scheduler.models import Session as SchedulerSession
-                scheduler_session = SchedulerSession.objects.filter(
-                    client=session.client,
-                    staff=session.staff,
-                    session_date=session.session_date,
-                    start_time=session.start_time,
-                    end_time=session.end_time
-                ).first()
-                
-                if scheduler_session and scheduler_session.treatment_plan:
-                    data['treatment_plan_id'] = scheduler_session.treatment_plan.id
-                else:
-                    data['treatment_plan_id'] = None
-            except Exception:
-                data['treatment_plan_id'] = None
+            if action == 'start' and changed:
+                # Optional: trigger AI suggestion when an RBT starts the session
+                try:
+                    treatment_plan_id = request.data.get('treatment_plan_id')
+                    if treatment_plan_id:
+                        from session.utils import generate_ai_suggestion
+                        suggestion = generate_ai_suggestion(int(treatment_plan_id))
+                        SessionNote.objects.create(
+                            session=session,
+                            note_content=suggestion,
+                            note_type='ai_suggestion'
+                        )
+                        ai_suggestion = suggestion
+                except Exception:
+                    # Swallow exceptions to avoid blocking timer start
+                    return Response({'error': 'Failed to generate AI suggestion'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
+            data = SessionTimerSerializer(timer or SessionTimer(session=session)).data
+            data['state'] = timer_state(timer, session.id)
+            data['treatment_plan_id'] = self._treatment_plan_id(session)
             if ai_suggestion is not None:
                 data['ai_suggestion'] = ai_suggestion
             return Response(data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def _treatment_plan_id(self, session):
+        """treatment_plan_id from the matching scheduler session, if any"""
+        from scheduler.models import Session as SchedulerSession
+        return SchedulerSession.objects.filter(
+            client_id=session.client_id,
+            staff_id=session.staff_id,
+            session_date=session.session_date,
+            start_time=session.start_time,
+            end_time=session.end_time
+        ).values_list('treatment_plan_id', flat=True).first()
+    
     def _has_permission(self, user, session):
         """Check if user has permission to manage this session"""
-        if hasattr(user, 'role') and user.role:
-            role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
-            # Admin and Superadmin can access all sessions
-            if role_name in ['Admin', 'Superadmin']:
-                return True
-            return (role_name in ['RBT', 'BCBA'] and session.staff == user) or \
-                   (role_name == 'Clients/Parent' and session.client == user)
-        return False
+        return can_manage_timer(user, session)
 
 class AdditionalTimeView(generics.ListCreateAPIView):
     """API view for managing additional time entries"""
@@ -352,6 +309,58 @@ class GoalProgressView(generics.ListCreateAPIView):
         session = get_object_or_404(Session, id=session_id)
         serializer.save(session=session)
 
+class GoalTrialView(generics.ListCreateAPIView):
+    """
+    API view for the individual trials of a goal progress entry
+    
+    POST accepts one trial or a list; a list is inserted in one query and the
+    goal progress counts are rolled up once.
+    """
+    serializer_class = GoalTrialSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_goal_progress(self):
+        goal_progress = get_object_or_404(GoalProgress.objects.select_related('session'), id=self.kwargs['goal_progress_id'])
+        if not can_capture(self.request.user, goal_progress.session):
+            raise PermissionDenied('You can only record trials for your own sessions')
+        return goal_progress
+    
+    def get_queryset(self):
+        return GoalTrial.objects.filter(goal_progress=self.get_goal_progress())
+    
+    def create(self, request, *args, **kwargs):
+        goal_progress = self.get_goal_progress()
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        
+        # goal_progress isn't a serializer field, so the unique (goal_progress, trial_number) is checked here;
+        # a retried upload is a normal case and must not reach the database constraint
+        numbers = [trial['trial_number'] for trial in (serializer.validated_data if many else [serializer.validated_data])]
+        repeated = {number for number in numbers if numbers.count(number) > 1}
+        repeated |= set(GoalTrial.objects.filter(goal_progress=goal_progress, trial_number__in=numbers).values_list('trial_number', flat=True))
+        if repeated:
+            return Response({
+                'error': 'Duplicate or already recorded trial numbers for this goal progress entry',
+                'trial_numbers': sorted(repeated)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            with transaction.atomic():
+                if many:
+                    trials = GoalTrial.objects.bulk_create([
+                        GoalTrial(goal_progress=goal_progress, **trial) for trial in serializer.validated_data
+                    ])
+                    rollup_trials(goal_progress.id)
+                    data = GoalTrialSerializer(trials, many=True).data
+                else:
+                    serializer.save(goal_progress=goal_progress)
+                    data = serializer.data
+        except IntegrityError:
+            # A concurrent request recorded the same trial numbers first
+            return Response({'error': 'Trial numbers already recorded for this goal progress entry'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_201_CREATED)
+
 class IncidentView(generics.ListCreateAPIView):
     """API view for managing incidents"""
     serializer_class = IncidentSerializer
@@ -383,7 +392,7 @@ class SessionNoteView(generics.ListCreateAPIView):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def submit_session(request):
-    """API endpoint for submitting session data"""
+    """API endpoint for submitting session data (retries with the same Idempotency-Key are replayed)"""
     serializer = SessionSubmitSerializer(data=request.data)
     if serializer.is_valid():
         session_id = serializer.validated_data['session_id']
@@ -397,14 +406,16 @@ def submit_session(request):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
         if submit_type == 'submit':
-            session.status = 'completed'
-            session.save()
-            
-            return Response({
+            try:
+                payload, status_code = finalize_session(session.id, request.user, 'submit', idempotency_key(request))
+            except FinalizeBlocked as e:
+                return Response(e.payload, status=e.status_code)
+            payload.update({
                 'message': 'Session submitted successfully',
                 'session_id': session_id,
                 'status': 'completed'
             })
+            return Response(payload, status=status_code)
         else:
             return Response({
                 'message': 'Session saved as draft',
@@ -414,6 +425,117 @@ def submit_session(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _can_view_client(user, client_id):
+    """Admins, the client's BCBA, staff who have had sessions with the client, and the client themselves"""
+    if not (hasattr(user, 'role') and user.role):
+        return False
+    role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+    if role_name in ['Admin', 'Superadmin']:
+        return True
+    if role_name == 'BCBA':
+        return client_id in bcba_client_ids(user)
+    if role_name == 'RBT':
+        return Session.objects.filter(client_id=client_id, staff=user).exists()
+    return client_id == user.id
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def client_goal_mastery(request, client_id):
+    """
+    Precomputed mastery status of every goal with data for a client (session/mastery.py)
+    
+    Query Parameters:
+    - refresh: true to re-evaluate all of the client's goals first
+    """
+    if not _can_view_client(request.user, client_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.query_params.get('refresh', '').lower() == 'true':
+        evaluate_goal_mastery(client_id)
+    goals = GoalMastery.objects.filter(client_id=client_id).order_by('goal_id')
+    data = GoalMasterySerializer(goals, many=True).data
+    return Response({
+        'client_id': client_id,
+        'goals': data,
+        'mastered': sum(1 for goal in data if goal['status'] == 'mastered'),
+        'total_goals': len(data)
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def client_behavior_analytics(request, client_id):
+    """
+    ABC event and incident trends for a client (session/behavior_analytics.py)
+    
+    Query Parameters:
+    - start_date / end_date: Range (YYYY-MM-DD); defaults to the last 90 days, at most two years
+    - bin: 'day' (default) or 'week'
+    """
+    if not _can_view_client(request.user, client_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        start_date = date.fromisoformat(start_date) if start_date else None
+        end_date = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return Response({'error': 'start_date and end_date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+    end_date = end_date or timezone.now().date()
+    start_date = start_date or end_date - timedelta(days=BEHAVIOR_DEFAULT_RANGE_DAYS - 1)
+    if start_date > end_date:
+        return Response({'error': 'start_date must be on or before end_date'}, status=status.HTTP_400_BAD_REQUEST)
+    if (end_date - start_date).days >= BEHAVIOR_MAX_RANGE_DAYS:
+        return Response({'error': f'Date range cannot exceed {BEHAVIOR_MAX_RANGE_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+    bin_size = request.query_params.get('bin', 'day')
+    if bin_size not in BEHAVIOR_BINS:
+        return Response({'error': f"bin must be one of: {', '.join(BEHAVIOR_BINS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(behavior_analytics(client_id, start_date, end_date, bin_size))
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_session_data(request):
+    """
+    Offline batch sync of session capture data (session/sync.py)
+    
+    POST {"operations": [{"client_id": uuid, "type", "session_id", "data"}, ...]}
+    applies the whole queue in one transaction and returns a result per
+    operation plus a cursor. Already-synced client_ids come back as duplicates.
+    
+    Query Parameters (GET):
+    - since: Cursor from a previous sync; lists operations synced after it
+    """
+    if request.method == 'GET':
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response({'error': 'since must be an integer cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        operations, cursor = operations_since(request.user, since, get_max_sync_operations())
+        return Response({'operations': operations, 'cursor': cursor})
+    
+    operations = request.data.get('operations') if hasattr(request.data, 'get') else None
+    if not isinstance(operations, list) or not operations:
+        return Response({'error': 'operations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > get_max_sync_operations():
+        return Response(
+            {'error': f'At most {get_max_sync_operations()} operations per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        results, cursor = apply_sync_operations(request.user, operations)
+    except SyncConflict:
+        return Response(
+            {'error': 'Some operations were synced by another request at the same time; retry the batch'},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    counts = {'created': 0, 'duplicate': 0, 'error': 0}
+    for result in results:
+        counts[result['status']] += 1
+    return Response({'results': results, 'cursor': cursor, **counts})
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def preview_session(request):
@@ -467,32 +589,153 @@ def upcoming_sessions(request):
     if staff_id:
         queryset = queryset.filter(staff_id=staff_id)
     
-    serializer = SessionListSerializer(queryset.order_by('session_date', 'start_time'), many=True)
+    fields, _ = SessionListSerializer.parse_sparse_params(request.query_params)
+    serializer = SessionListSerializer(queryset.order_by('session_date', 'start_time'), many=True, fields=fields)
     return Response({
         'upcoming_sessions': serializer.data,
         'total_sessions': len(serializer.data),
         'message': 'Upcoming sessions only (scheduled and in_progress)'
     })
 
+def _calendar_window(request):
+    """Parse ?start=&end= (YYYY-MM-DD); defaults to today plus 30 days"""
+    try:
+        start = date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else timezone.now().date()
+        end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else start + timedelta(days=30)
+    except ValueError:
+        return None, None, 'start and end must be dates in YYYY-MM-DD format'
+    if end < start:
+        return None, None, 'end must be on or after start'
+    if (end - start).days >= MAX_CALENDAR_DAYS:
+        return None, None, f'The calendar window can span at most {MAX_CALENDAR_DAYS} days'
+    return start, end, None
+
+
+def _not_modified(etag):
+    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_sessions(request):
+    """
+    Compact session rows for a calendar window, revalidated with ETag/If-None-Match.
+    
+    Query Parameters:
+    - start: First day of the window (YYYY-MM-DD, default today)
+    - end: Last day of the window (YYYY-MM-DD, default start + 30 days)
+    - staff_id: Filter by staff member (admins)
+    - client_id: Filter by client
+    """
+    user = request.user
+    start, end, error = _calendar_window(request)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = Session.objects.filter(session_date__gte=start, session_date__lte=end)
+    
+    # Role-based access control
+    if hasattr(user, 'role') and user.role:
+        role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+        
+        if role_name in ['Admin', 'Superadmin']:
+            pass
+        elif role_name in ['RBT', 'BCBA']:
+            queryset = queryset.filter(staff=user)
+        elif role_name == 'Clients/Parent':
+            queryset = queryset.filter(client=user)
+    else:
+        queryset = queryset.filter(staff=user)
+    
+    staff_id = request.query_params.get('staff_id')
+    if staff_id:
+        queryset = queryset.filter(staff_id=staff_id)
+    client_id = request.query_params.get('client_id')
+    if client_id:
+        queryset = queryset.filter(client_id=client_id)
+    
+    etag = calendar_etag(queryset, user.id, start, end, staff_id, client_id)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    
+    rows = calendar_rows(queryset)
+    response = Response({
+        'start': start,
+        'end': end,
+        'sessions': rows,
+        'total_sessions': len(rows),
+    })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def staff_calendar_ics(request, staff_id):
+    """
+    iCalendar (.ics) export of one staff member's sessions.
+    
+    Query Parameters:
+    - start: First day of the window (YYYY-MM-DD, default today)
+    - end: Last day of the window (YYYY-MM-DD, default start + 30 days)
+    """
+    user = request.user
+    role_name = None
+    if hasattr(user, 'role') and user.role:
+        role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+    if role_name not in ['Admin', 'Superadmin'] and user.id != staff_id:
+        return Response({'error': 'You can only export your own calendar'}, status=status.HTTP_403_FORBIDDEN)
+    
+    start, end, error = _calendar_window(request)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    staff = get_object_or_404(User, id=staff_id)
+    queryset = Session.objects.filter(staff=staff, session_date__gte=start, session_date__lte=end)
+    
+    etag = calendar_etag(queryset, 'ics', staff_id, start, end)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    
+    body = render_ical(calendar_rows(queryset), f"{staff.name or staff.username} - Sessions")
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="staff-{staff_id}-sessions.ics"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _keyset_response(request, queryset, key, serialize, descending=True, **extra):
+    """?cursor= page of ``queryset`` on (session_date, start_time, id), serialized under ``key``"""
+    try:
+        sessions, page_info = keyset_page(queryset, request.query_params, descending)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    page_info[key] = serialize(sessions)
+    page_info.update(extra)
+    return Response(page_info)
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def completed_sessions(request):
-    """API endpoint for getting completed sessions with all details"""
+    """
+    API endpoint for getting completed sessions with all details
+    
+    Query Parameters:
+    - fields: Comma-separated session fields to return (default: all)
+    - expand: Comma-separated relations to include, e.g. timer,activities,notes (default: all)
+    - page, page_size: Pagination (page_size capped at SESSION_MAX_PAGE_SIZE)
+    - cursor: Keyset pagination instead of page (empty for the first page, then next_cursor)
+    - count: With cursor, 'approx' or 'exact' adds a total count
+    """
     user = request.user
-    queryset = Session.objects.select_related('client', 'staff', 'client__role', 'staff__role').prefetch_related(
-        'timer',
-        'additional_times',
-        'checklist_items',
-        'activities',
-        'reinforcement_strategies',
-        'abc_events',
-        'goal_progress',
-        'incidents',
-        'notes',
-        'time_trackers'
-    ).filter(
-        status='completed'
-    )
+    fields, expand = SessionDetailSerializer.parse_sparse_params(request.query_params)
+    queryset = Session.objects.filter(status='completed')
     
     # Role-based access control
     if hasattr(user, 'role') and user.role:
@@ -544,21 +787,33 @@ def completed_sessions(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    if wants_cursor(request.query_params):
+        return _keyset_response(
+            request, SessionDetailSerializer.setup_eager_loading(queryset, fields, expand), 'completed_sessions',
+            lambda sessions: SessionDetailSerializer(sessions, many=True, fields=fields, expand=expand).data,
+            message='Completed sessions with all details'
+        )
+    
     # Order by session date and time (most recent first)
-    queryset = queryset.order_by('-session_date', '-start_time')
+    queryset = queryset.order_by('-session_date', '-start_time', '-id')
     
-    # Pagination
-    page_size = int(request.query_params.get('page_size', 20))
-    page = int(request.query_params.get('page', 1))
+    # Pagination (page_size is capped at SESSION_MAX_PAGE_SIZE)
+    try:
+        page, page_size = page_params(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'page and page_size must be positive integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     start_index = (page - 1) * page_size
     end_index = start_index + page_size
     
     total_sessions = queryset.count()
-    sessions_page = queryset[start_index:end_index]
+    sessions_page = SessionDetailSerializer.setup_eager_loading(queryset, fields, expand)[start_index:end_index]
     
-    # Use SessionDetailSerializer to get all session details
-    serializer = SessionDetailSerializer(sessions_page, many=True)
+    # Only the requested fields/relations are loaded and serialized
+    serializer = SessionDetailSerializer(sessions_page, many=True, fields=fields, expand=expand)
     
     return Response({
         'completed_sessions': serializer.data,
@@ -572,20 +827,19 @@ def completed_sessions(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def all_sessions_with_details(request):
-    """API endpoint for getting all sessions with complete details"""
+    """
+    API endpoint for getting all sessions with complete details
+    
+    Query Parameters:
+    - fields: Comma-separated session fields to return (default: all)
+    - expand: Comma-separated relations to include, e.g. timer,activities,notes (default: all)
+    - page, page_size: Pagination (page_size capped at SESSION_MAX_PAGE_SIZE)
+    - cursor: Keyset pagination instead of page (empty for the first page, then next_cursor)
+    - count: With cursor, 'approx' or 'exact' adds a total count
+    """
     user = request.user
-    queryset = Session.objects.select_related('client', 'staff', 'client__role', 'staff__role').prefetch_related(
-        'timer',
-        'additional_times',
-        'checklist_items',
-        'activities',
-        'reinforcement_strategies',
-        'abc_events',
-        'goal_progress',
-        'incidents',
-        'notes',
-        'time_trackers'
-    ).all()
+    fields, expand = SessionDetailSerializer.parse_sparse_params(request.query_params)
+    queryset = Session.objects.all()
     
     # Role-based access control
     if hasattr(user, 'role') and user.role:
@@ -643,21 +897,33 @@ def all_sessions_with_details(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    if wants_cursor(request.query_params):
+        return _keyset_response(
+            request, SessionDetailSerializer.setup_eager_loading(queryset, fields, expand), 'sessions',
+            lambda sessions: SessionDetailSerializer(sessions, many=True, fields=fields, expand=expand).data,
+            message='All sessions with complete details'
+        )
+    
     # Order by session date and time (most recent first)
-    queryset = queryset.order_by('-session_date', '-start_time')
+    queryset = queryset.order_by('-session_date', '-start_time', '-id')
     
-    # Pagination
-    page_size = int(request.query_params.get('page_size', 20))
-    page = int(request.query_params.get('page', 1))
+    # Pagination (page_size is capped at SESSION_MAX_PAGE_SIZE)
+    try:
+        page, page_size = page_params(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'page and page_size must be positive integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     start_index = (page - 1) * page_size
     end_index = start_index + page_size
     
     total_sessions = queryset.count()
-    sessions_page = queryset[start_index:end_index]
+    sessions_page = SessionDetailSerializer.setup_eager_loading(queryset, fields, expand)[start_index:end_index]
     
-    # Use SessionDetailSerializer to get all session details
-    serializer = SessionDetailSerializer(sessions_page, many=True)
+    # Only the requested fields/relations are loaded and serialized
+    serializer = SessionDetailSerializer(sessions_page, many=True, fields=fields, expand=expand)
     
     return Response({
         'sessions': serializer.data,
@@ -709,31 +975,7 @@ def get_session_details(request, session_id):
             # 1. They are the staff for this session
             # 2. The client is assigned to them (assigned_bcba)
             # 3. They have treatment plans for this client
-            has_permission = (session.staff == user)
-            
-            if not has_permission:
-                # Check if client is assigned to BCBA
-                if hasattr(session.client, 'assigned_bcba') and session.client.assigned_bcba == user:
-                    has_permission = True
-            
-            if not has_permission:
-                # Check if BCBA has treatment plans for this client
-                try:
-                    from treatment_plan.models import TreatmentPlan
-                    from django.db.models import Q
-                    client_identifier = str(session.client.id)
-                    has_treatment_plan = TreatmentPlan.objects.filter(
-                        bcba=user
-                    ).filter(
-                        Q(client_id=client_identifier) |
-                        Q(client_id=session.client.username) |
-                        Q(client_id=getattr(session.client, 'staff_id', '')) |
-                        Q(client_name__icontains=session.client.name if hasattr(session.client, 'name') and session.client.name else '')
-                    ).exists()
-                    if has_treatment_plan:
-                        has_permission = True
-                except Exception:
-                    pass
+            has_permission = bcba_can_access_session(user, session)
         elif role_name == 'Clients/Parent':
             # Clients can see their own sessions
             has_permission = (session.client == user)
@@ -796,9 +1038,16 @@ def get_session_details(request, session_id):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def session_statistics(request):
-    """API endpoint for getting session statistics"""
+    """
+    API endpoint for getting session statistics
+    
+    Query Parameters:
+    - start_date / end_date: Filter by session date (YYYY-MM-DD)
+    - histogram: 'true' to add per-day counts (defaults to the last 30 days when no range is given)
+    """
     user = request.user
     queryset = Session.objects.all()
+    scope = f'staff:{user.id}'
     
     # Role-based access control
     if hasattr(user, 'role') and user.role:
@@ -806,47 +1055,47 @@ def session_statistics(request):
         
         if role_name in ['Admin', 'Superadmin']:
             # Admin can see all sessions
-            pass
+            scope = 'all'
         elif role_name in ['RBT', 'BCBA']:
             queryset = queryset.filter(staff=user)
         elif role_name == 'Clients/Parent':
             queryset = queryset.filter(client=user)
+            scope = f'client:{user.id}'
+        else:
+            scope = 'all'
     else:
         # Default: users can only see their own sessions
         queryset = queryset.filter(staff=user)
     
     # Filter by date range if provided
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
+    try:
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        start_date = date.fromisoformat(start_date) if start_date else None
+        end_date = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return Response({'error': 'start_date and end_date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
     if start_date:
         queryset = queryset.filter(session_date__gte=start_date)
     if end_date:
         queryset = queryset.filter(session_date__lte=end_date)
-    
-    # Calculate statistics
-    total_sessions = queryset.count()
-    completed_sessions = queryset.filter(status='completed').count()
-    in_progress_sessions = queryset.filter(status='in_progress').count()
-    scheduled_sessions = queryset.filter(status='scheduled').count()
-    cancelled_sessions = queryset.filter(status='cancelled').count()
-    
-    # Calculate completion rate
-    completion_rate = (completed_sessions / total_sessions * 100) if total_sessions > 0 else 0
-    
-    # Get recent sessions (last 7 days)
-    from datetime import timedelta
-    recent_date = timezone.now().date() - timedelta(days=7)
-    recent_sessions = queryset.filter(session_date__gte=recent_date).count()
-    
-    return Response({
-        'total_sessions': total_sessions,
-        'completed_sessions': completed_sessions,
-        'in_progress_sessions': in_progress_sessions,
-        'scheduled_sessions': scheduled_sessions,
-        'cancelled_sessions': cancelled_sessions,
-        'completion_rate': round(completion_rate, 2),
-        'recent_sessions_7_days': recent_sessions
-    })
+    include_histogram = request.query_params.get('histogram', '').lower() == 'true'
+    
+    def build():
+        stats = session_status_counts(queryset)
+        if include_histogram:
+            histogram_end = end_date or timezone.now().date()
+            histogram_start = start_date or histogram_end - timedelta(days=DEFAULT_HISTOGRAM_DAYS - 1)
+            histogram_start = max(histogram_start, histogram_end - timedelta(days=MAX_HISTOGRAM_DAYS - 1))
+            stats['histogram'] = daily_histogram(queryset, histogram_start, histogram_end)
+        return stats
+    
+    # One conditional aggregate, cached briefly per role scope
+    return Response(cached_statistics(
+        'sessions', scope,
+        {'start': start_date, 'end': end_date, 'histogram': include_histogram},
+        build,
+    ))
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -898,17 +1147,26 @@ def get_user_sessions(request):
     if end_date:
         queryset = queryset.filter(session_date__lte=end_date)
     
-    serializer = SessionListSerializer(queryset.order_by('-session_date', '-start_time'), many=True)
+    fields, _ = SessionListSerializer.parse_sparse_params(request.query_params)
+    user_info = {
+        'id': target_user.id,
+        'username': target_user.username,
+        'name': target_user.get_full_name() or target_user.username,
+        'role': target_user.role.name if hasattr(target_user, 'role') and target_user.role else 'No role'
+    }
+    if wants_cursor(request.query_params):
+        return _keyset_response(
+            request, queryset, 'sessions',
+            lambda sessions: SessionListSerializer(sessions, many=True, fields=fields).data,
+            user=user_info
+        )
+    
+    serializer = SessionListSerializer(queryset.order_by('-session_date', '-start_time'), many=True, fields=fields)
     
     return Response({
-        'user': {
-            'id': target_user.id,
-            'username': target_user.username,
-            'name': target_user.get_full_name() or target_user.username,
-            'role': target_user.role.name if hasattr(target_user, 'role') and target_user.role else 'No role'
-        },
+        'user': user_info,
         'sessions': serializer.data,
-        'total_sessions': queryset.count()
+        'total_sessions': len(serializer.data)
     })
 
 @api_view(['GET'])
@@ -980,21 +1238,8 @@ def get_user_details(request, user_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get user's sessions (as staff)
-    staff_sessions = Session.objects.filter(staff=target_user).count()
-    client_sessions = Session.objects.filter(client=target_user).count()
-    
-    # Get recent sessions (last 30 days)
-    from datetime import timedelta
-    recent_date = timezone.now().date() - timedelta(days=30)
-    recent_staff_sessions = Session.objects.filter(
-        staff=target_user, 
-        session_date__gte=recent_date
-    ).count()
-    recent_client_sessions = Session.objects.filter(
-        client=target_user, 
-        session_date__gte=recent_date
-    ).count()
+    # Staff-side and client-side session counts in one aggregate
+    session_counts = user_session_statistics(target_user)
     
     # Get user's role information
     role_info = None
@@ -1031,18 +1276,15 @@ def get_user_details(request, user_id):
     
     # Get user's session statistics
     session_stats = {
-        'total_sessions_as_staff': staff_sessions,
-        'total_sessions_as_client': client_sessions,
-        'recent_sessions_as_staff': recent_staff_sessions,
-        'recent_sessions_as_client': recent_client_sessions,
-        'total_sessions': staff_sessions + client_sessions
+        'total_sessions_as_staff': session_counts['total_sessions_as_staff'],
+        'total_sessions_as_client': session_counts['total_sessions_as_client'],
+        'recent_sessions_as_staff': session_counts['recent_sessions_as_staff'],
+        'recent_sessions_as_client': session_counts['recent_sessions_as_client'],
+        'total_sessions': session_counts['total_sessions_as_staff'] + session_counts['total_sessions_as_client']
     }
     
     # Get upcoming sessions count
-    upcoming_sessions = Session.objects.filter(
-        models.Q(staff=target_user) | models.Q(client=target_user),
-        session_date__gte=timezone.now().date()
-    ).count()
+    upcoming_sessions = session_counts['upcoming_sessions']
     
     # Get detailed upcoming sessions
     upcoming_sessions_details = Session.objects.filter(
@@ -1099,41 +1341,18 @@ def get_user_details(request, user_id):
                     role__name__in=['Client', 'Clients/Parent']
                 ).select_related('role').order_by('first_name', 'last_name')
             
+            # Session statistics for every client in one grouped query, plus one
+            # query for the last session with each of them
+            clients = list(clients)
+            caseload = caseload_statistics([client.id for client in clients], staff=current_user)
+            last_sessions = Session.objects.select_related('client', 'staff').in_bulk(
+                [stats['last_session_id'] for stats in caseload.values() if stats['last_session_id']]
+            )
+            
             # Build client list with additional information
             for client in clients:
-                # Get session statistics for this client
-                total_sessions = Session.objects.filter(
-                    client=client, 
-                    staff=current_user
-                ).count()
-                
-                completed_sessions = Session.objects.filter(
-                    client=client, 
-                    staff=current_user, 
-                    status='completed'
-                ).count()
-                
-                # Get recent sessions (last 30 days)
-                from datetime import timedelta
-                recent_date = timezone.now().date() - timedelta(days=30)
-                recent_sessions = Session.objects.filter(
-                    client=client,
-                    staff=current_user,
-                    session_date__gte=recent_date
-                ).count()
-                
-                # Get upcoming sessions
-                upcoming_sessions = Session.objects.filter(
-                    client=client,
-                    staff=current_user,
-                    session_date__gte=timezone.now().date()
-                ).count()
-                
-                # Get last session with this client
-                last_session_with_client = Session.objects.filter(
-                    client=client,
-                    staff=current_user
-                ).order_by('-session_date', '-start_time').first()
+                stats = caseload.get(client.id) or empty_statistics()
+                last_session_with_client = last_sessions.get(stats['last_session_id'])
                 
                 client_info = {
                     'id': int(client.id),
@@ -1146,10 +1365,10 @@ def get_user_details(request, user_id):
                         'name': client.role.name if client.role else 'No role'
                     },
                     'session_statistics': {
-                        'total_sessions': total_sessions,
-                        'completed_sessions': completed_sessions,
-                        'recent_sessions': recent_sessions,
-                        'upcoming_sessions': upcoming_sessions
+                        'total_sessions': stats['total_sessions'],
+                        'completed_sessions': stats['completed_sessions'],
+                        'recent_sessions': stats['recent_sessions_30_days'],
+                        'upcoming_sessions': stats['future_sessions']
                     },
                     'last_session': serialize_session(last_session_with_client) if last_session_with_client else None
                 }
@@ -1233,40 +1452,15 @@ def get_bcba_clients(request):
         else:
             clients = User.objects.none()
         
+        # Session statistics for the whole caseload in one grouped query
+        # Only count sessions where this BCBA is the staff
+        clients = list(clients)
+        caseload = caseload_statistics([client.id for client in clients], staff=user)
+
         # Get additional client information
         client_list = []
         for client in clients:
-            # Get session statistics for this client
-            # Only count sessions where this BCBA is the staff
-            total_sessions = Session.objects.filter(client=client, staff=user).count()
-            completed_sessions = Session.objects.filter(
-                client=client, 
-                staff=user, 
-                status='completed'
-            ).count()
-            
-            # Get recent sessions (last 30 days)
-            from datetime import timedelta
-            recent_date = timezone.now().date() - timedelta(days=30)
-            recent_sessions = Session.objects.filter(
-                client=client,
-                staff=user,
-                session_date__gte=recent_date
-            ).count()
-            
-            # Get upcoming sessions
-            upcoming_sessions = Session.objects.filter(
-                client=client,
-                staff=user,
-                session_date__gte=timezone.now().date(),
-                status__in=['scheduled', 'in_progress']
-            ).count()
-            
-            # Get last session date
-            last_session = Session.objects.filter(
-                client=client,
-                staff=user
-            ).order_by('-session_date').first()
+            stats = caseload.get(client.id) or empty_statistics()
             
             # Check assignment status - client must be assigned to this BCBA
             is_directly_assigned = hasattr(client, 'assigned_bcba') and client.assigned_bcba == user
@@ -1289,14 +1483,14 @@ def get_bcba_clients(request):
                 'assignment_status': assignment_status,
                 'is_directly_assigned': is_directly_assigned,
                 'session_statistics': {
-                    'total_sessions': total_sessions,
-                    'completed_sessions': completed_sessions,
-                    'recent_sessions_30_days': recent_sessions,
-                    'upcoming_sessions': upcoming_sessions,
-                    'completion_rate': round((completed_sessions / total_sessions * 100), 2) if total_sessions > 0 else 0
+                    'total_sessions': stats['total_sessions'],
+                    'completed_sessions': stats['completed_sessions'],
+                    'recent_sessions_30_days': stats['recent_sessions_30_days'],
+                    'upcoming_sessions': stats['upcoming_sessions'],
+                    'completion_rate': stats['completion_rate']
                 },
-                'last_session_date': last_session.session_date.isoformat() if last_session else None,
-                'last_session_status': last_session.status if last_session else None
+                'last_session_date': stats['last_session_date'].isoformat() if stats['last_session_date'] else None,
+                'last_session_status': stats['last_session_status']
             }
             client_list.append(client_info)
         
@@ -2240,7 +2434,13 @@ class TimeTrackerDetailView(generics.RetrieveUpdateDestroyAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def time_tracker_summary(request):
-    """API endpoint for getting time tracker summary statistics"""
+    """
+    API endpoint for getting time tracker summary statistics
+    
+    Query Parameters:
+    - start_date / end_date: Filter by entry start date (YYYY-MM-DD)
+    - group_by: Also break totals down by 'day', 'week' or 'staff'
+    """
     user = request.user
     queryset = TimeTracker.objects.all()
     
@@ -2258,35 +2458,127 @@ def time_tracker_summary(request):
     # Filter by date range if provided
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
+    try:
+        start_date = date.fromisoformat(start_date) if start_date else None
+        end_date = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return Response({'error': 'start_date and end_date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
     if start_date:
         queryset = queryset.filter(start_time__date__gte=start_date)
     if end_date:
         queryset = queryset.filter(start_time__date__lte=end_date)
     
-    # Calculate summary statistics
-    total_entries = queryset.count()
-    total_duration = sum(entry.duration for entry in queryset)  # in minutes
-    
-    # Group by time type
-    time_type_summary = {}
-    for entry in queryset:
-        time_type = entry.time_type
-        if time_type not in time_type_summary:
-            time_type_summary[time_type] = {
-                'count': 0,
-                'total_duration': 0,
-                'display_name': entry.get_time_type_display()
-            }
-        time_type_summary[time_type]['count'] += 1
-        time_type_summary[time_type]['total_duration'] += entry.duration
+    group_by = request.query_params.get('group_by') or None
+    if group_by and group_by not in TIME_TRACKER_GROUPINGS:
+        return Response({'error': f"group_by must be one of: {', '.join(TIME_TRACKER_GROUPINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({
-        'total_entries': total_entries,
-        'total_duration_minutes': total_duration,
-        'total_duration_hours': round(total_duration / 60, 2),
-        'total_duration_display': f"{int(total_duration // 60):02d}:{int(total_duration % 60):02d}",
-        'time_type_summary': time_type_summary
-    })
+    # Aggregated in SQL and cached per user and range
+    return Response(cached_summary(
+        user.id,
+        {'start': start_date, 'end': end_date, 'group_by': group_by},
+        lambda: summarize(queryset, group_by),
+    ))
+
+
+def _is_admin(user):
+    if hasattr(user, 'role') and user.role:
+        role_name = user.role.name if hasattr(user.role, 'name') else str(user.role)
+        return role_name in ['Admin', 'Superadmin']
+    return False
+
+
+def _payroll_export_data(request, export):
+    data = {
+        'id': export.id,
+        'status': export.status,
+        'start_date': export.start_date,
+        'end_date': export.end_date,
+        'period': export.period,
+        'rounding': export.rounding,
+        'row_count': export.row_count,
+        'error': export.error or None,
+        'created_at': export.created_at,
+        'completed_at': export.completed_at,
+        'download_url': None,
+    }
+    if export.status == 'completed':
+        data['download_url'] = request.build_absolute_uri(
+            reverse('session:payroll-export-download', args=[export.id])
+        )
+    return data
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def payroll_exports(request):
+    """
+    List payroll/billing exports or start a new one (Admin/Superadmin).
+    
+    POST body: start_date, end_date (YYYY-MM-DD), period (day/week/month, default week),
+    rounding (cms_8_minute/up/down/nearest, default BILLING_ROUNDING).
+    The export runs in the background; poll the returned status URL for the download link.
+    """
+    if not _is_admin(request.user):
+        return Response({'error': 'Only Admin and Superadmin users can export payroll data'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.method == 'GET':
+        exports = PayrollExport.objects.filter(requested_by=request.user)[:50]
+        return Response({'exports': [_payroll_export_data(request, export) for export in exports]})
+    
+    try:
+        start_date = date.fromisoformat(str(request.data.get('start_date')))
+        end_date = date.fromisoformat(str(request.data.get('end_date')))
+    except ValueError:
+        return Response({'error': 'start_date and end_date are required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    if end_date < start_date:
+        return Response({'error': 'end_date must be on or after start_date'}, status=status.HTTP_400_BAD_REQUEST)
+    period = request.data.get('period') or 'week'
+    rounding = request.data.get('rounding') or get_default_rounding()
+    if period not in PAYROLL_PERIODS:
+        return Response({'error': f"period must be one of: {', '.join(PAYROLL_PERIODS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    if rounding not in ROUNDING_RULES:
+        return Response({'error': f"rounding must be one of: {', '.join(ROUNDING_RULES)}"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    with transaction.atomic():
+        export = PayrollExport.objects.create(
+            requested_by=request.user,
+            start_date=start_date,
+            end_date=end_date,
+            period=period,
+            rounding=rounding,
+        )
+        start_export(export)
+    
+    data = _payroll_export_data(request, export)
+    data['status_url'] = request.build_absolute_uri(reverse('session:payroll-export-detail', args=[export.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def payroll_export_detail(request, export_id):
+    """Status of a payroll export, with a download link once it has completed"""
+    if not _is_admin(request.user):
+        return Response({'error': 'Only Admin and Superadmin users can export payroll data'}, status=status.HTTP_403_FORBIDDEN)
+    export = get_object_or_404(PayrollExport, id=export_id, requested_by=request.user)
+    return Response(_payroll_export_data(request, export))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def payroll_export_download(request, export_id):
+    """Download a completed payroll export (streamed from storage)"""
+    if not _is_admin(request.user):
+        return Response({'error': 'Only Admin and Superadmin users can export payroll data'}, status=status.HTTP_403_FORBIDDEN)
+    export = get_object_or_404(PayrollExport, id=export_id, requested_by=request.user)
+    if export.status != 'completed' or not export.file:
+        return Response({'error': f'Export is {export.status}'}, status=status.HTTP_409_CONFLICT)
+    return FileResponse(
+        export.file.open('rb'),
+        as_attachment=True,
+        filename=f'payroll-{export.start_date}-{export.end_date}.csv',
+        content_type='text/csv; charset=utf-8',
+    )
 
 
 @api_view(['POST'])
@@ -2459,12 +2751,27 @@ def save_session_data_and_generate_notes(request, session_id):
     if 'goals' in request_data:
         goals_saved = []
         for goal_data in request_data['goals']:
+            # Structured counts feed the mastery engine; the description text is kept for existing readers
+            trials = int(goal_data.get('trials') or 0)
+            successes = min(int(goal_data.get('successes') or 0), trials) if trials else 0
+            goal_id = goal_data.get('goal_id')
+            percentage = round(successes / trials * 100, 1) if trials else float(goal_data.get('percentage') or 0)
+            criterion = None
+            if goal_id:
+                criterion = TreatmentGoal.objects.filter(id=goal_id).values_list('mastery_criteria', flat=True).first()
             goal = GoalProgress.objects.create(
                 session=session,
-                goal_description=f"{goal_data.get('goal', '')}. Target: {goal_data.get('target', '')}. {goal_data.get('trials', 0)} trials, {goal_data.get('successes', 0)} successes ({goal_data.get('percentage', 0)}%)",
-                is_met=goal_data.get('percentage', 0) >= 80,
+                goal_description=f"{goal_data.get('goal', '')}. Target: {goal_data.get('target', '')}. {trials} trials, {successes} successes ({percentage}%)",
+                is_met=percentage >= session_threshold(criterion),
                 implementation_method='verbal',
-                notes=goal_data.get('notes', '')
+                notes=goal_data.get('notes', ''),
+                goal_id=goal_id or None,
+                trial_count=trials or None,
+                success_count=successes if trials else None,
+                independent_count=goal_data.get('independent'),
+                occurrence_count=goal_data.get('occurrences'),
+                mean_latency_seconds=goal_data.get('latency_seconds'),
+                percentage=percentage
             )
             goals_saved.append(goal.id)
         saved_data['goals'] = f"{len(goals_saved)} goals saved"
@@ -3325,26 +3632,8 @@ def generate_bcba_session_analysis(request, session_id):
         # 2. They have treatment plans for this client
         # 3. They are reviewing an RBT session (staff is RBT)
         elif role_name == 'BCBA':
-            # Check if client is assigned to this BCBA
-            if hasattr(session.client, 'assigned_bcba') and session.client.assigned_bcba == user:
-                has_permission = True
-            else:
-                # Check if BCBA has treatment plans for this client (optimized query)
-                try:
-                    from treatment_plan.models import TreatmentPlan
-                    client_identifier = str(session.client.id)
-                    has_treatment_plan = TreatmentPlan.objects.filter(
-                        bcba=user
-                    ).filter(
-                        models.Q(client_id=client_identifier) | 
-                        models.Q(client_id=session.client.username) |
-                        models.Q(client_id=getattr(session.client, 'staff_id', '')) |
-                        models.Q(client_name__icontains=session.client.name if hasattr(session.client, 'name') and session.client.name else '')
-                    ).exists()
-                    if has_treatment_plan:
-                        has_permission = True
-                except Exception:
-                    pass
+            # Staffing the session alone doesn't grant analysis access
+            has_permission = bcba_can_access_session(user, session, include_staffed=False)
     
     if not has_permission:
         return Response({
@@ -3683,6 +3972,9 @@ AI analysis generation timed out. Please review the session data above and provi
 def finalize_session_with_ocean(request, session_id):
     """
     Finalize session with Ocean AI note flow validation
+    
+    Stops the timer, submits the note and completes the session in one
+    transaction; retries with the same Idempotency-Key are replayed.
     """
     session = get_object_or_404(Session, id=session_id)
     
@@ -3703,50 +3995,14 @@ def finalize_session_with_ocean(request, session_id):
         )
     
     try:
-        from ocean.models import SessionNoteFlow
-        
-        # Get note flow
-        note_flow, created = SessionNoteFlow.objects.get_or_create(session=session)
-        
-        # Check if note is completed
-        if not note_flow.is_note_completed:
-            return Response({
-                'can_finalize': False,
-                'error': 'Session note must be completed before finalizing',
-                'required_actions': [
-                    'Complete session note content',
-                    'Review and finalize session note',
-                    'Submit final session note'
-                ],
-                'note_flow_status': {
-                    'is_note_completed': note_flow.is_note_completed,
-                    'final_note_submitted': note_flow.final_note_submitted
-                }
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Finalize note flow
-        note_flow.final_note_submitted = True
-        note_flow.save()
-        
-        # Update session with final note
-        if note_flow.ai_generated_note:
-            session.session_notes = note_flow.ai_generated_note
-        elif note_flow.note_content:
-            session.session_notes = note_flow.note_content
-        
-        session.status = 'completed'
-        session.save()
-        
-        return Response({
-            'can_finalize': True,
-            'message': 'Session finalized successfully',
-            'note_flow_status': {
-                'is_note_completed': note_flow.is_note_completed,
-                'final_note_submitted': note_flow.final_note_submitted,
-                'ai_generated_note': note_flow.ai_generated_note
-            }
-        })
+        payload, status_code = finalize_session(
+            session.id, user, 'ocean_finalize', idempotency_key(request), note_requirement='completed'
+        )
+        payload.update({'can_finalize': True, 'message': 'Session finalized successfully'})
+        return Response(payload, status=status_code)
         
+    except FinalizeBlocked as e:
+        return Response(e.payload, status=e.status_code)
     except ImportError:
         return Response(
             {'error': 'Ocean AI module not available'}, 
@@ -4030,28 +4286,7 @@ class AISuggestionView(APIView):
             # 2. The client is assigned to them (assigned_bcba)
             # 3. They have treatment plans for this client
             elif role_name == 'BCBA':
-                has_permission = (
-                    session.staff == request.user or
-                    (hasattr(session.client, 'assigned_bcba') and session.client.assigned_bcba == request.user)
-                )
-                # Also check if BCBA has treatment plans for this client
-                if not has_permission:
-                    try:
-                        from treatment_plan.models import TreatmentPlan
-                        # Check if BCBA has any treatment plans matching the client
-                        client_identifier = str(session.client.id)
-                        has_treatment_plan = TreatmentPlan.objects.filter(
-                            bcba=request.user
-                        ).filter(
-                            models.Q(client_id=client_identifier) | 
-                            models.Q(client_id=session.client.username) |
-                            models.Q(client_id=getattr(session.client, 'staff_id', '')) |
-                            models.Q(client_name__icontains=session.client.name if hasattr(session.client, 'name') and session.client.name else '')
-                        ).exists()
-                        if has_treatment_plan:
-                            has_permission = True
-                    except Exception:
-                        pass
+                has_permission = bcba_can_access_session(request.user, session)
             # Clients can access their own sessions
             elif role_name == 'Clients/Parent':
                 has_permission = (session.client == request.user)
@@ -4219,17 +4454,30 @@ class AISuggestionView(APIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def bcba_client_sessions(request):
+    """
+    Sessions of the BCBA's clients, newest first, one keyset page at a time
+    
+    Query Parameters:
+    - status: Filter by session status
+    - cursor: next_cursor of the previous page (omit or leave empty for the first page)
+    - page_size: Rows per page (default 20, capped at SESSION_MAX_PAGE_SIZE)
+    - count: 'approx' or 'exact' adds a total count
+    - fields / expand: Narrow the serialized output
+    """
     user = request.user
     # Ensure user is a BCBA
     if hasattr(user, 'role') and user.role and user.role.name == 'BCBA':
-        from api.models import CustomUser
         from .models import Session
-        my_clients = CustomUser.objects.filter(assigned_bcba=user)
-        sessions = Session.objects.filter(client__in=my_clients)
+        sessions = Session.objects.filter(client_id__in=bcba_client_ids(user))
         status = request.GET.get('status')
         if status:
             sessions = sessions.filter(status=status)
         from .serializers import SessionDetailSerializer
-        serializer = SessionDetailSerializer(sessions, many=True)
-        return Response(serializer.data)
+        fields, expand = SessionDetailSerializer.parse_sparse_params(request.query_params)
+        sessions = SessionDetailSerializer.setup_eager_loading(sessions, fields, expand)
+        # Always paged: a BCBA's caseload history is unbounded
+        return _keyset_response(
+            request, sessions, 'sessions',
+            lambda page: SessionDetailSerializer(page, many=True, fields=fields, expand=expand).data
+        )
     return Response({'error': 'Not authorized'}, status=403)
\ No newline at end of file
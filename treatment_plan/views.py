@@ -182,22 +182,33 @@ def approve_treatment_plan(request, pk):
 @permission_classes([permissions.IsAuthenticated])
 def treatment_plan_stats(request):
     """Get statistics for treatment plans"""
+    from session.statistics import cached, conditional_counts
+
     if not request.user.is_staff:
         queryset = TreatmentPlan.objects.filter(bcba=request.user)
+        scope = f'bcba:{request.user.id}'
     else:
         queryset = TreatmentPlan.objects.all()
+        scope = 'all'
     
-    stats = {
-        'total_plans': queryset.count(),
-        'draft_plans': queryset.filter(status='draft').count(),
-        'submitted_plans': queryset.filter(status='submitted').count(),
-        'approved_plans': queryset.filter(status='approved').count(),
-        'rejected_plans': queryset.filter(status='rejected').count(),
-        'high_priority_plans': queryset.filter(priority='high').count(),
-        'medium_priority_plans': queryset.filter(priority='medium').count(),
-        'low_priority_plans': queryset.filter(priority='low').count(),
-    }
-    
+    def build():
+        counts = conditional_counts(
+            queryset,
+            **{f'{value}_plans': Q(status=value) for value, _ in TreatmentPlan.STATUS_CHOICES},
+            **{f'{value}_priority_plans': Q(priority=value) for value, _ in TreatmentPlan.PRIORITY_CHOICES},
+        )
+        return {
+            'total_plans': counts['total'],
+            'draft_plans': counts['draft_plans'],
+            'submitted_plans': counts['submitted_plans'],
+            'approved_plans': counts['approved_plans'],
+            'rejected_plans': counts['rejected_plans'],
+            'high_priority_plans': counts['high_priority_plans'],
+            'medium_priority_plans': counts['medium_priority_plans'],
+            'low_priority_plans': counts['low_priority_plans'],
+        }
+    
+    stats = cached('treatment_plans', scope, {}, build)
     return Response(stats, status=status.HTTP_200_OK)
 
 class TreatmentPlanApprovalListView(generics.ListAPIView):